@@ -6,16 +6,21 @@
 
 import onnxruntime as ort
 import numpy as np
+import json
 import logging
+import threading
 import time
 
 from enum import IntEnum, Enum
 from tokenizers import Tokenizer
-from typing import List, Dict, Optional, Tuple
+from typing import Hashable, List, Dict, Optional, Sequence, Tuple, TYPE_CHECKING
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from collections import defaultdict
 
+if TYPE_CHECKING:
+    from embedding_table import EmbeddingTable
+
 class VerbosityLevel(IntEnum):
     NONE = 0
     BASIC = 1
@@ -40,6 +45,118 @@ class ModelParameters:
     seq_len: Optional[int] = None
     hidden_size: Optional[int] = None
 
+@dataclass
+class GenerationState:
+    """
+    Everything that positions a DeepSeekModelInference within a token sequence.
+
+    Attributes:
+        kv_cache (Dict[str, np.ndarray]): The "past_keys_X"/"past_values_X" tensors of every layer.
+        sequence_length (int): KV positions in use, including the padded CONTEXT window.
+        context_token_count (int): Real tokens inside the CONTEXT window.
+        token_ids (List[int]): All tokens processed so far.
+        last_logits (Optional[np.ndarray]): Logits (1, 1, vocab_size) after the last processed token.
+        evicted_positions (int): KV positions dropped by a context policy, token_ids still lists their tokens.
+    """
+    kv_cache: Dict[str, np.ndarray]
+    sequence_length: int = 0
+    context_token_count: int = 0
+    token_ids: List[int] = field(default_factory=list)
+    last_logits: Optional[np.ndarray] = None
+    evicted_positions: int = 0
+
+@dataclass
+class TokenScores:
+    """
+    Log-likelihood of a scored text under the model.
+
+    Attributes:
+        token_ids (np.ndarray): The tokens of the text.
+        logprobs (np.ndarray): Natural log-probability of every token after the first, given the tokens before it.
+    """
+    token_ids: np.ndarray
+    logprobs: np.ndarray
+
+    @property
+    def total_logprob(self) -> float:
+        return float(self.logprobs.sum())
+
+    @property
+    def perplexity(self) -> float:
+        return float(np.exp(-self.logprobs.mean())) if len(self.logprobs) else float("nan")
+
+@dataclass
+class SinkWindowPolicy:
+    """
+    Bounds the KV cache of long generations by keeping the first `sink_tokens` positions and the most recent
+    `window` positions, evicting the middle (the attention-sink scheme of StreamingLLM).
+
+    Eviction happens in chunks of `evict_chunk` positions, so the KV copy is amortized over that many steps
+    and per-token cost stays constant once the cache is full. The cached keys already carry their rotary
+    position, so the kept window keys are rotated back by the number of evicted positions: positions stay
+    contiguous with the sinks and with the new tokens, which take their positions from the shortened length.
+
+    Attributes:
+        sink_tokens (int): Leading KV positions that are never evicted.
+        window (int): Recent KV positions kept after the sinks.
+        evict_chunk (int): Positions dropped at once when the cache is full.
+        rope_theta (float): Rotary embedding base of the model (10000 for the DeepSeek R1 Qwen distills).
+    """
+    sink_tokens: int = 4
+    window: int = 1024
+    evict_chunk: int = 64
+    rope_theta: float = 10000.0
+
+    def __post_init__(self):
+        if self.sink_tokens < 0 or not 0 < self.evict_chunk <= self.window:
+            raise ValueError(f"Invalid context policy {self}, need sink_tokens >= 0 and 0 < evict_chunk <= window")
+
+    @property
+    def max_length(self) -> int:
+        return self.sink_tokens + self.window
+
+    def eviction(self, sequence_length: int, incoming: int=1) -> Optional[Tuple[int, int]]:
+        """
+        Args:
+            sequence_length (int): KV positions currently in use.
+            incoming (int): Tokens about to be appended in one step.
+
+        Returns:
+            Optional[Tuple[int, int]]: The (start, end) positions to evict before the next step, or None.
+
+        Raises:
+            ValueError: If a step appends more tokens than the window holds.
+        """
+        if incoming > self.window:
+            raise ValueError(f"Cannot append {incoming} tokens at once to a window of {self.window}")
+        if sequence_length + incoming <= self.max_length:
+            return None
+        return self.sink_tokens, sequence_length - min(self.window - self.evict_chunk, self.window - incoming)
+
+    def shift_positions(self, keys: np.ndarray, shift: int) -> np.ndarray:
+        """
+        Moves rotary-embedded keys `shift` positions back, assuming the half-split (rotate_half) layout of Qwen.
+
+        Args:
+            keys (np.ndarray): Keys shaped (batch, heads, positions, head_size).
+            shift (int): Positions to move back by.
+
+        Returns:
+            np.ndarray: The keys as if they had been computed `shift` positions earlier.
+        """
+        head_size = keys.shape[-1]
+        inverse_frequency = self.rope_theta ** (-np.arange(0, head_size, 2, dtype=np.float64)/head_size)
+        angle = -shift*inverse_frequency
+        cos, sin = np.cos(angle).astype(keys.dtype), np.sin(angle).astype(keys.dtype)
+        first, second = keys[..., :head_size//2], keys[..., head_size//2:]
+        return np.concatenate([first*cos - second*sin, second*cos + first*sin], axis=-1)
+
+END_OF_SENTENCE = "<｜end▁of▁sentence｜>"
+THINK_START = "<think>"
+THINK_END = "</think>"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ALIGNMENT = 64                                                     # Byte alignment of every tensor in kv.bin
+
 
 logger = logging.getLogger(__name__)
 
@@ -64,6 +181,10 @@ class DeepSeekModelInference():
         model_subdirectory (Path): Path to the model directory containing ONNX files and tokenizer.
         model_meta (dict): A dictionary containing model metadata (e.g., number of layers, heads, etc.).
         verbose (VerbosityLevel, optional): Level of verbosity to control debug output. Defaults to VerbosityLevel.NONE.
+        embedding_table (Optional[EmbeddingTable]): Serves embeddings by direct lookup instead of running the
+            EMBEDDING session, see embedding_table.load_embedding_table. Defaults to None (use the session).
+        context_policy (Optional[SinkWindowPolicy]): Evicts old KV positions so long generations keep bounded
+            memory and latency. Defaults to None (the cache grows with every token).
 
     Attributes:
         session_mapper (Dict[str, ort.InferenceSession]): Stores mapped inference sessions.
@@ -73,14 +194,22 @@ class DeepSeekModelInference():
         softmax (Callable): Softmax function with temperature scaling for logits.
         verbose (VerbosityLevel): Current verbosity level.
         root_dir (Path): Root working directory at runtime.
+        generated_token_count (int): Tokens generated by the last `run_inference`, fewer than `max_tokens` when a
+            stop condition ended it early.
     """
 
     def __init__(self, model_sessions: Dict[str,ort.InferenceSession], 
                  tokenizer: str,
                  model_subdirectory: Path,
                  model_meta: dict,
-                 verbose: VerbosityLevel = VerbosityLevel.NONE):
+                 verbose: VerbosityLevel = VerbosityLevel.NONE,
+                 embedding_table: Optional["EmbeddingTable"] = None,
+                 context_policy: Optional[SinkWindowPolicy] = None):
         self.session_mapper = model_sessions
+        self.embedding_table = embedding_table
+        self.context_policy = context_policy
+        # Conversations share the sessions, only one of them may own the KV state at a time
+        self.state_lock = threading.RLock()
         self.root_dir = Path.cwd()
         self.model_subdirectory = model_subdirectory
         self.tokenizer_path = model_subdirectory/tokenizer
@@ -88,10 +217,12 @@ class DeepSeekModelInference():
         self.model_params = ModelParameters(**model_meta)
         self.verbose = verbose
         self.softmax = lambda x, temperature=1: np.exp((x-np.max(x))/temperature)/np.sum(np.exp((x-np.max(x))/temperature), axis=-1)
+        self.generated_token_count = 0
 
+        self._reset_state()
         self.verbosity_init(self.verbose)
 
-    def query(self, query: str, persona: Optional[str]=None) -> str:
+    def query(self, query: str, persona: Optional[str]=None, close_turn: bool=True) -> str:
         """
         Constructs a formatted query prompt for the model, optionally including a predefined persona.
 
@@ -102,6 +233,8 @@ class DeepSeekModelInference():
         Args:
             query (str): The user's input text or question.
             persona (Optional[str]): Optional name of the persona to apply. Must match a value in InferencePersona.
+            close_turn (bool): If False, the assistant tag is omitted so the prompt is a prefix of the final
+                prompt (used to prefill a query that is still being typed).
 
         Returns:
             str: A formatted prompt string ready to be passed to the model for inference.
@@ -123,7 +256,8 @@ class DeepSeekModelInference():
                 logger.warning(f".....Available Personas: {available_personas}")
                        
         query_build += query
-        query_build += assistant
+        if close_turn:
+            query_build += assistant
         return query_build
 
     def tokenize(self, prompt: str) -> np.array:
@@ -150,7 +284,8 @@ class DeepSeekModelInference():
         If `iter` is True, the method assumes `query` is already a token ID array (used in autoregressive loops).
 
         This method also updates model parameters for sequence length and hidden size based on the output tensor,
-        and handles verbosity during inference.
+        and handles verbosity during inference. With an embedding table the rows are gathered directly
+        and the session is not run; the returned array is then reused by the next call.
 
         Args:
             query (str): The input query string or pre-tokenized token ID array.
@@ -172,7 +307,10 @@ class DeepSeekModelInference():
         self.model_params.seq_len = expected_outputs.shape[1]
         self.model_params.hidden_size = expected_outputs.shape[2]
 
-        embedding_output = self.session_mapper["EMBEDDING"].run(None, {"input_ids": token_ids})[0]
+        if self.embedding_table is not None:
+            embedding_output = self.embedding_table.lookup(token_ids)
+        else:
+            embedding_output = self.session_mapper["EMBEDDING"].run(None, {"input_ids": token_ids})[0]
         
         self.verbosity_embedding(token_id=token_ids,
                                  embed_output=embedding_output.shape, 
@@ -321,29 +459,218 @@ class DeepSeekModelInference():
         Returns:
             int: The ID of the next predicted token.
         """
-        last_logit = logits[0,-1]
+        candidate_ids, probas = self.token_distribution(logits=logits, generated_ids=generated_ids,
+                                                        temperature=temperature, top_k=top_k,
+                                                        repetition_penalty=repetition_penalty)
+        return int(np.random.choice(candidate_ids, p=probas))
+
+    def token_distribution(self, logits: list, generated_ids: list,
+                           temperature: float=1, top_k: Optional[int]=None,
+                           repetition_penalty: Optional[float]=None) -> Tuple[np.array, np.array]:
+        """
+        Computes the distribution `next_token_prediction` samples from.
+
+        Args:
+            logits (list): Logits array of shape (1, seq_len, vocab_size); the last position is used.
+            generated_ids (list): List of token IDs generated so far (used for repetition penalty).
+            temperature (float): Softmax temperature.
+            top_k (Optional[int]): If provided, keeps only the top-k tokens.
+            repetition_penalty (Optional[float]): If provided, penalizes previously generated tokens.
+
+        Returns:
+            Tuple[np.array, np.array]: Candidate token IDs and their probabilities.
+        """
+        last_logit = logits[0,-1].copy()                                       # The penalty must not change the cached logits
         if repetition_penalty:
             last_logit = self.apply_repetition_penalty(logits=last_logit, generated_ids=generated_ids, penalty=repetition_penalty)
 
         probas = self.softmax(last_logit, temperature=temperature)
-        indices = probas.copy()
- 
+
         if top_k:
-            indices, probas = self._top_k_probas(probas=probas, k=top_k)
-            next_token_id = int(np.random.choice(indices, p=probas))
-        else:
-            next_token_id = int(np.random.choice(len(indices), p=probas))
-        
-        return next_token_id
+            return self._top_k_probas(probas=probas, k=top_k)
+        return np.arange(len(probas)), probas
     
+    def prefill(self, token_ids: np.array, io_binding: bool=True,
+                reuse_prefix: bool=False, stop_event: Optional[threading.Event]=None) -> np.array:
+        """
+        Processes a tokenized prompt and leaves the KV cache positioned after its last token.
+
+        The first `max_seq_len` tokens run through the CONTEXT graph in a single pass. Prompts that do not
+        fit into the prefill window are continued token by token through CONTEXT_ITER, so prompts longer
+        than the window (e.g. ones embedding a full JSON document) can still be processed.
+
+        With `reuse_prefix`, the tokens already held in the KV cache are compared with the new prompt. When
+        they share a prefix that extends past the CONTEXT window, the cache is rewound to that prefix and
+        only the remaining tokens are processed.
+
+        Args:
+            token_ids (np.array): A 2D array of shape (1, sequence_length) with dtype int64.
+            io_binding (bool): If True, preallocates buffers and IO binding for the CONTEXT_ITER graph.
+            reuse_prefix (bool): If True, keeps the KV cache of a shared token prefix instead of starting over.
+            stop_event (Optional[threading.Event]): Stops processing the remaining tokens once set.
+
+        Returns:
+            np.array: Logits of shape (1, 1, vocab_size) for the last processed token.
+        """
+        if reuse_prefix:
+            logits = self._prefill_from_prefix(token_ids=token_ids, io_binding=io_binding, stop_event=stop_event)
+            if logits is not None:
+                return logits
+
+        self._reset_state()
+
+        window = self.model_params.max_seq_len
+        prompt_ids, overflow_ids = token_ids[:, :window], token_ids[:, window:]
+
+        embedding_output = self.embedding_session(query=prompt_ids)
+        self.verbosity_embedding(token_id=token_ids,
+                                 embed_output=embedding_output.shape,
+                                 verbose=self.verbose)
+        context_output = self.context_session(embedding_session_outputs=embedding_output)
+        logits = self.head_session(ctx_hidden_states=context_output)
+
+        # Positions after the prompt are padding, the prediction comes from the last real token
+        prompt_length = prompt_ids.shape[1]
+        logits = logits[:, prompt_length-1:prompt_length]
+        self.sequence_length = window
+        self.context_token_count = prompt_length
+        self.token_ids = prompt_ids[0].tolist()
+        self.last_logits = logits
+
+        if io_binding:
+            self._io_binding_init(hidden_dimensions=context_output.shape[-1])
+
+        if overflow_ids.shape[1]:
+            logits = self.extend(token_ids=overflow_ids, io_binding=io_binding, stop_event=stop_event)
+
+        return logits
+
+    def extend(self, token_ids: np.array, io_binding: bool=True,
+               stop_event: Optional[threading.Event]=None) -> np.array:
+        """
+        Appends tokens to the current KV cache one at a time through the CONTEXT_ITER graph.
+
+        Args:
+            token_ids (np.array): A 2D array of shape (1, n) with dtype int64.
+            io_binding (bool): If True, runs CONTEXT_ITER through the preallocated IO binding buffers.
+            stop_event (Optional[threading.Event]): Stops before the next token once set. The cache stays
+                consistent with `token_ids` processed so far.
+
+        Returns:
+            np.array: Logits of shape (1, 1, vocab_size) for the last appended token.
+        """
+        for token_id in token_ids[0]:
+            if stop_event is not None and stop_event.is_set():
+                break
+            iter_outputs = self._iter_token(token_id=int(token_id), io_binding=io_binding)
+            self.last_logits = self.head_session(ctx_hidden_states=iter_outputs)
+
+        return self.last_logits
+
+    def _iter_token(self, token_id: int, io_binding: bool) -> np.array:
+        """
+        Appends one token through CONTEXT_ITER and returns its hidden states (1, 1, hidden_size). With IO
+        binding the returned array is the output buffer, which the next call overwrites.
+        """
+        embedding_output = self.embedding_session(query=np.array([[token_id]], dtype=np.int64))
+        if io_binding and self.output_hidden_states_buffer is None:
+            self._io_binding_init(hidden_dimensions=embedding_output.shape[-1])
+        if self.context_policy is not None:
+            self._evict_context()
+        hidden_states = self.context_itr_session(embedding_session_output=embedding_output,
+                                                 previous_sequence_length=self.sequence_length,
+                                                 io_binding=io_binding)
+        self.sequence_length += 1
+        self.token_ids.append(token_id)
+        return hidden_states
+
+    def rewind(self, num_tokens: int) -> None:
+        """
+        Truncates the KV cache so that only the first `num_tokens` processed tokens remain.
+
+        Only tokens appended through CONTEXT_ITER can be dropped; the CONTEXT window is produced in a
+        single pass and cannot be partially rewound.
+
+        Args:
+            num_tokens (int): Number of leading tokens to keep.
+
+        Raises:
+            ValueError: If `num_tokens` reaches into the CONTEXT window or exceeds the cached tokens.
+        """
+        if self.evicted_positions:
+            raise ValueError("Cannot rewind after context positions were evicted")
+        if not self.context_token_count <= num_tokens <= len(self.token_ids):
+            raise ValueError(f"Cannot rewind to {num_tokens} tokens, "
+                             f"valid range is {self.context_token_count}-{len(self.token_ids)}")
+
+        kv_length = self.model_params.max_seq_len + (num_tokens - self.context_token_count)
+        self.kv_cache = {name: np.ascontiguousarray(cache[:, :, :kv_length, :])
+                         for name, cache in self.kv_cache.items()}
+        self.sequence_length = kv_length
+        self.token_ids = self.token_ids[:num_tokens]
+
+    def _evict_context(self, incoming: int=1) -> None:
+        """
+        Drops the KV positions the context policy evicts to make room for `incoming` tokens and shortens the
+        sequence length accordingly. The kept keys after the evicted range are re-rotated so their positions
+        follow the sinks without a gap.
+        """
+        eviction = self.context_policy.eviction(self.sequence_length, incoming=incoming)
+        if eviction is None:
+            return
+
+        start, end = eviction
+        kv_cache = {}
+        for name, cache in self.kv_cache.items():
+            window = cache[:, :, end:self.sequence_length]
+            if name.startswith("past_keys"):
+                window = self.context_policy.shift_positions(window, end - start)
+            kv_cache[name] = np.concatenate([cache[:, :, :start], window], axis=2)
+        self.kv_cache = kv_cache
+        self.sequence_length -= end - start
+        self.evicted_positions += end - start
+
+    def _prefill_from_prefix(self, token_ids: np.array, io_binding: bool=True,
+                             stop_event: Optional[threading.Event]=None) -> Optional[np.array]:
+        """
+        Continues from the cached tokens shared with `token_ids`. Returns None when a full prefill is needed.
+        """
+        cached_ids = self.token_ids
+        new_ids = token_ids[0].tolist()
+        if not cached_ids or self.evicted_positions:
+            return None
+
+        shared = 0
+        for cached_id, new_id in zip(cached_ids, new_ids):
+            if cached_id != new_id:
+                break
+            shared += 1
+
+        if shared == len(cached_ids) == len(new_ids):
+            return self.last_logits
+
+        # At least one token is processed again to obtain fresh logits
+        keep = min(shared, len(new_ids)-1)
+        if keep < self.context_token_count:
+            return None
+
+        self.rewind(num_tokens=keep)
+        remaining_ids = np.array([new_ids[keep:]], dtype=np.int64)
+        return self.extend(token_ids=remaining_ids, io_binding=io_binding, stop_event=stop_event)
+
     def run_inference(self, query: str, 
                       top_k: int, 
                       temperature: float,
                       persona: Optional[str]=None, 
                       max_tokens: int=100,
                       repetition_penalty: float=1.1,
-                      io_binding: bool=True
-                      ) -> List[str]:
+                      io_binding: bool=True,
+                      stream: bool=True,
+                      reuse_prefix: bool=False,
+                      stop_event: Optional[threading.Event]=None,
+                      lookahead: Optional["PromptLookup"]=None,
+                      stop_conditions: Optional["StopConditions"]=None
+                      ) -> str:
         """
         Runs end-to-end autoregressive inference using a multi-stage ONNX model pipeline.
 
@@ -359,75 +686,588 @@ class DeepSeekModelInference():
             max_tokens (int): Maximum number of tokens to generate.
             repetition_penalty (float): Penalizes repetition by adjusting logits for previously seen tokens.
             io_binding (bool): If True, uses preallocated buffers and ONNX IOBinding for inference.
+            stream (bool): If True, prints tokens to stdout as they are generated.
+            reuse_prefix (bool): If True, keeps the KV cache of a prompt prefix prefilled by an earlier call.
+            stop_event (Optional[threading.Event]): Ends generation early once set, returning the tokens so far.
+            lookahead (Optional[PromptLookup]): Speculates with n-gram drafts from the prompt, see `generate`.
+            stop_conditions (Optional[StopConditions]): Ends the answer early, the stop string is cut from the response.
 
         Returns:
-            List[int]: A list of generated token IDs, including the first token and any subsequent tokens until
-                    either `<|end_of_sentence|>` is reached or `max_tokens` is generated.
+            str: The decoded response, from the first generated token until either `<|end_of_sentence|>` is reached,
+                    a stop condition completes or `max_tokens` is generated. `generated_token_count` holds its length
+                    in tokens.
 
         Raises:
             ValueError: If IO binding is enabled but required buffers or manager are not initialized.
         """
-        # Reset internal buffers and state
-        self.kv_cache = {}
-        self.present_key_buffer = {}
-        self.present_value_buffer = {}
-        self.output_hidden_states_buffer = None
+        prompt = self.query(query, persona)
+        logits = self.prefill(token_ids=self.tokenize(prompt), io_binding=io_binding,
+                              reuse_prefix=reuse_prefix, stop_event=stop_event)
 
-        # Iter set to false because this grabs the initial embeddings
-        embedding_output = self.embedding_session(query=query, persona=persona, iter=False)
-        context_output = self.context_session(embedding_session_outputs=embedding_output)
-        logits = self.head_session(ctx_hidden_states=context_output)
-        next_token_id = self.next_token_prediction(logits=logits, generated_ids=logits, temperature=temperature)
+        if stream:
+            logger.info(f"\nInitial Query:\n{query}")
+            logger.info("\nGenerated:\n")
+
+        self.verbose = VerbosityLevel.NONE
+        generated_ids = self.generate(logits=logits, top_k=top_k, temperature=temperature, max_tokens=max_tokens,
+                                      repetition_penalty=repetition_penalty, io_binding=io_binding,
+                                      stream=stream, stop_event=stop_event, lookahead=lookahead,
+                                      stop_conditions=stop_conditions)
+        self.generated_token_count = len(generated_ids)
+
+        final_response = self.tokenizer.decode(generated_ids, skip_special_tokens=True)
+        if stop_conditions is not None:
+            final_response = stop_conditions.trim(final_response)
+
+        return final_response
+
+    def generate(self, logits: np.array,
+                 top_k: int,
+                 temperature: float,
+                 max_tokens: int=100,
+                 repetition_penalty: float=1.1,
+                 io_binding: bool=True,
+                 stream: bool=True,
+                 stop_event: Optional[threading.Event]=None,
+                 lookahead: Optional["PromptLookup"]=None,
+                 stop_conditions: Optional["StopConditions"]=None
+                 ) -> List[int]:
+        """
+        Samples tokens autoregressively, starting from the logits of the last processed token.
+
+        Every sampled token except the last one is appended to the KV cache, so the cache ends right before the
+        final token returned.
+
+        With `lookahead`, continuations found in the prompt and the generated history are proposed as drafts and
+        verified in a single multi-token CONTEXT_ITER pass. Drafts are accepted with the probability the model
+        assigns to them and a rejected draft is replaced by a sample from the remaining distribution, so the
+        output distribution is unchanged. This needs a CONTEXT_ITER graph with a dynamic sequence dimension;
+        with a graph fixed to one token, verifying a draft costs as many runs as decoding it, so plain decoding
+        is used instead.
 
+        With `stop_conditions`, generation also ends once a stop string or stop token sequence completes in the
+        answer, and `</think>` is forced when the think block exhausts its budget.
+
+        Args:
+            logits (np.array): Logits of shape (1, 1, vocab_size) to sample the first token from.
+            top_k (int): Limits token sampling to top-k most probable choices.
+            temperature (float): Sampling temperature; higher values increase randomness.
+            max_tokens (int): Maximum number of tokens to generate after the first one.
+            repetition_penalty (float): Penalizes repetition by adjusting logits for previously seen tokens.
+            io_binding (bool): If True, uses preallocated buffers and ONNX IOBinding for inference.
+            stream (bool): If True, prints tokens to stdout as they are generated.
+            stop_event (Optional[threading.Event]): Ends generation early once set.
+            lookahead (Optional[PromptLookup]): Proposes draft tokens by n-gram lookup.
+            stop_conditions (Optional[StopConditions]): Stop strings, stop token sequences and the think budget.
+
+        Returns:
+            List[int]: The generated token IDs, ending with the end of sentence token if it was sampled, or with
+                the token that completed a stop condition.
+        """
+        if stop_conditions is not None:
+            stop_conditions.start(self.tokenizer, self.token_ids)
+        next_token_id, _ = self._admit(self.next_token_prediction(logits=logits, generated_ids=[], temperature=temperature),
+                                       stop_conditions)
         generated_ids = [next_token_id]
-        prev_sequence_length = self.model_params.max_seq_len
+        end_of_sentence_id = self.tokenizer.token_to_id(END_OF_SENTENCE)
+        sampling = {"temperature": temperature, "top_k": top_k, "repetition_penalty": repetition_penalty}
 
-        if io_binding:
-            self.iBindingManager = IOBindingManager(inference_session=self.session_mapper["CONTEXT_ITER"])
-            _, _, hidden_dimensions = context_output.shape
-            _, num_heads, _, head_dimensions = self.kv_cache.get("past_keys_0").shape
-
-            # Initial Buffer allocation
-            hidden_state_dimensions = (1,1,hidden_dimensions)
-            kv_cache_dimensions = (1, num_heads, prev_sequence_length, head_dimensions)
-            self.output_hidden_states_buffer = self.iBindingManager.buffer_preallocation_hidden_states(buffer_shape=hidden_state_dimensions)
-
-            self.present_key_buffer = self.iBindingManager.buffer_preallocation_kv(buffer_shape=kv_cache_dimensions,
-                                                                         num_layers=ModelParameters.num_layers,
-                                                                         keys_or_values="keys")
-            self.present_value_buffer = self.iBindingManager.buffer_preallocation_kv(buffer_shape=kv_cache_dimensions,
-                                                                           num_layers=ModelParameters.num_layers,
-                                                                           keys_or_values="values")
-        logger.info(f"\nInitial Query:\n{query}")
-        logger.info("\nGenerated:\n")
+        if lookahead is not None and not self.multi_token_iter:
+            logger.info("CONTEXT_ITER runs one token at a time, decoding without prompt lookup")
+            lookahead = None
+        if lookahead is not None:
+            lookahead.reset(self.token_ids + generated_ids)
 
-        self.verbose = VerbosityLevel.NONE
-        for _ in range(max_tokens):
-            
-            input_ids = np.array([[next_token_id]], dtype=np.int64)
-            print(self.tokenizer.decode([next_token_id], skip_special_tokens=True), end="", flush=True)
-            
-            embedding_output = self.embedding_session(query=input_ids)
-            iter_outputs = self.context_itr_session(embedding_session_output=embedding_output,
-                                                    previous_sequence_length=prev_sequence_length,
-                                                    io_binding=io_binding)
-            logits = self.head_session(ctx_hidden_states=iter_outputs)
-            next_token_id = self.next_token_prediction(logits=logits, generated_ids=generated_ids,
-                                                       temperature=temperature, top_k=top_k,
-                                                       repetition_penalty=repetition_penalty)
-            generated_ids.append(next_token_id)
-            prev_sequence_length += 1
-
-            if next_token_id == self.tokenizer.token_to_id("< | end_of_sentence | >"):
+        while len(generated_ids) <= max_tokens:
+            if stop_event is not None and stop_event.is_set():
+                break
+            if next_token_id == end_of_sentence_id:
+                break
+            if stop_conditions is not None and stop_conditions.reason is not None:
                 break
 
-        final_response = self.tokenizer.decode(generated_ids, skip_special_tokens=True)
+            if stream:
+                print(self.tokenizer.decode([next_token_id], skip_special_tokens=True), end="", flush=True)
+
+            forcing = stop_conditions is not None and bool(stop_conditions.forced)
+            draft = []
+            if lookahead is not None and not forcing:
+                max_draft = max_tokens - len(generated_ids)
+                if self.context_policy is not None:
+                    max_draft = min(max_draft, self.context_policy.window - 1)     # The step also appends the next token
+                draft = lookahead.propose(max_draft=max_draft)
+            if draft:
+                new_ids = self._speculate(next_token_id=next_token_id, draft=draft, generated_ids=generated_ids,
+                                          end_of_sentence_id=end_of_sentence_id, lookahead=lookahead,
+                                          stop_conditions=stop_conditions, **sampling)
+                if stream and len(new_ids) > 1:
+                    print(self.tokenizer.decode(new_ids[:-1], skip_special_tokens=True), end="", flush=True)
+            else:
+                logits = self.extend(token_ids=np.array([[next_token_id]], dtype=np.int64), io_binding=io_binding)
+                if forcing:
+                    token_id = stop_conditions.forced.pop(0)
+                else:
+                    token_id = self.next_token_prediction(logits=logits, generated_ids=generated_ids, **sampling)
+                new_ids = [self._admit(token_id, stop_conditions)[0]]
+
+            generated_ids.extend(new_ids)
+            if lookahead is not None:
+                for token_id in new_ids:
+                    lookahead.append(token_id)
+            next_token_id = generated_ids[-1]
+
+        return generated_ids
+
+    @property
+    def multi_token_iter(self) -> bool:
+        """
+        True if the CONTEXT_ITER graph accepts more than one new token per run.
+        """
+        hidden_input = next(node for node in self.session_mapper["CONTEXT_ITER"].get_inputs()
+                            if node.name == "input_hidden_states")
+        return hidden_input.shape[1] != 1
 
-        if io_binding:
+    def extend_many(self, token_ids: List[int]) -> np.array:
+        """
+        Appends several tokens to the KV cache in one CONTEXT_ITER run (requires `multi_token_iter`).
+
+        Args:
+            token_ids (List[int]): The tokens to append.
+
+        Returns:
+            np.array: Logits of shape (1, len(token_ids), vocab_size), one row per appended token.
+        """
+        logits = self.head_session(ctx_hidden_states=self._iter_tokens(token_ids))
+        self.last_logits = logits[:, -1:]
+        return logits
+
+    def _iter_tokens(self, token_ids: List[int]) -> np.array:
+        """
+        Appends several tokens in one CONTEXT_ITER run and returns their hidden states (1, n, hidden_size).
+        """
+        embedding_output = self.embedding_session(query=np.array([token_ids], dtype=np.int64))
+        if self.context_policy is not None:
+            self._evict_context(incoming=len(token_ids))
+
+        iter_inputs = {
+            "input_hidden_states": embedding_output,
+            **self.kv_cache,
+            "past_seq_len": np.array([[self.sequence_length]], dtype=np.int32),
+            "total_seq_len": np.array([self.sequence_length + len(token_ids)], dtype=np.int32),
+        }
+        iter_outputs = self.session_mapper["CONTEXT_ITER"].run(None, iter_inputs)
+        self.kv_cache = self.kv_cache_update(ctx_outputs=iter_outputs)
+
+        self.sequence_length += len(token_ids)
+        self.token_ids.extend(int(token_id) for token_id in token_ids)
+        return iter_outputs[0]
+
+    @staticmethod
+    def _admit(token_id: int, stop_conditions: Optional["StopConditions"]) -> Tuple[int, bool]:
+        if stop_conditions is None:
+            return token_id, False
+        return stop_conditions.admit(token_id)
+
+    def _speculate(self, next_token_id: int, draft: List[int], generated_ids: List[int],
+                   end_of_sentence_id: Optional[int], lookahead: "PromptLookup",
+                   stop_conditions: Optional["StopConditions"]=None, **sampling) -> List[int]:
+        """
+        Verifies `draft` after `next_token_id` in one pass and returns the accepted drafts plus one sampled token.
+        The KV cache keeps `next_token_id` and the accepted drafts, but not the returned final token.
+        """
+        logits = self.extend_many([next_token_id] + draft)
+        lookahead.proposed += len(draft)
+        # Read after the pass, the context policy may have evicted positions before it
+        start_length, start_tokens = self.sequence_length - (len(draft) + 1), len(self.token_ids) - (len(draft) + 1)
+
+        new_ids: List[int] = []
+        for position, draft_id in enumerate(draft):
+            candidate_ids, probas = self.token_distribution(logits=logits[:, position:position+1],
+                                                            generated_ids=generated_ids + new_ids, **sampling)
+            is_draft = candidate_ids == draft_id
+            if np.random.random() < probas[is_draft].sum():
+                lookahead.accepted += 1
+                token_id, halt = self._admit(draft_id, stop_conditions)
+                new_ids.append(token_id)
+                if halt or token_id == end_of_sentence_id:
+                    break
+                continue
+
+            residual = np.where(is_draft, 0.0, probas)
+            token_id = int(np.random.choice(candidate_ids, p=residual/residual.sum()))
+            new_ids.append(self._admit(token_id, stop_conditions)[0])
+            break
+        else:
+            token_id = self.next_token_prediction(logits=logits[:, len(draft):], generated_ids=generated_ids + new_ids,
+                                                  **sampling)
+            new_ids.append(self._admit(token_id, stop_conditions)[0])
+
+        # Drop the rejected drafts from the cache
+        keep = len(new_ids)
+        self.kv_cache = {name: np.ascontiguousarray(cache[:, :, :start_length + keep])
+                         for name, cache in self.kv_cache.items()}
+        self.sequence_length = start_length + keep
+        self.token_ids = self.token_ids[:start_tokens + keep]
+        self.last_logits = logits[:, keep-1:keep]
+
+        return new_ids
+
+    def score(self, texts: Sequence[str], io_binding: bool=True) -> List[TokenScores]:
+        """
+        Computes per-token log-probabilities of texts without sampling, e.g. to rank candidate answers or to
+        compare the perplexity of quantized models.
+
+        All texts are tokenized in one batch. Each text then takes one CONTEXT pass and one HEAD pass over its
+        prefill window, and the log-softmax of all positions is evaluated at once. Only tokens beyond the
+        window go through CONTEXT_ITER, in chunks if the graph takes several tokens per run. The graphs have a
+        fixed batch size of one, so texts are processed one after another; duplicate texts are scored once.
+        The generation state is restored afterwards.
+
+        Args:
+            texts (Sequence[str]): The texts to score, tokenized as they are (no chat template).
+            io_binding (bool): If True, runs CONTEXT_ITER through IO binding for tokens beyond the window.
+
+        Returns:
+            List[TokenScores]: The scores of every text, in order.
+        """
+        encodings = self.tokenizer.encode_batch(list(texts))
+        scores: Dict[Tuple[int, ...], TokenScores] = {}
+
+        with self.state_lock:
+            previous = self.save_state()
+            try:
+                for encoding in encodings:
+                    key = tuple(encoding.ids)
+                    if key not in scores:
+                        scores[key] = self._score_tokens(np.array([encoding.ids], dtype=np.int64), io_binding=io_binding)
+            finally:
+                self.load_state(previous)
+
+        return [scores[tuple(encoding.ids)] for encoding in encodings]
+
+    def _score_tokens(self, token_ids: np.array, io_binding: bool) -> TokenScores:
+        num_tokens = token_ids.shape[1]
+        if num_tokens < 2:
+            return TokenScores(token_ids=token_ids[0], logprobs=np.zeros(0, dtype=np.float32))
+
+        self._reset_state()
+        window = self.model_params.max_seq_len
+        prompt_ids, overflow_ids = token_ids[:, :window], token_ids[:, window:]
+
+        context_output = self.context_session(embedding_session_outputs=self.embedding_session(query=prompt_ids))
+        logits = [self.head_session(ctx_hidden_states=context_output)[0, :prompt_ids.shape[1]]]
+        self.sequence_length = window
+        self.context_token_count = prompt_ids.shape[1]
+        self.token_ids = prompt_ids[0].tolist()
+
+        # The prediction after the last token is not needed
+        overflow = overflow_ids[0, :-1].tolist()
+        if overflow and self.multi_token_iter:
+            for start in range(0, len(overflow), window):
+                logits.append(self.extend_many(overflow[start:start + window])[0])
+        else:
+            for token_id in overflow:
+                logits.append(self.extend(token_ids=np.array([[token_id]], dtype=np.int64), io_binding=io_binding)[0])
+
+        predictions = np.concatenate(logits)[:num_tokens - 1]
+        return TokenScores(token_ids=token_ids[0], logprobs=self.token_logprobs(predictions, token_ids[0, 1:]))
+
+    def embed(self, texts: Sequence[str], pooling: str="mean", output_path: Optional[Path]=None,
+              normalize: bool=False, io_binding: bool=True, dtype: np.dtype=np.float16) -> np.ndarray:
+        """
+        Computes sentence embeddings by pooling the CONTEXT `output_hidden_states` of every text, so the
+        deployed model doubles as an embedding model for retrieval.
+
+        Only the rows of real tokens are pooled, the padding of the CONTEXT window is masked out. Tokens
+        beyond the window are continued through CONTEXT_ITER. The HEAD graph is never run. Texts are tokenized
+        in one batch, duplicates are embedded once and the generation state is restored afterwards.
+
+        Args:
+            texts (Sequence[str]): The texts to embed, tokenized as they are (no chat template).
+            pooling (str): "mean" over all tokens or the "last" token's hidden state.
+            output_path (Optional[Path]): If given, embeddings are written to this `.npy` file through a memory
+                map and the memory-mapped array is returned, so large corpora don't have to fit in memory.
+            normalize (bool): If True, scales every embedding to unit L2 norm for cosine similarity.
+            io_binding (bool): If True, runs CONTEXT_ITER through IO binding for tokens beyond the window.
+            dtype (np.dtype): Storage type of the embeddings.
+
+        Returns:
+            np.ndarray: Embeddings of shape (len(texts), hidden_size).
+
+        Raises:
+            ValueError: If `pooling` is unknown or a text has no tokens.
+        """
+        if pooling not in ("mean", "last"):
+            raise ValueError(f"Unknown pooling '{pooling}', expected 'mean' or 'last'")
+
+        encodings = self.tokenizer.encode_batch(list(texts))
+        embeddings = None
+        first_rows: Dict[Tuple[int, ...], int] = {}
+
+        with self.state_lock:
+            previous = self.save_state()
+            try:
+                for row, encoding in enumerate(encodings):
+                    key = tuple(encoding.ids)
+                    if not key:
+                        raise ValueError(f"Text {row} has no tokens")
+                    if key in first_rows:
+                        embeddings[row] = embeddings[first_rows[key]]
+                        continue
+                    first_rows[key] = row
+
+                    embedding = self._embed_tokens(np.array([encoding.ids], dtype=np.int64), pooling=pooling,
+                                                   io_binding=io_binding)
+                    if normalize:
+                        embedding /= max(np.linalg.norm(embedding), 1e-12)
+                    if embeddings is None:
+                        shape = (len(encodings), embedding.shape[-1])
+                        embeddings = (np.lib.format.open_memmap(output_path, mode="w+", dtype=dtype, shape=shape)
+                                      if output_path is not None else np.empty(shape, dtype=dtype))
+                    embeddings[row] = embedding
+            finally:
+                self.load_state(previous)
+
+        if embeddings is None:
+            return np.empty((0, 0), dtype=dtype)
+        if isinstance(embeddings, np.memmap):
+            embeddings.flush()
+        return embeddings
+
+    def _embed_tokens(self, token_ids: np.array, pooling: str, io_binding: bool) -> np.array:
+        self._reset_state()
+        window = self.model_params.max_seq_len
+        prompt_ids, overflow_ids = token_ids[:, :window], token_ids[:, window:]
+
+        context_output = self.context_session(embedding_session_outputs=self.embedding_session(query=prompt_ids))
+        hidden_states = context_output[0, :prompt_ids.shape[1]]                # Padding rows are masked out
+        total = hidden_states.sum(axis=0, dtype=np.float64)
+        last = hidden_states[-1]
+        self.sequence_length = window
+        self.context_token_count = prompt_ids.shape[1]
+        self.token_ids = prompt_ids[0].tolist()
+
+        overflow = overflow_ids[0].tolist()
+        if overflow and self.multi_token_iter:
+            for start in range(0, len(overflow), window):
+                hidden_states = self._iter_tokens(overflow[start:start + window])[0]
+                total += hidden_states.sum(axis=0, dtype=np.float64)
+                last = hidden_states[-1]
+        else:
+            for token_id in overflow:
+                hidden_states = self._iter_token(token_id=token_id, io_binding=io_binding)[0]
+                total += hidden_states.sum(axis=0, dtype=np.float64)
+                last = hidden_states[-1].copy()
+
+        if pooling == "last":
+            return last.astype(np.float32)
+        return (total/token_ids.shape[1]).astype(np.float32)
+
+    @staticmethod
+    def token_logprobs(logits: np.array, token_ids: np.array) -> np.array:
+        """
+        Numerically stable log-softmax of every row, evaluated only at the given tokens.
+
+        Args:
+            logits (np.array): Logits of shape (n, vocab_size).
+            token_ids (np.array): The token of every row, shape (n,).
+
+        Returns:
+            np.array: log p(token_ids[i] | row i), shape (n,), float32.
+        """
+        row_max = logits.max(axis=-1, keepdims=True)
+        log_normalizer = np.log(np.exp(logits - row_max).sum(axis=-1, dtype=np.float64))
+        token_logits = np.take_along_axis(logits, token_ids[:, None], axis=-1)[:, 0] - row_max[:, 0]
+        return (token_logits - log_normalizer).astype(np.float32)
+
+    def save_state(self) -> GenerationState:
+        """
+        Captures the current KV cache and sequence position without copying the tensors.
+
+        Every step replaces the cache tensors instead of writing into them, so the returned state stays valid
+        while generation continues.
+
+        Returns:
+            GenerationState: The current state.
+        """
+        return GenerationState(kv_cache=dict(self.kv_cache),
+                               sequence_length=self.sequence_length,
+                               context_token_count=self.context_token_count,
+                               token_ids=list(self.token_ids),
+                               last_logits=self.last_logits,
+                               evicted_positions=self.evicted_positions)
+
+    def load_state(self, state: GenerationState) -> None:
+        """
+        Continues from a state returned by `save_state`. The IO binding buffers are rebound on the next step.
+
+        Args:
+            state (GenerationState): The state to continue from.
+        """
+        self.kv_cache = dict(state.kv_cache)
+        self.sequence_length = state.sequence_length
+        self.context_token_count = state.context_token_count
+        self.token_ids = list(state.token_ids)
+        self.last_logits = state.last_logits
+        self.evicted_positions = state.evicted_positions
+        self._reset_io_binding()
+
+    def save_snapshot(self, path: Path, generated_ids: Optional[List[int]]=None, extra: Optional[dict]=None) -> None:
+        """
+        Writes the generation state to a directory so a later process can continue without prefilling.
+
+        All KV tensors and the last logits are concatenated into one raw `kv.bin` file, `state.json` holds
+        their layout together with the sequence position, token ids and NumPy's global RNG state (used for
+        sampling), so a restored run samples exactly like the original one would have.
+
+        Args:
+            path (Path): The snapshot directory, created if needed.
+            generated_ids (Optional[List[int]]): Generated tokens to store alongside the state.
+            extra (Optional[dict]): Additional JSON-serializable data, e.g. conversation messages.
+
+        Raises:
+            ValueError: If there is no state to save.
+        """
+        if not self.kv_cache:
+            raise ValueError("Nothing to snapshot, run a prefill first")
+
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        tensors = dict(self.kv_cache)
+        if self.last_logits is not None:
+            tensors["last_logits"] = self.last_logits
+
+        layout = {}
+        offset = 0
+        with open(path/"kv.bin", "wb") as f:
+            for name, tensor in tensors.items():
+                tensor = np.ascontiguousarray(tensor)
+                padding = -offset % SNAPSHOT_ALIGNMENT
+                f.write(b"\0"*padding)
+                offset += padding
+                tensor.tofile(f)
+                layout[name] = {"offset": offset, "shape": list(tensor.shape), "dtype": tensor.dtype.str}
+                offset += tensor.nbytes
+
+        rng_name, rng_keys, rng_position, rng_has_gauss, rng_gauss = np.random.get_state()
+        state = {
+            "version": SNAPSHOT_VERSION,
+            "model": {"num_layers": self.model_params.num_layers,
+                      "num_key_value_heads": self.model_params.num_key_value_heads,
+                      "attn_head_size": self.model_params.attn_head_size,
+                      "max_seq_len": self.model_params.max_seq_len},
+            "sequence_length": self.sequence_length,
+            "context_token_count": self.context_token_count,
+            "evicted_positions": self.evicted_positions,
+            "token_ids": [int(token_id) for token_id in self.token_ids],
+            "generated_ids": [int(token_id) for token_id in generated_ids or []],
+            "rng": {"name": rng_name, "keys": rng_keys.tolist(), "position": rng_position,
+                    "has_gauss": rng_has_gauss, "gauss": rng_gauss},
+            "tensors": layout,
+            "extra": extra or {},
+        }
+        with open(path/"state.json", "w") as f:
+            json.dump(state, f)
+
+    def restore_snapshot(self, path: Path, restore_rng: bool=True) -> dict:
+        """
+        Continues from a directory written by `save_snapshot`.
+
+        The KV tensors are read-only views into a memory map of `kv.bin`, nothing is copied up front and the
+        operating system pages the cache in as the graphs read it. Combine with `prefill(..., reuse_prefix=True)`
+        to continue from a shared system prompt.
+
+        Args:
+            path (Path): The snapshot directory.
+            restore_rng (bool): If True, NumPy's global RNG continues where the saved run left off.
+
+        Returns:
+            dict: The stored "generated_ids" and "extra" data.
+
+        Raises:
+            ValueError: If the snapshot was written by an incompatible version or model.
+        """
+        path = Path(path)
+        with open(path/"state.json", "r") as f:
+            state = json.load(f)
+
+        if state.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {state.get('version')}, expected {SNAPSHOT_VERSION}")
+        for key, value in state["model"].items():
+            if getattr(self.model_params, key) != value:
+                raise ValueError(f"Snapshot was taken with {key}={value}, this model has {getattr(self.model_params, key)}")
+
+        data = np.memmap(path/"kv.bin", dtype=np.uint8, mode="r")
+        tensors = {}
+        for name, entry in state["tensors"].items():
+            dtype = np.dtype(entry["dtype"])
+            nbytes = int(np.prod(entry["shape"]))*dtype.itemsize
+            tensors[name] = data[entry["offset"]:entry["offset"] + nbytes].view(dtype).reshape(entry["shape"])
+
+        last_logits = tensors.pop("last_logits", None)
+        self.load_state(GenerationState(kv_cache=tensors,
+                                        sequence_length=state["sequence_length"],
+                                        context_token_count=state["context_token_count"],
+                                        token_ids=state["token_ids"],
+                                        last_logits=last_logits,
+                                        evicted_positions=state.get("evicted_positions", 0)))
+        if restore_rng:
+            rng = state["rng"]
+            np.random.set_state((rng["name"], np.array(rng["keys"], dtype=np.uint32), rng["position"],
+                                 rng["has_gauss"], rng["gauss"]))
+
+        return {"generated_ids": state["generated_ids"], "extra": state["extra"]}
+
+    def conversation(self, persona: Optional[str]=None, io_binding: bool=True) -> "Conversation":
+        """
+        Starts a multi-turn conversation that keeps its own KV cache, see Conversation.
+        """
+        return Conversation(inference=self, persona=persona, io_binding=io_binding)
+
+    def _reset_state(self) -> None:
+        """
+        Clears the KV cache, IO binding buffers and sequence length before a new prompt.
+        """
+        self.kv_cache = {}
+        self.sequence_length = 0
+        self.context_token_count = 0
+        self.token_ids = []
+        self.last_logits = None
+        self.evicted_positions = 0
+        self._reset_io_binding()
+
+    def _reset_io_binding(self) -> None:
+        """
+        Drops the IO binding buffers and bindings, they are allocated again for the current KV cache on the next step.
+        """
+        self.present_key_buffer = {}
+        self.present_value_buffer = {}
+        self.output_hidden_states_buffer = None
+        if hasattr(self, "iBindingManager"):
             self.iBindingManager.clear_all_bindings()
 
-        return final_response
-    
+    def _io_binding_init(self, hidden_dimensions: int) -> None:
+        """
+        Creates the IO binding manager and preallocates the CONTEXT_ITER output buffers.
+
+        Args:
+            hidden_dimensions (int): Size of the hidden state produced by the context graphs.
+        """
+        self.iBindingManager = IOBindingManager(inference_session=self.session_mapper["CONTEXT_ITER"])
+        _, num_heads, _, head_dimensions = self.kv_cache.get("past_keys_0").shape
+
+        # Initial Buffer allocation
+        hidden_state_dimensions = (1,1,hidden_dimensions)
+        kv_cache_dimensions = (1, num_heads, self.sequence_length, head_dimensions)
+        self.output_hidden_states_buffer = self.iBindingManager.buffer_preallocation_hidden_states(buffer_shape=hidden_state_dimensions)
+
+        self.present_key_buffer = self.iBindingManager.buffer_preallocation_kv(buffer_shape=kv_cache_dimensions,
+                                                                     num_layers=self.model_params.num_layers,
+                                                                     keys_or_values="keys")
+        self.present_value_buffer = self.iBindingManager.buffer_preallocation_kv(buffer_shape=kv_cache_dimensions,
+                                                                       num_layers=self.model_params.num_layers,
+                                                                       keys_or_values="values")
+
     def kv_cache_update(self, ctx_outputs):
         """
         Updates the key-value (KV) cache based on the output of a transformer model context pass.
@@ -656,6 +1496,381 @@ class DeepSeekModelInference():
             case _:
                 pass
 
+class PromptLookup():
+    """
+    Proposes draft tokens for speculative decoding by n-gram lookup in the prompt and generated history
+    ("prompt lookup decoding"), without a draft model.
+
+    A hash index maps every n-gram (min_ngram <= n <= max_ngram) to the position after its latest occurrence.
+    The longest suffix of the history found in the index proposes the tokens that followed it, which pays off
+    whenever the output copies spans of the prompt (code edits, summaries, JSON echoes).
+
+    Args:
+        max_ngram (int): Longest suffix that is matched.
+        min_ngram (int): Shortest suffix that is matched.
+        max_draft (int): Most tokens proposed at once.
+
+    Attributes:
+        proposed (int): Draft tokens proposed so far.
+        accepted (int): Draft tokens accepted so far.
+    """
+
+    def __init__(self, max_ngram: int=3, min_ngram: int=1, max_draft: int=8):
+        if not 0 < min_ngram <= max_ngram:
+            raise ValueError(f"Need 0 < min_ngram <= max_ngram, got {min_ngram} and {max_ngram}")
+        self.max_ngram = max_ngram
+        self.min_ngram = min_ngram
+        self.max_draft = max_draft
+        self.proposed = 0
+        self.accepted = 0
+        self.reset([])
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepted/self.proposed if self.proposed else 0.0
+
+    def reset(self, token_ids: List[int]) -> None:
+        self.tokens: List[int] = []
+        self.index: Dict[Tuple[int, ...], int] = {}
+        for token_id in token_ids:
+            self.append(token_id)
+
+    def append(self, token_id: int) -> None:
+        # Register the n-grams ending right before this token, their continuation starts here
+        position = len(self.tokens)
+        for n in range(self.min_ngram, min(self.max_ngram, position) + 1):
+            self.index[tuple(self.tokens[position - n:position])] = position
+        self.tokens.append(int(token_id))
+
+    def propose(self, max_draft: Optional[int]=None) -> List[int]:
+        """
+        Returns:
+            List[int]: Up to `max_draft` tokens that followed the longest matching suffix, or an empty list.
+        """
+        max_draft = self.max_draft if max_draft is None else min(max_draft, self.max_draft)
+        if max_draft <= 0:
+            return []
+        for n in range(min(self.max_ngram, len(self.tokens)), self.min_ngram - 1, -1):
+            start = self.index.get(tuple(self.tokens[-n:]))
+            if start is not None:
+                return self.tokens[start:start + max_draft]
+        return []
+
+
+class AhoCorasick():
+    """
+    Streaming multi-pattern matcher (Aho-Corasick automaton) over any hashable symbols, e.g. the characters of
+    stop strings or the IDs of stop token sequences.
+
+    Every symbol is fed once and advances a single automaton state, so the cost per generated token does not
+    grow with the number of patterns or with how much text was generated.
+
+    Args:
+        patterns (Sequence[Sequence[Hashable]]): The non-empty patterns to find.
+    """
+
+    def __init__(self, patterns: Sequence[Sequence[Hashable]]):
+        self.patterns = [tuple(pattern) for pattern in patterns]
+        if any(len(pattern) == 0 for pattern in self.patterns):
+            raise ValueError("Patterns must not be empty")
+
+        self.transitions: List[Dict[Hashable, int]] = [{}]
+        self.outputs: List[List[int]] = [[]]
+        for index, pattern in enumerate(self.patterns):
+            node = 0
+            for symbol in pattern:
+                if symbol not in self.transitions[node]:
+                    self.transitions.append({})
+                    self.outputs.append([])
+                    self.transitions[node][symbol] = len(self.transitions) - 1
+                node = self.transitions[node][symbol]
+            self.outputs[node].append(index)
+
+        # Breadth first, so the failure node of a parent is final before its children are linked
+        self.failure = [0]*len(self.transitions)
+        queue = list(self.transitions[0].values())
+        for node in queue:
+            for symbol, child in self.transitions[node].items():
+                fallback = self.failure[node]
+                while fallback and symbol not in self.transitions[fallback]:
+                    fallback = self.failure[fallback]
+                self.failure[child] = self.transitions[fallback].get(symbol, 0) if node else 0
+                self.outputs[child] = self.outputs[child] + self.outputs[self.failure[child]]
+                queue.append(child)
+
+        self.state = 0
+
+    def reset(self) -> None:
+        self.state = 0
+
+    def feed(self, symbol: Hashable) -> List[int]:
+        """
+        Returns:
+            List[int]: Indices of the patterns ending at this symbol.
+        """
+        node = self.state
+        while node and symbol not in self.transitions[node]:
+            node = self.failure[node]
+        self.state = self.transitions[node].get(symbol, 0)
+        return self.outputs[self.state]
+
+
+@dataclass
+class StopConditions:
+    """
+    Ends generation as soon as the answer is complete and bounds the reasoning of the think block.
+
+    Stop strings are matched on the decoded text and stop sequences on the token IDs, both with one
+    Aho-Corasick automaton, so tokens are checked as they are sampled instead of re-scanning the text.
+    They only apply to the answer, text inside the think block never stops generation. Once the think
+    block has used `think_budget` tokens, `</think>` is forced in place of the next sampled token.
+
+    Attributes:
+        stop_strings (Sequence[str]): Texts that end generation, the matching text is kept in the token IDs.
+        stop_token_ids (Sequence[Sequence[int]]): Token ID sequences that end generation.
+        think_budget (Optional[int]): Tokens allowed inside the think block, None for no limit.
+        think_start (str): Text opening the think block.
+        think_end (str): Text closing the think block, forced when the budget is exhausted.
+        reason (Optional[str]): "stop_string", "stop_tokens" or None, set when a stop condition matched.
+        matched (Optional[str]): The stop string that matched.
+        think_tokens (int): Tokens generated inside the current think block.
+    """
+    stop_strings: Sequence[str] = ()
+    stop_token_ids: Sequence[Sequence[int]] = ()
+    think_budget: Optional[int] = None
+    think_start: str = THINK_START
+    think_end: str = THINK_END
+
+    reason: Optional[str] = field(default=None, init=False)
+    matched: Optional[str] = field(default=None, init=False)
+    think_tokens: int = field(default=0, init=False)
+
+    def __post_init__(self):
+        if self.think_budget is not None and self.think_budget < 0:
+            raise ValueError(f"think_budget must be at least 0, got {self.think_budget}")
+        self._text_matcher = AhoCorasick([*self.stop_strings, self.think_start, self.think_end])
+        self._token_matcher = AhoCorasick(self.stop_token_ids) if self.stop_token_ids else None
+        self._tokenizer = None
+        self.thinking = False
+        self.forced: List[int] = []
+
+    def start(self, tokenizer, prompt_ids: List[int]) -> None:
+        """
+        Resets the matchers for a new generation.
+
+        Args:
+            tokenizer: The tokenizer used to decode the generated tokens.
+            prompt_ids (List[int]): Tokens already processed, to tell whether generation starts inside a think block.
+        """
+        self._tokenizer = tokenizer
+        self._text_matcher.reset()
+        if self._token_matcher is not None:
+            self._token_matcher.reset()
+        self._undecoded: List[int] = []
+        self._think_forced = False
+        self.reason = self.matched = None
+        self.think_tokens = 0
+        self.forced = []
+
+        prompt = tokenizer.decode(prompt_ids[-64:], skip_special_tokens=False)
+        self.thinking = prompt.rfind(self.think_start) > prompt.rfind(self.think_end)
+
+    def admit(self, token_id: int) -> Tuple[int, bool]:
+        """
+        Checks a sampled token, possibly replacing it with the start of a forced `</think>`.
+
+        Args:
+            token_id (int): The sampled token.
+
+        Returns:
+            Tuple[int, bool]: The token to emit, and True if no further tokens should be taken from the same
+                step, because generation stops or forced tokens follow.
+        """
+        replaced = False
+        if (self.thinking and not self._think_forced and self.think_budget is not None
+                and self.think_tokens >= self.think_budget):
+            self.forced = self._tokenizer.encode(self.think_end, add_special_tokens=False).ids
+            token_id = self.forced.pop(0)
+            self._think_forced = replaced = True
+
+        self._observe(token_id)
+        return token_id, replaced or self.reason is not None
+
+    def _observe(self, token_id: int) -> None:
+        if self.thinking:
+            self.think_tokens += 1
+        elif self._token_matcher is not None and self._token_matcher.feed(token_id):
+            self.reason = "stop_tokens"
+
+        # Decode once the bytes of a character are complete, byte level tokens can split a character
+        self._undecoded.append(token_id)
+        text = self._tokenizer.decode(self._undecoded, skip_special_tokens=False)
+        if text.endswith("\ufffd") and len(self._undecoded) < 4:
+            return
+        self._undecoded = []
+
+        num_stop_strings = len(self.stop_strings)
+        for character in text:
+            for index in self._text_matcher.feed(character):
+                if index == num_stop_strings:
+                    self.thinking, self.think_tokens, self._think_forced = True, 0, False
+                elif index == num_stop_strings + 1:
+                    self.thinking = False
+                elif not self.thinking and self.reason is None:
+                    self.reason, self.matched = "stop_string", self.stop_strings[index]
+
+    def trim(self, text: str) -> str:
+        """
+        Cuts a decoded answer before the stop string that ended it.
+        """
+        if self.matched is None:
+            return text
+        answer_start = text.rfind(self.think_end) + len(self.think_end) if self.think_end in text else 0
+        position = text.find(self.matched, answer_start)
+        return text[:position] if position >= 0 else text
+
+
+class Conversation():
+    """
+    A multi-turn chat that keeps its KV cache between turns.
+
+    The first message is prefilled like a single query. Every later message only appends its own tokens
+    (and the end of the previous answer) to the retained cache through CONTEXT_ITER, so a turn costs time
+    proportional to the new message instead of re-processing the whole history.
+
+    Several conversations can share one DeepSeekModelInference: each owns a GenerationState that is swapped
+    in for the duration of a turn, and the model's previous state is restored afterwards.
+
+    Args:
+        inference (DeepSeekModelInference): The model to chat with.
+        persona (Optional[str]): Optional persona applied to the first message.
+        io_binding (bool): If True, uses preallocated buffers and ONNX IOBinding for inference.
+
+    Attributes:
+        state (Optional[GenerationState]): The KV cache and tokens of the conversation so far.
+        messages (List[Tuple[str, str]]): ("user" | "assistant", text) for every turn.
+    """
+
+    def __init__(self, inference: DeepSeekModelInference,
+                 persona: Optional[str]=None,
+                 io_binding: bool=True):
+        self.inference = inference
+        self.persona = persona
+        self.io_binding = io_binding
+        self.state: Optional[GenerationState] = None
+        self.messages: List[Tuple[str, str]] = []
+        self._pending_ids: List[int] = []                                   # Sampled or sent tokens not in the KV cache yet
+
+    @property
+    def token_count(self) -> int:
+        return len(self.state.token_ids) + len(self._pending_ids) if self.state is not None else 0
+
+    def send(self, message: str,
+             top_k: int=10,
+             temperature: float=0.6,
+             max_tokens: int=100,
+             repetition_penalty: float=1.1,
+             stream: bool=False,
+             stop_event: Optional[threading.Event]=None,
+             lookahead: Optional[PromptLookup]=None,
+             stop_conditions: Optional[StopConditions]=None
+             ) -> str:
+        """
+        Adds a user message and generates the assistant's answer.
+
+        Args:
+            message (str): The user's message.
+            top_k (int): Limits token sampling to top-k most probable choices.
+            temperature (float): Sampling temperature; higher values increase randomness.
+            max_tokens (int): Maximum number of tokens to generate.
+            repetition_penalty (float): Penalizes repetition by adjusting logits for previously seen tokens.
+            stream (bool): If True, prints tokens to stdout as they are generated.
+            stop_event (Optional[threading.Event]): Ends the turn early once set.
+            lookahead (Optional[PromptLookup]): Speculates with n-gram drafts from the conversation, see
+                DeepSeekModelInference.generate.
+            stop_conditions (Optional[StopConditions]): Ends the answer early, the stop string is cut from it.
+
+        Returns:
+            str: The decoded answer.
+        """
+        inference = self.inference
+        with inference.state_lock:
+            previous = inference.save_state()
+            try:
+                if self.state is None:
+                    turn_ids = inference.tokenize(inference.query(message, self.persona))[0].tolist()
+                    inference.prefill(token_ids=np.array([turn_ids], dtype=np.int64), io_binding=self.io_binding,
+                                      stop_event=stop_event)
+                else:
+                    turn_ids = self._pending_ids + self._follow_up_ids(message)
+                    inference.load_state(self.state)
+                    inference.extend(token_ids=np.array([turn_ids], dtype=np.int64), io_binding=self.io_binding,
+                                     stop_event=stop_event)
+
+                processed = len(inference.token_ids) - (len(self.state.token_ids) if self.state is not None else 0)
+                self.messages.append(("user", message))
+                if processed < len(turn_ids):
+                    self._pending_ids = turn_ids[processed:]
+                    self.state = inference.save_state()
+                    return ""
+
+                generated_ids = inference.generate(logits=inference.last_logits, top_k=top_k, temperature=temperature,
+                                                   max_tokens=max_tokens, repetition_penalty=repetition_penalty,
+                                                   io_binding=self.io_binding, stream=stream, stop_event=stop_event,
+                                                   lookahead=lookahead, stop_conditions=stop_conditions)
+                self._pending_ids = generated_ids[-1:]
+                self.state = inference.save_state()
+            finally:
+                inference.load_state(previous)
+
+        answer = inference.tokenizer.decode(generated_ids, skip_special_tokens=True)
+        if stop_conditions is not None:
+            answer = stop_conditions.trim(answer)
+        self.messages.append(("assistant", answer))
+        return answer
+
+    def save(self, path: Path) -> None:
+        """
+        Snapshots the conversation, see DeepSeekModelInference.save_snapshot.
+
+        Raises:
+            ValueError: If nothing has been sent yet.
+        """
+        if self.state is None:
+            raise ValueError("Nothing to snapshot, the conversation has no turns yet")
+        with self.inference.state_lock:
+            previous = self.inference.save_state()
+            try:
+                self.inference.load_state(self.state)
+                self.inference.save_snapshot(path, generated_ids=self._pending_ids,
+                                             extra={"persona": self.persona, "messages": self.messages})
+            finally:
+                self.inference.load_state(previous)
+
+    @classmethod
+    def restore(cls, inference: DeepSeekModelInference, path: Path, io_binding: bool=True) -> "Conversation":
+        """
+        Continues a conversation saved with `save`, without prefilling its history.
+        """
+        with inference.state_lock:
+            previous = inference.save_state()
+            try:
+                stored = inference.restore_snapshot(path)
+                conversation = cls(inference=inference, persona=stored["extra"].get("persona"), io_binding=io_binding)
+                conversation.state = inference.save_state()
+            finally:
+                inference.load_state(previous)
+
+        conversation.messages = [tuple(message) for message in stored["extra"].get("messages", [])]
+        conversation._pending_ids = stored["generated_ids"]
+        return conversation
+
+    def _follow_up_ids(self, message: str) -> List[int]:
+        end_of_sentence_id = self.inference.tokenizer.token_to_id(END_OF_SENTENCE)
+        closing = END_OF_SENTENCE if end_of_sentence_id is not None and self._pending_ids[-1:] != [end_of_sentence_id] else ""
+        return self.inference.tokenize(closing + self.inference.query(message))[0].tolist()
+
+
 class IOBindingManager():
     def __init__(self, inference_session: ort.InferenceSession):
         self.session = inference_session
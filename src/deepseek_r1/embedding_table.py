@@ -0,0 +1,417 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+
+import numpy as np
+import logging
+import mmap
+
+from typing import Dict, List, Optional, Tuple, Union
+from pathlib import Path
+from dataclasses import dataclass, field
+
+from onnx_protobuf import LENGTH_DELIMITED, VARINT, fields, read_varint, string
+
+logger = logging.getLogger(__name__)
+
+# TensorProto.DataType values that can back an embedding table
+ONNX_DTYPES = {
+    1: np.float32,
+    2: np.uint8,
+    3: np.int8,
+    4: np.uint16,
+    5: np.int16,
+    6: np.int32,
+    7: np.int64,
+    10: np.float16,
+    11: np.float64,
+}
+
+def _repeated_varints(buffer: memoryview, wire_type: int, value: Union[int, Tuple[int, int]]) -> List[int]:
+    if wire_type == VARINT:
+        return [value]
+    values, position = [], value[0]
+    while position < value[1]:
+        number, position = read_varint(buffer, position)
+        values.append(number)
+    return values
+
+
+@dataclass
+class _Tensor:
+    name: str = ""
+    dims: List[int] = field(default_factory=list)
+    data_type: int = 0
+    raw_data: Optional[Tuple[int, int]] = None
+    typed_data: Optional[Tuple[int, Tuple[int, int]]] = None
+    external_data: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class _Node:
+    op_type: str
+    inputs: List[str]
+    outputs: List[str]
+    attributes: Dict[str, int]
+
+
+def _parse_tensor(buffer: memoryview, span: Tuple[int, int]) -> _Tensor:
+    tensor = _Tensor()
+    for number, wire_type, value in fields(buffer, *span):
+        if number == 1:
+            tensor.dims.extend(_repeated_varints(buffer, wire_type, value))
+        elif number == 2:
+            tensor.data_type = value
+        elif number == 8:
+            tensor.name = string(buffer, value)
+        elif number == 9:
+            tensor.raw_data = value
+        elif number in (4, 5, 7, 10) and wire_type == LENGTH_DELIMITED:
+            tensor.typed_data = (number, value)
+        elif number == 13:
+            entry = {key_number: string(buffer, entry_value) for key_number, _, entry_value in fields(buffer, *value)}
+            tensor.external_data[entry.get(1, "")] = entry.get(2, "")
+    return tensor
+
+
+def _parse_node(buffer: memoryview, span: Tuple[int, int]) -> _Node:
+    node = _Node(op_type="", inputs=[], outputs=[], attributes={})
+    for number, _, value in fields(buffer, *span):
+        if number == 1:
+            node.inputs.append(string(buffer, value))
+        elif number == 2:
+            node.outputs.append(string(buffer, value))
+        elif number == 4:
+            node.op_type = string(buffer, value)
+        elif number == 5:
+            attribute = {attribute_number: attribute_value for attribute_number, _, attribute_value in fields(buffer, *value)}
+            if 1 in attribute and 3 in attribute:                                               # Integer attributes such as axis
+                name = string(buffer, attribute[1])
+                node.attributes[name] = attribute[3] - (1 << 64) if attribute[3] >= 1 << 63 else attribute[3]
+    return node
+
+
+def _value_names(buffer: memoryview, span: Tuple[int, int]) -> str:
+    return next(string(buffer, value) for number, _, value in fields(buffer, *span) if number == 1)
+
+
+def _tensor_type(buffer: memoryview, span: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+    """
+    Returns the span of a ValueInfoProto's type.tensor_type, or None if it is not a tensor.
+    """
+    for number, _, type_span in fields(buffer, *span):
+        if number != 2:
+            continue
+        for type_number, _, tensor_span in fields(buffer, *type_span):
+            if type_number == 1:
+                return tensor_span
+    return None
+
+
+def _value_elem_type(buffer: memoryview, span: Tuple[int, int]) -> Optional[int]:
+    """
+    Returns the TensorProto.DataType of a ValueInfoProto (type.tensor_type.elem_type), or None if it is not a tensor.
+    """
+    tensor_span = _tensor_type(buffer, span)
+    if tensor_span is None:
+        return None
+    return next((elem_type for number, _, elem_type in fields(buffer, *tensor_span) if number == 1), None)
+
+
+def _value_rank(buffer: memoryview, span: Tuple[int, int]) -> Optional[int]:
+    """
+    Returns the number of dimensions of a ValueInfoProto (type.tensor_type.shape), or None if it has no shape.
+    """
+    tensor_span = _tensor_type(buffer, span)
+    if tensor_span is None:
+        return None
+    shape_span = next((value for number, _, value in fields(buffer, *tensor_span) if number == 2), None)
+    if shape_span is None:
+        return None
+    return sum(1 for number, _, _ in fields(buffer, *shape_span) if number == 1)
+
+
+class EmbeddingTable():
+    """
+    Serves token embeddings with a NumPy gather instead of an EMBEDDING session call.
+
+    The EMBEDDING graph of the DeepSeek models is a single Gather on a (vocab_size, hidden_size) table, optionally
+    followed or preceded by a DequantizeLinear. `from_onnx` reads that table and its dequantization parameters
+    straight from the protobuf file and memory-maps the table bytes, so only the rows that are looked up are ever
+    paged in. Lookups write into a preallocated buffer, which makes a decode step one fancy-index plus an in-place
+    dequantization, without the dictionary marshalling and graph dispatch of an ONNX Runtime `run`. The protobuf
+    walk reads from the same lazily paged file mapping, so the file is never read into memory as a whole.
+
+    Args:
+        weights (np.ndarray): The (vocab_size, hidden_size) table, quantized or float.
+        scale (Optional[np.ndarray]): Dequantization scale, a scalar or one value per index along `axis`.
+        zero_point (Optional[np.ndarray]): Dequantization zero point, shaped like `scale`.
+        max_tokens (int): Number of rows the preallocated output buffer holds before it grows.
+        dtype (np.dtype): Output dtype, matching the EMBEDDING graph's output.
+        axis (int): Table axis a non-scalar `scale` and `zero_point` run along, 0 for one value per row
+            (vocab_size,) and 1 for one per column (hidden_size,). Defaults to 1, DequantizeLinear's default.
+
+    Attributes:
+        vocab_size (int): Number of rows in the table.
+        hidden_size (int): Width of every embedding.
+    """
+
+    def __init__(self, weights: np.ndarray,
+                 scale: Optional[np.ndarray]=None,
+                 zero_point: Optional[np.ndarray]=None,
+                 max_tokens: int=64,
+                 dtype: np.dtype=np.float32,
+                 axis: int=1):
+        if weights.ndim != 2:
+            raise ValueError(f"Expected a (vocab_size, hidden_size) embedding table but got {weights.shape}")
+        if axis not in (-2, -1, 0, 1):
+            raise ValueError(f"Axis {axis} is out of range for a (vocab_size, hidden_size) embedding table")
+        self.weights = weights
+        self.vocab_size, self.hidden_size = weights.shape
+        self.dtype = np.dtype(dtype)
+        self.axis = axis % 2
+        self.row_scale = False
+
+        self.scale = self._dequantization_parameter(scale, "scale")
+        self.zero_point = self._dequantization_parameter(zero_point, "zero_point")
+        self._buffer = np.empty((1, max_tokens, self.hidden_size), dtype=self.dtype)
+
+    def _dequantization_parameter(self, value: Optional[np.ndarray], name: str) -> Optional[np.ndarray]:
+        if value is None:
+            return None
+        value = np.asarray(value, dtype=np.float32)
+        if value.size == 1:
+            return value.reshape(())
+        if value.ndim != 1 or value.size != self.weights.shape[self.axis]:
+            raise ValueError(f"{name} of shape {value.shape} does not match axis {self.axis} of a "
+                             f"{self.weights.shape} embedding table")
+        self.row_scale = self.axis == 0
+        return value
+
+    @classmethod
+    def from_onnx(cls, model_path: Union[str, Path], max_tokens: int=64) -> "EmbeddingTable":
+        """
+        Extracts the embedding table from an EMBEDDING ONNX graph.
+
+        Args:
+            model_path (Union[str, Path]): The EMBEDDING .onnx file.
+            max_tokens (int): Initial size of the output buffer in tokens.
+
+        Returns:
+            EmbeddingTable: A table whose lookups match the graph's outputs.
+
+        Raises:
+            ValueError: If the graph is not a (dequantized) Gather of an initializer, or its dequantization axis and
+                parameter shapes don't match the table, so the session must be used.
+        """
+        model_path = Path(model_path)
+        with open(model_path, "rb") as f:
+            if model_path.stat().st_size == 0:
+                raise ValueError(f"{model_path} is empty")
+            buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+        graph_span = next((value for number, _, value in fields(buffer) if number == 7), None)
+        if graph_span is None:
+            raise ValueError(f"{model_path} has no graph")
+
+        nodes: List[_Node] = []
+        initializers: Dict[str, _Tensor] = {}
+        graph_inputs: List[str] = []
+        input_ranks: Dict[str, Optional[int]] = {}
+        graph_outputs: List[str] = []
+        output_elem_type: Optional[int] = None
+        for number, _, value in fields(buffer, *graph_span):
+            if number == 1:
+                nodes.append(_parse_node(buffer, value))
+            elif number == 5:
+                tensor = _parse_tensor(buffer, value)
+                initializers[tensor.name] = tensor
+            elif number == 11:
+                graph_inputs.append(_value_names(buffer, value))
+                input_ranks[graph_inputs[-1]] = _value_rank(buffer, value)
+            elif number == 12:
+                graph_outputs.append(_value_names(buffer, value))
+                output_elem_type = _value_elem_type(buffer, value)
+
+        producers = {output: node for node in nodes for output in node.outputs}
+        gathers = [node for node in nodes if node.op_type == "Gather" and node.inputs[1] in graph_inputs
+                   and node.attributes.get("axis", 0) == 0]
+        if len(gathers) != 1 or len(graph_outputs) != 1:
+            raise ValueError(f"{model_path} is not a single Gather over token ids")
+        gather = gathers[0]
+
+        def load(name: str) -> np.ndarray:
+            if name not in initializers:
+                raise ValueError(f"'{name}' is computed in the graph, expected an initializer")
+            return cls._load_tensor(buffer, initializers[name], model_path)
+
+        def dequantize_parameters(node: _Node, rank: Optional[int],
+                                  table_axes: Dict[int, int]) -> Tuple[np.ndarray, Optional[np.ndarray], int]:
+            """
+            Loads the scale and zero point of a DequantizeLinear whose input has `rank` dimensions, and maps its
+            axis attribute onto the table with `table_axes` (input axis -> table axis).
+            """
+            scale = load(node.inputs[1])
+            zero_point = load(node.inputs[2]) if len(node.inputs) > 2 and node.inputs[2] else None
+            if scale.size == 1:
+                return scale, zero_point, 1
+            axis = node.attributes.get("axis", 1)
+            if axis < 0 and rank is not None:
+                axis += rank
+            if axis not in table_axes:
+                raise ValueError(f"{model_path} dequantizes along axis {node.attributes.get('axis', 1)}, "
+                                 f"which is not an axis of the embedding table")
+            return scale, zero_point, table_axes[axis]
+
+        # Either DequantizeLinear(table) -> Gather or Gather(table) -> DequantizeLinear
+        scale = zero_point = None
+        axis = 1
+        table_name = gather.inputs[0]
+        if table_name in producers:
+            dequantize = producers[table_name]
+            if dequantize.op_type != "DequantizeLinear":
+                raise ValueError(f"Unsupported {dequantize.op_type} before the embedding Gather")
+            table_name = dequantize.inputs[0]
+            scale, zero_point, axis = dequantize_parameters(dequantize, 2, {0: 0, 1: 1})
+            output = gather.outputs[0]
+        else:
+            consumers = [node for node in nodes if gather.outputs[0] in node.inputs]
+            output = gather.outputs[0]
+            if consumers:
+                if len(consumers) != 1 or consumers[0].op_type != "DequantizeLinear":
+                    raise ValueError(f"Unsupported {consumers[0].op_type} after the embedding Gather")
+                # The gathered embeddings have the token ids' dimensions followed by the hidden dimension
+                ids_rank = input_ranks.get(gather.inputs[1])
+                rank = None if ids_rank is None else ids_rank + 1
+                hidden_axes = {-1: 1} if rank is None else {rank - 1: 1}
+                scale, zero_point, axis = dequantize_parameters(consumers[0], rank, hidden_axes)
+                output = consumers[0].outputs[0]
+        if output != graph_outputs[0]:
+            raise ValueError(f"{model_path} transforms the embeddings after the Gather")
+
+        weights = load(table_name)
+        if output_elem_type in ONNX_DTYPES:
+            dtype = np.dtype(ONNX_DTYPES[output_elem_type])
+        elif scale is None:
+            dtype = weights.dtype
+        else:
+            dtype = scale.dtype                                                             # DequantizeLinear outputs the scale's type
+        logger.info(f"Mapped {weights.shape} {weights.dtype} embedding table from {model_path.name}")
+        return cls(weights=weights, scale=scale, zero_point=zero_point, max_tokens=max_tokens, dtype=dtype, axis=axis)
+
+    @staticmethod
+    def _load_tensor(buffer: memoryview, tensor: _Tensor, model_path: Path) -> np.ndarray:
+        """
+        Memory-maps raw tensor bytes in place (inline or external data) and decodes typed fields otherwise.
+        Large inline tensors are views of the mapping `buffer` was parsed from.
+        """
+        if tensor.data_type not in ONNX_DTYPES:
+            raise ValueError(f"Unsupported ONNX data type {tensor.data_type} for '{tensor.name}'")
+        dtype = np.dtype(ONNX_DTYPES[tensor.data_type]).newbyteorder("<")
+        shape = tuple(tensor.dims)
+        count = int(np.prod(shape)) if shape else 1
+
+        if tensor.external_data:
+            location = model_path.parent/tensor.external_data["location"]
+            offset = int(tensor.external_data.get("offset", 0))
+            return np.memmap(location, dtype=dtype, mode="r", offset=offset, shape=shape)
+
+        if tensor.raw_data is not None:
+            start, end = tensor.raw_data
+            if end - start != count*dtype.itemsize:
+                raise ValueError(f"'{tensor.name}' holds {end - start} bytes, expected {count*dtype.itemsize}")
+            if count*dtype.itemsize >= 1 << 16:
+                return np.ndarray(shape, dtype=dtype, buffer=buffer.obj, offset=start)
+            return np.frombuffer(buffer[start:end], dtype=dtype).reshape(shape).copy()
+
+        if tensor.typed_data is not None:
+            number, (start, end) = tensor.typed_data
+            if number == 4:
+                values = np.frombuffer(buffer[start:end], dtype="<f4")
+            elif number == 10:
+                values = np.frombuffer(buffer[start:end], dtype="<f8")
+            else:
+                values = np.array(_repeated_varints(buffer, LENGTH_DELIMITED, (start, end)), dtype=np.int64)
+                if tensor.data_type == 10:                                                      # float16 stored as uint16 bit patterns
+                    return values.astype(np.uint16).view(np.float16).reshape(shape)
+            return values.astype(dtype).reshape(shape)
+
+        return np.zeros(shape, dtype=dtype)
+
+    def lookup(self, token_ids: np.ndarray) -> np.ndarray:
+        """
+        Gathers and dequantizes the embeddings of `token_ids`.
+
+        The result is a view of an internal buffer that the next lookup overwrites, the same way IO binding
+        reuses its output buffers. Copy it if it must outlive the next call.
+
+        Args:
+            token_ids (np.ndarray): A (1, n) int64 array of token ids.
+
+        Returns:
+            np.ndarray: Embeddings of shape (1, n, hidden_size).
+
+        Raises:
+            ValueError: If a token id is outside the vocabulary.
+        """
+        ids = np.asarray(token_ids).reshape(-1)
+        if ids.size and (ids.min() < 0 or ids.max() >= self.vocab_size):
+            raise ValueError(f"Token ids must be in [0, {self.vocab_size}), got {ids.min()}..{ids.max()}")
+
+        if ids.size > self._buffer.shape[1]:
+            self._buffer = np.empty((1, ids.size, self.hidden_size), dtype=self.dtype)
+        out = self._buffer[0, :ids.size]
+
+        out[...] = self.weights[ids]
+        if self.zero_point is not None:
+            out -= self.zero_point[ids, None] if self.row_scale else self.zero_point
+        if self.scale is not None:
+            out *= self.scale[ids, None] if self.row_scale else self.scale
+
+        return self._buffer[:, :ids.size]
+
+    def verify(self, session, token_ids: Optional[np.ndarray]=None, atol: float=1e-5) -> bool:
+        """
+        Compares lookups against the EMBEDDING session for a few token ids.
+
+        Args:
+            session (ort.InferenceSession): The EMBEDDING session.
+            token_ids (Optional[np.ndarray]): A (1, n) array of ids to compare, defaults to the first, middle and last id.
+            atol (float): Absolute tolerance.
+
+        Returns:
+            bool: True if both produce the same embeddings with the same dtype.
+        """
+        if token_ids is None:
+            token_ids = np.array([[0, self.vocab_size // 2, self.vocab_size - 1]], dtype=np.int64)
+        expected = session.run(None, {"input_ids": token_ids})[0]
+        actual = self.lookup(token_ids)
+        return (expected.shape == actual.shape and expected.dtype == actual.dtype
+                and bool(np.allclose(expected, actual, atol=atol)))
+
+
+def load_embedding_table(model_path: Union[str, Path], session=None, max_tokens: int=64) -> Optional[EmbeddingTable]:
+    """
+    Builds an EmbeddingTable for an EMBEDDING graph, or returns None when the session has to be used instead.
+
+    Args:
+        model_path (Union[str, Path]): The EMBEDDING .onnx file.
+        session (Optional[ort.InferenceSession]): If given, the table is only used when it reproduces the session's outputs.
+        max_tokens (int): Initial size of the output buffer in tokens.
+
+    Returns:
+        Optional[EmbeddingTable]: The table, or None if the graph can't be served by a lookup.
+    """
+    try:
+        table = EmbeddingTable.from_onnx(model_path, max_tokens=max_tokens)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Using the EMBEDDING session, direct lookup unavailable: {e}")
+        return None
+
+    if session is not None and not table.verify(session):
+        logger.warning("Using the EMBEDDING session, direct lookup does not match its outputs")
+        return None
+
+    return table
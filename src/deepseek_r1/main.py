@@ -14,7 +14,9 @@ import time
 import numpy as np
 
 from model_loader import ModelLoader
-from deepseek_model_inference import DeepSeekModelInference
+from model_residency import ModelResidency
+from deepseek_model_inference import Conversation, DeepSeekModelInference, PromptLookup, SinkWindowPolicy, StopConditions
+from embedding_table import load_embedding_table
 
 # from deepseek_model_inference import ModelInference
 
@@ -77,6 +79,58 @@ def main():
                         type=bool,
                         default=True,
                         help="Implementing IO Binding")
+    parser.add_argument("--embedding_lookup",
+                        action=argparse.BooleanOptionalAction,
+                        default=True,
+                        help="Gather embeddings from the memory-mapped table instead of running the EMBEDDING graph")
+
+    parser.add_argument("--context_window",
+                        type=int,
+                        default=None,
+                        help="Keep only this many recent KV positions (plus the sink tokens) during long generations")
+    parser.add_argument("--sink_tokens",
+                        type=int,
+                        default=4,
+                        help="Leading KV positions that are never evicted with --context_window")
+    parser.add_argument("--chat",
+                        action="store_true",
+                        help="Keep chatting after the first answer, follow-ups reuse the conversation's KV cache")
+    parser.add_argument("--snapshot",
+                        type=str,
+                        default=None,
+                        help="Chat snapshot directory, resumed if it exists and saved when the chat ends")
+    parser.add_argument("--score",
+                        type=str,
+                        default=None,
+                        help="Text file to score line by line, prints each line's perplexity instead of generating")
+    parser.add_argument("--embed",
+                        type=str,
+                        default=None,
+                        help="Text file to embed line by line instead of generating")
+    parser.add_argument("--embed_output",
+                        type=str,
+                        default="embeddings.npy",
+                        help="float16 .npy file the --embed results are written to")
+    parser.add_argument("--pooling",
+                        choices=["mean", "last"],
+                        default="mean",
+                        help="How --embed pools the hidden states of a text")
+    parser.add_argument("--memory_budget_mb",
+                        type=int,
+                        default=None,
+                        help="Load graphs on demand and release the least recently used ones beyond this budget, CONTEXT and CONTEXT_ITER still share their weights")
+    parser.add_argument("--stop",
+                        action="append",
+                        default=[],
+                        help="End the answer at this text, can be given several times")
+    parser.add_argument("--think_budget",
+                        type=int,
+                        default=None,
+                        help="Tokens the model may spend inside <think> before </think> is forced")
+    parser.add_argument("--lookahead",
+                        type=int,
+                        default=0,
+                        help="Speculate up to this many tokens copied from the prompt per pass (needs a CONTEXT_ITER graph with a dynamic sequence length)")
 
     args = parser.parse_args()
 
@@ -87,15 +141,80 @@ def main():
     model_subdirectory = iLoad.model_subdirectory_path
 
     graphs = iLoad.graphs
-    model_sessions = {graph_name: iLoad.load_model(graph,htp_performance_mode="sustained_high_performance") for graph_name,graph in graphs.items() if str(graph).endswith(".onnx")}
+    if args.memory_budget_mb:
+        residency = ModelResidency(budget_bytes=args.memory_budget_mb*2**20)
+        # Every token runs EMBEDDING, CONTEXT_ITER and HEAD, keep them resident together so decoding never reloads.
+        # CONTEXT and CONTEXT_ITER still load as one session group, so they share their weights within the budget.
+        model_sessions = residency.register_model(iLoad, working_set=("EMBEDDING", "CONTEXT_ITER", "HEAD"),
+                                                  session_group=("CONTEXT", "CONTEXT_ITER"),
+                                                  htp_performance_mode="sustained_high_performance")
+    else:
+        # CONTEXT and CONTEXT_ITER hold the same transformer weights, load them as a group so they are resident once
+        shared_graphs = {graph_name: graphs[graph_name] for graph_name in ("CONTEXT", "CONTEXT_ITER")}
+        session_group = iLoad.load_session_group(shared_graphs, htp_performance_mode="sustained_high_performance")
+        model_sessions = {graph_name: iLoad.load_model(graph,htp_performance_mode="sustained_high_performance") for graph_name,graph in graphs.items() if str(graph).endswith(".onnx") and graph_name not in shared_graphs}
+        model_sessions.update(session_group.sessions)
     tokenizer = next((file for file in graphs.values() if file.endswith("tokenizer.json")), None)
     meta_data = graphs["META_DATA"]
+    embedding_table = None
+    if args.embedding_lookup:
+        embedding_table = load_embedding_table(model_subdirectory/graphs["EMBEDDING"], session=model_sessions["EMBEDDING"],
+                                               max_tokens=meta_data["max_seq_len"])
+
+    context_policy = None
+    if args.context_window:
+        context_policy = SinkWindowPolicy(sink_tokens=args.sink_tokens, window=args.context_window,
+                                          evict_chunk=max(1, min(64, args.context_window//8)))
 
     iInfer = DeepSeekModelInference(model_sessions=model_sessions,
                                     tokenizer= tokenizer,
                                     model_subdirectory=model_subdirectory,
                                     model_meta=meta_data,
-                                    verbose=args.verbose)
+                                    verbose=args.verbose,
+                                    embedding_table=embedding_table,
+                                    context_policy=context_policy)
+    lookahead = PromptLookup(max_draft=args.lookahead) if args.lookahead > 0 else None
+    stop_conditions = None
+    if args.stop or args.think_budget is not None:
+        stop_conditions = StopConditions(stop_strings=args.stop, think_budget=args.think_budget)
+    if args.score:
+        texts = [line.rstrip("\n") for line in open(args.score, encoding="utf-8") if line.strip()]
+        start = time.time()
+        scores = iInfer.score(texts, io_binding=args.io_binding)
+        for text, score in zip(texts, scores):
+            print(f"{score.perplexity:10.3f}  {text}")
+        num_tokens = sum(len(score.logprobs) for score in scores)
+        total_logprob = sum(score.total_logprob for score in scores)
+        print(f"\nPerplexity: {np.exp(-total_logprob/max(num_tokens, 1)):.3f} over {num_tokens} tokens "
+              f"in {time.time() - start:.1f}s")
+        return
+
+    if args.embed:
+        texts = [line.rstrip("\n") for line in open(args.embed, encoding="utf-8") if line.strip()]
+        start = time.time()
+        embeddings = iInfer.embed(texts, pooling=args.pooling, output_path=Path(args.embed_output),
+                                  normalize=True, io_binding=args.io_binding)
+        print(f"Wrote {embeddings.shape} embeddings to {args.embed_output} in {time.time() - start:.1f}s")
+        return
+
+    if args.chat:
+        if args.snapshot and (Path(args.snapshot)/"state.json").exists():
+            conversation = Conversation.restore(iInfer, Path(args.snapshot), io_binding=args.io_binding)
+            logger.info(f"Resumed a conversation of {conversation.token_count} tokens")
+            message = input("\n>> ").strip()
+        else:
+            conversation = iInfer.conversation(persona=args.persona, io_binding=args.io_binding)
+            message = args.query
+        while message:
+            conversation.send(message, top_k=args.top_k, temperature=args.temperature,
+                              max_tokens=args.max_tokens, repetition_penalty=args.repetition_penalty, stream=True,
+                              lookahead=lookahead, stop_conditions=stop_conditions)
+            print(f"\n[{conversation.token_count} tokens in context]")
+            message = input("\n>> ").strip()
+        if args.snapshot and conversation.state is not None:
+            conversation.save(Path(args.snapshot))
+        return
+
     start = time.time()
     iInfer.run_inference(query=args.query,
                          top_k=args.top_k,
@@ -103,10 +222,14 @@ def main():
                          persona=args.persona,
                          max_tokens=args.max_tokens,
                          repetition_penalty=args.repetition_penalty,
-                         io_binding=args.io_binding)
+                         io_binding=args.io_binding,
+                         lookahead=lookahead,
+                         stop_conditions=stop_conditions)
     end = time.time()
+    if lookahead is not None and lookahead.proposed:
+        logger.info(f"Prompt lookup accepted {lookahead.accepted}/{lookahead.proposed} drafted tokens")
     elapsed = end - start
-    tps = np.round((args.max_tokens / elapsed),2)
+    tps = np.round((iInfer.generated_token_count / elapsed),2)
     print(f"\nTokens Per Second: {tps}")
 
 if __name__=="__main__":
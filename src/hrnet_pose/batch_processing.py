@@ -0,0 +1,310 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import json
+import logging
+import queue
+import threading
+import time
+
+import cv2 as cv
+import numpy as np
+
+from dataclasses import dataclass
+from onnxruntime import InferenceSession
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+from keypoint_decoding import decode_heatmaps
+from preprocessing import FramePreprocessor
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+
+def iter_frames(path: Union[str, Path]) -> Iterator[Tuple[str, int, np.ndarray]]:
+    """
+    Decodes the frames of a video file, an image file or every image in a directory.
+
+    Parameters:
+    ----------
+    path : Union[str, Path]
+        A video file, an image file or a directory of images (sorted by name).
+
+    Returns:
+    -------
+    Iterator[Tuple[str, int, np.ndarray]]
+        (source, frame index, BGR frame) for every decoded frame.
+
+    Raises:
+    ------
+    ValueError
+        If the path does not exist or cannot be decoded.
+    """
+    path = Path(path)
+    if path.is_dir():
+        for image_path in sorted(p for p in path.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES):
+            frame = cv.imread(str(image_path))
+            if frame is None:
+                raise ValueError(f"Can't decode image {image_path}")
+            yield (str(image_path), 0, frame)
+    elif path.suffix.lower() in IMAGE_SUFFIXES:
+        frame = cv.imread(str(path))
+        if frame is None:
+            raise ValueError(f"Can't decode image {path}")
+        yield (str(path), 0, frame)
+    elif path.is_file():
+        cap = cv.VideoCapture(str(path))
+        if not cap.isOpened():
+            raise ValueError(f"Error while trying to open video - {path}")
+        try:
+            index = 0
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield (str(path), index, frame)
+                index += 1
+        finally:
+            cap.release()
+    else:
+        raise ValueError(f"Input {path} does not exist")
+
+
+class FrameReader():
+    """
+    Decodes frames from a list of inputs on a background thread.
+
+    Unlike the live pipeline nothing is dropped: the bounded queue only keeps decoding a few frames
+    ahead of inference and blocks the reader when inference falls behind.
+    """
+    _END = object()
+
+    def __init__(self, paths: List[Union[str, Path]], queue_size: int=64) -> None:
+        self.paths = paths
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._stop_event = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._read, name="pose-reader", daemon=True)
+
+    def __iter__(self) -> Iterator[Tuple[str, int, np.ndarray]]:
+        self._thread.start()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is self._END:
+                    break
+                yield item
+        finally:
+            self._stop_event.set()
+            self._thread.join()
+
+        if self._error is not None:
+            raise self._error
+
+    def _put(self, item: Any) -> bool:
+        while not self._stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read(self) -> None:
+        try:
+            for path in self.paths:
+                for item in iter_frames(path):
+                    if not self._put(item):
+                        return
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._put(self._END)
+
+
+class JsonlKeypointWriter():
+    """
+    Streams one JSON object per frame: {"source", "frame", "keypoints": [[y, x, confidence], ...]}.
+    """
+    def __init__(self, path: Union[str, Path]) -> None:
+        self._file = open(path, "w")
+
+    def write(self, source: str, frame_index: int, keypoints: np.ndarray) -> None:
+        record = {"source": source, "frame": frame_index, "keypoints": np.round(keypoints, 3).tolist()}
+        self._file.write(json.dumps(record) + "\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "JsonlKeypointWriter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+class NpzKeypointWriter():
+    """
+    Collects keypoints and saves them as arrays "keypoints" (N, K, 3), "sources" (N,) and "frames" (N,).
+    """
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = path
+        self._keypoints: List[np.ndarray] = []
+        self._sources: List[str] = []
+        self._frames: List[int] = []
+
+    def write(self, source: str, frame_index: int, keypoints: np.ndarray) -> None:
+        self._keypoints.append(keypoints)
+        self._sources.append(source)
+        self._frames.append(frame_index)
+
+    def close(self) -> None:
+        np.savez_compressed(self.path, keypoints=np.asarray(self._keypoints, dtype=np.float32),
+                            sources=np.asarray(self._sources), frames=np.asarray(self._frames, dtype=np.int64))
+
+    def __enter__(self) -> "NpzKeypointWriter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+def open_writer(path: Union[str, Path]) -> Union[JsonlKeypointWriter, NpzKeypointWriter]:
+    """
+    Raises:
+    ------
+    ValueError
+        If the output is neither .jsonl nor .npz.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == ".jsonl":
+        return JsonlKeypointWriter(path)
+    if suffix == ".npz":
+        return NpzKeypointWriter(path)
+    raise ValueError(f"Unsupported output {path}, expected a .jsonl or .npz file")
+
+
+@dataclass
+class BatchStats:
+    frames: int
+    batches: int
+    seconds: float
+
+    @property
+    def fps(self) -> float:
+        return self.frames/self.seconds if self.seconds > 0 else 0.0
+
+
+class BatchPoseProcessor():
+    """
+    Runs HRNet over recorded footage at throughput rate, several frames per session call.
+
+    Keypoints are returned in the coordinates of the original frames. If the graph has a fixed batch
+    dimension that size is used, partially filled batches are padded with the previous frames and the
+    padding results are discarded.
+    """
+    def __init__(self, session: InferenceSession, batch_size: int=8, refinement: str="quarter") -> None:
+        """
+        Parameters:
+        ----------
+        session : InferenceSession
+            The HRNet session.
+        batch_size : int, optional
+            Frames per session call when the graph's batch dimension is dynamic (default is 8).
+        refinement : str, optional
+            Sub-pixel keypoint refinement, see decode_heatmaps (default is "quarter").
+        """
+        self.session = session
+        self.refinement = refinement
+        self._input = session.get_inputs()[0]
+        _, _, self.height, self.width = self._input.shape
+
+        graph_batch = self._input.shape[0]
+        self.fixed_batch = isinstance(graph_batch, int)
+        if self.fixed_batch and graph_batch != batch_size:
+            logger.info(f"Model has a fixed batch size of {graph_batch}, ignoring batch_size={batch_size}")
+        self.batch_size = graph_batch if self.fixed_batch else batch_size
+
+        self.preprocessor = FramePreprocessor(height=self.height, width=self.width, batch_size=self.batch_size)
+
+    def infer(self, frames: List[np.ndarray]) -> np.ndarray:
+        """
+        Parameters:
+        ----------
+        frames : List[np.ndarray]
+            Up to batch_size BGR frames of any size.
+
+        Returns:
+        -------
+        np.ndarray
+            Keypoints (len(frames), K, 3) as (y, x, confidence) in frame coordinates.
+        """
+        for index, frame in enumerate(frames):
+            self.preprocessor.fill(index, frame)
+
+        batch = self.preprocessor.batch(self.batch_size if self.fixed_batch else len(frames))
+        heatmaps = self.session.run(None, {self._input.name: batch})[0][:len(frames)]
+        keypoints = decode_heatmaps(heatmaps, refinement=self.refinement)
+
+        # Heatmap to original frame coordinates, frames may differ in size
+        heatmap_height, heatmap_width = heatmaps.shape[2:]
+        sizes = np.array([frame.shape[:2] for frame in frames], dtype=np.float32)
+        keypoints[..., 0] *= (sizes[:, 0]/heatmap_height)[:, None]
+        keypoints[..., 1] *= (sizes[:, 1]/heatmap_width)[:, None]
+
+        return keypoints
+
+    def process(self, paths: List[Union[str, Path]], writer: Any, queue_size: int=64,
+                log_interval: float=10.0) -> BatchStats:
+        """
+        Decodes all inputs on a reader thread, runs them in batches and streams keypoints to `writer`.
+
+        Parameters:
+        ----------
+        paths : List[Union[str, Path]]
+            Video files, image files or image directories.
+        writer : Any
+            An object with `write(source, frame_index, keypoints)`, e.g. from open_writer.
+        queue_size : int, optional
+            Frames decoded ahead of inference (default is 64).
+        log_interval : float, optional
+            Seconds between progress log lines (default is 10.0).
+
+        Returns:
+        -------
+        BatchStats
+            Processed frame and batch counts and the elapsed time.
+        """
+        start = last_log = time.perf_counter()
+        frames_done = batches = 0
+        pending: List[Tuple[str, int, np.ndarray]] = []
+
+        def flush() -> None:
+            nonlocal frames_done, batches, last_log
+            keypoints = self.infer([frame for _, _, frame in pending])
+            for (source, frame_index, _), frame_keypoints in zip(pending, keypoints):
+                writer.write(source, frame_index, frame_keypoints)
+            frames_done += len(pending)
+            batches += 1
+            pending.clear()
+
+            now = time.perf_counter()
+            if log_interval and now - last_log >= log_interval:
+                last_log = now
+                logger.info(f"Processed {frames_done} frames ({frames_done/(now - start):.1f} FPS)")
+
+        for item in FrameReader(paths, queue_size=queue_size):
+            pending.append(item)
+            if len(pending) == self.batch_size:
+                flush()
+        if pending:
+            flush()
+
+        stats = BatchStats(frames=frames_done, batches=batches, seconds=time.perf_counter() - start)
+        logger.info(f"Processed {stats.frames} frames in {stats.seconds:.1f}s ({stats.fps:.1f} FPS)")
+
+        return stats
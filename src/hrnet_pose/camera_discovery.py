@@ -0,0 +1,286 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import logging
+import platform
+import re
+import threading
+import time
+
+import cv2 as cv
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMMON_RESOLUTIONS: Tuple[Tuple[int, int], ...] = ((320, 240), (640, 480), (800, 600), (1280, 720), (1920, 1080))
+_LOG_LEVEL_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class CameraMode:
+    width: int
+    height: int
+    fps: float
+
+
+@dataclass
+class CameraInfo:
+    index: int
+    name: str
+    path: Optional[str] = None
+    modes: List[CameraMode] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        modes = ", ".join(f"{mode.width}x{mode.height}@{mode.fps:g}" for mode in self.modes)
+        return f"{self.index}: {self.name}" + (f" [{modes}]" if modes else "")
+
+
+@contextmanager
+def quiet_opencv() -> Iterator[None]:
+    """
+    Silences OpenCV's own logging while probing, e.g. the warnings of indices without a camera.
+
+    OPENCV_LOG_LEVEL is only read when OpenCV initializes, so the level is changed through cv.utils.logging
+    and restored afterwards instead.
+    """
+    with _LOG_LEVEL_LOCK:
+        previous = cv.utils.logging.getLogLevel()
+        cv.utils.logging.setLogLevel(cv.utils.logging.LOG_LEVEL_SILENT)
+        try:
+            yield
+        finally:
+            cv.utils.logging.setLogLevel(previous)
+
+
+def list_video_devices(dev_directory: str="/dev", sysfs_directory: str="/sys/class/video4linux") -> List[CameraInfo]:
+    """
+    Lists V4L2 capture devices from /dev/video* and their sysfs metadata without opening them.
+
+    A UVC camera usually registers several nodes, only the one with sysfs index 0 delivers frames, the
+    others carry metadata and are skipped.
+
+    Parameters:
+    ----------
+    dev_directory : str, optional
+        Directory holding the device nodes (default is "/dev").
+    sysfs_directory : str, optional
+        The video4linux sysfs class directory (default is "/sys/class/video4linux").
+
+    Returns:
+    -------
+    List[CameraInfo]
+        Capture devices by index, without modes.
+    """
+    devices: List[CameraInfo] = []
+    for node in Path(dev_directory).glob("video*"):
+        match = re.fullmatch(r"video(\d+)", node.name)
+        if match is None:
+            continue
+
+        metadata = Path(sysfs_directory)/node.name
+        if _read_text(metadata/"index", "0") != "0":
+            continue
+        index = int(match.group(1))
+        devices.append(CameraInfo(index=index, name=_read_text(metadata/"name", f"Camera {index}"), path=str(node)))
+
+    return sorted(devices, key=lambda device: device.index)
+
+
+def _read_text(path: Path, default: str) -> str:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return default
+
+
+def probe_camera(index: int, opener: Callable[[int], Any]=cv.VideoCapture,
+                 resolutions: Tuple[Tuple[int, int], ...]=COMMON_RESOLUTIONS) -> Optional[List[CameraMode]]:
+    """
+    Opens a camera once and records the capture modes it accepts.
+
+    Parameters:
+    ----------
+    index : int
+        The camera index for OpenCV.
+    opener : Callable[[int], Any], optional
+        Creates the capture (default is cv.VideoCapture).
+    resolutions : Tuple[Tuple[int, int], ...], optional
+        (width, height) requests to try, the driver snaps each to a mode it supports (default is COMMON_RESOLUTIONS).
+
+    Returns:
+    -------
+    Optional[List[CameraMode]]
+        The distinct modes sorted by size, or None if the camera can't be opened.
+    """
+    cap = opener(index)
+    try:
+        if not cap.isOpened():
+            return None
+
+        modes: List[CameraMode] = []
+        for width, height in resolutions:
+            cap.set(cv.CAP_PROP_FRAME_WIDTH, width)
+            cap.set(cv.CAP_PROP_FRAME_HEIGHT, height)
+            mode = CameraMode(width=int(cap.get(cv.CAP_PROP_FRAME_WIDTH)), height=int(cap.get(cv.CAP_PROP_FRAME_HEIGHT)),
+                              fps=float(cap.get(cv.CAP_PROP_FPS)))
+            if mode.width > 0 and mode.height > 0 and mode not in modes:
+                modes.append(mode)
+
+        return sorted(modes, key=lambda mode: (mode.width*mode.height, -mode.fps))
+    finally:
+        cap.release()
+
+
+def select_mode(modes: List[CameraMode], height: int, width: int, min_fps: float=0.0) -> Optional[CameraMode]:
+    """
+    Picks the smallest capture mode that still covers the model input, so frames need the least resizing.
+
+    Parameters:
+    ----------
+    modes : List[CameraMode]
+        The camera's modes.
+    height : int
+        Model input height.
+    width : int
+        Model input width.
+    min_fps : float, optional
+        Modes below this frame rate are only used if nothing else covers the input (default is 0.0).
+
+    Returns:
+    -------
+    Optional[CameraMode]
+        The chosen mode, the largest one if none covers the input, or None without modes.
+    """
+    if not modes:
+        return None
+
+    covering = [mode for mode in modes if mode.width >= width and mode.height >= height]
+    fast = [mode for mode in covering if mode.fps >= min_fps]
+    candidates = fast or covering
+    if not candidates:
+        return max(modes, key=lambda mode: (mode.width*mode.height, mode.fps))
+
+    return min(candidates, key=lambda mode: (mode.width*mode.height, -mode.fps))
+
+
+class CameraDiscovery():
+    """
+    Finds cameras without probing indices one after another.
+
+    On Linux the candidates come from /dev/video* and sysfs, so indices without a device are never opened.
+    Elsewhere indices 0..max_cameras-1 are tried. Every candidate is probed on its own thread and the
+    whole discovery is bounded by `timeout`, so a slow or hanging driver can't stall start-up. Results are
+    cached for `cache_seconds`, and on Linux until the set of device nodes changes.
+    """
+    def __init__(self, max_cameras: int=5, timeout: float=3.0, cache_seconds: float=60.0,
+                 opener: Callable[[int], Any]=cv.VideoCapture, resolutions: Tuple[Tuple[int, int], ...]=COMMON_RESOLUTIONS,
+                 dev_directory: str="/dev", sysfs_directory: str="/sys/class/video4linux",
+                 use_sysfs: Optional[bool]=None) -> None:
+        """
+        Parameters:
+        ----------
+        max_cameras : int, optional
+            Indices probed when device nodes can't be listed (default is 5).
+        timeout : float, optional
+            Seconds to wait for all probes, cameras still probing afterwards are left out (default is 3.0).
+        cache_seconds : float, optional
+            How long results are reused (default is 60.0).
+        opener : Callable[[int], Any], optional
+            Creates a capture for an index (default is cv.VideoCapture).
+        resolutions : Tuple[Tuple[int, int], ...], optional
+            Resolutions requested to discover capture modes (default is COMMON_RESOLUTIONS).
+        dev_directory : str, optional
+            Directory holding the device nodes (default is "/dev").
+        sysfs_directory : str, optional
+            The video4linux sysfs class directory (default is "/sys/class/video4linux").
+        use_sysfs : bool, optional
+            Whether to list device nodes instead of probing indices (default is True on Linux).
+        """
+        self.max_cameras = max_cameras
+        self.timeout = timeout
+        self.cache_seconds = cache_seconds
+        self.opener = opener
+        self.resolutions = resolutions
+        self.dev_directory = dev_directory
+        self.sysfs_directory = sysfs_directory
+        self.use_sysfs = platform.system() == "Linux" if use_sysfs is None else use_sysfs
+
+        self._cache: Optional[Tuple[float, Tuple[str, ...], List[CameraInfo]]] = None
+        self._lock = threading.Lock()
+
+    def cameras(self, refresh: bool=False) -> List[CameraInfo]:
+        """
+        Parameters:
+        ----------
+        refresh : bool, optional
+            Ignores cached results (default is False).
+
+        Returns:
+        -------
+        List[CameraInfo]
+            Cameras that opened within the timeout, by index, with their capture modes.
+        """
+        with self._lock:
+            nodes = self._device_nodes()
+            if not refresh and self._cache is not None:
+                cached_at, cached_nodes, cameras = self._cache
+                if time.monotonic() - cached_at < self.cache_seconds and cached_nodes == nodes:
+                    return cameras
+
+            cameras = self._discover()
+            self._cache = (time.monotonic(), nodes, cameras)
+            return cameras
+
+    def camera(self, index: int) -> Optional[CameraInfo]:
+        return next((camera for camera in self.cameras() if camera.index == index), None)
+
+    def _device_nodes(self) -> Tuple[str, ...]:
+        if not self.use_sysfs:
+            return ()
+        return tuple(sorted(node.name for node in Path(self.dev_directory).glob("video*")))
+
+    def _candidates(self) -> List[CameraInfo]:
+        if self.use_sysfs:
+            devices = list_video_devices(self.dev_directory, self.sysfs_directory)
+            if devices or Path(self.sysfs_directory).exists():
+                return devices
+        return [CameraInfo(index=index, name=f"Camera {index}") for index in range(self.max_cameras)]
+
+    def _discover(self) -> List[CameraInfo]:
+        candidates = self._candidates()
+        results: Dict[int, Optional[List[CameraMode]]] = {}
+
+        def probe(camera: CameraInfo) -> None:
+            try:
+                results[camera.index] = probe_camera(camera.index, opener=self.opener, resolutions=self.resolutions)
+            except Exception as e:
+                logger.debug(f"Probing camera {camera.index} failed: {e}")
+                results[camera.index] = None
+
+        # Daemon threads, a capture stuck in its driver can't be interrupted but mustn't keep the app alive
+        threads = [threading.Thread(target=probe, args=(camera,), name=f"camera-probe-{camera.index}", daemon=True)
+                   for camera in candidates]
+        with quiet_opencv():
+            for thread in threads:
+                thread.start()
+            deadline = time.monotonic() + self.timeout
+            for thread in threads:
+                thread.join(max(deadline - time.monotonic(), 0))
+
+        cameras: List[CameraInfo] = []
+        for camera, thread in zip(candidates, threads):
+            if thread.is_alive():
+                logger.warning(f"Camera {camera.index} did not respond within {self.timeout}s, skipping it")
+                continue
+            modes = results.get(camera.index)
+            if modes is not None:
+                camera.modes = modes
+                cameras.append(camera)
+
+        return cameras
@@ -0,0 +1,126 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import cv2 as cv
+import numpy as np
+
+REFINEMENTS = ("none", "quarter", "taylor")
+MAX_BLUR_CHANNELS = 512                                                                         # OpenCV's channel limit per image
+
+
+def decode_heatmaps(heatmaps: np.ndarray, refinement: str="quarter", scale: float=1.0) -> np.ndarray:
+    """
+    Decodes keypoints from HRNet heatmaps for all joints at once.
+
+    Parameters:
+    ----------
+    heatmaps : np.ndarray
+        Heatmaps of shape (K, H, W) or batched (N, K, H, W).
+    refinement : str, optional
+        Sub-pixel refinement of the arg-max location (default is "quarter"):
+        "none" keeps the integer peak, "quarter" moves a quarter pixel towards the higher neighbour,
+        "taylor" takes a second order Taylor step on the smoothed log heatmap.
+    scale : float, optional
+        Factor from heatmap to output coordinates, e.g. model input size / heatmap size (default is 1.0).
+
+    Returns:
+    -------
+    np.ndarray
+        Keypoints of shape (K, 3) or (N, K, 3) holding (y, x, confidence), where confidence is the
+        heatmap peak value.
+
+    Raises:
+    ------
+    ValueError
+        If the heatmaps are not 3 or 4 dimensional or the refinement is unknown.
+    """
+    if refinement not in REFINEMENTS:
+        raise ValueError(f"Unknown refinement '{refinement}', expected one of {REFINEMENTS}")
+    if heatmaps.ndim not in (3, 4):
+        raise ValueError(f"Expected heatmaps of shape (K, H, W) or (N, K, H, W) but got {heatmaps.shape}")
+
+    batched = heatmaps.ndim == 4
+    if not batched:
+        heatmaps = heatmaps[None]
+    n, k, height, width = heatmaps.shape
+
+    # One arg-max over every joint of every image
+    flat = heatmaps.reshape(n, k, height*width)
+    peak_index = np.argmax(flat, axis=2)
+    confidence = np.take_along_axis(flat, peak_index[..., None], axis=2)[..., 0]
+    y, x = np.divmod(peak_index, width)
+    coordinates = np.stack([y, x], axis=-1).astype(np.float32)
+
+    if refinement == "quarter":
+        coordinates += _quarter_offsets(heatmaps, y, x)
+    elif refinement == "taylor":
+        coordinates += _taylor_offsets(heatmaps, y, x)
+
+    keypoints = np.empty((n, k, 3), dtype=np.float32)
+    keypoints[..., :2] = coordinates*scale
+    keypoints[..., 2] = confidence
+
+    return keypoints if batched else keypoints[0]
+
+
+def _neighbours(heatmaps: np.ndarray, y: np.ndarray, x: np.ndarray, dy: int, dx: int) -> np.ndarray:
+    """Values at (y + dy, x + dx) per joint, with coordinates clamped to the heatmap."""
+    n, k, height, width = heatmaps.shape
+    yy = np.clip(y + dy, 0, height - 1)
+    xx = np.clip(x + dx, 0, width - 1)
+
+    return heatmaps[np.arange(n)[:, None], np.arange(k)[None, :], yy, xx]
+
+
+def _quarter_offsets(heatmaps: np.ndarray, y: np.ndarray, x: np.ndarray) -> np.ndarray:
+    _, _, height, width = heatmaps.shape
+
+    diff_y = _neighbours(heatmaps, y, x, 1, 0) - _neighbours(heatmaps, y, x, -1, 0)
+    diff_x = _neighbours(heatmaps, y, x, 0, 1) - _neighbours(heatmaps, y, x, 0, -1)
+
+    # Peaks on the border have no neighbour on one side and are left in place
+    inside_y = (y > 0) & (y < height - 1)
+    inside_x = (x > 0) & (x < width - 1)
+    offsets = np.stack([np.sign(diff_y)*inside_y, np.sign(diff_x)*inside_x], axis=-1)
+
+    return 0.25*offsets.astype(np.float32)
+
+
+def _taylor_offsets(heatmaps: np.ndarray, y: np.ndarray, x: np.ndarray, kernel_size: int=3) -> np.ndarray:
+    n, k, height, width = heatmaps.shape
+
+    # Smooth every joint's heatmap, OpenCV blurs the channels of an (H, W, C) image independently
+    stacked = np.ascontiguousarray(heatmaps.reshape(n*k, height, width).transpose(1, 2, 0), dtype=np.float32)
+    smoothed = np.empty_like(stacked)
+    for start in range(0, n*k, MAX_BLUR_CHANNELS):
+        end = start + MAX_BLUR_CHANNELS
+        blurred = cv.GaussianBlur(stacked[..., start:end], (kernel_size, kernel_size), 0)
+        smoothed[..., start:end] = blurred.reshape(height, width, -1)                           # A single channel comes back as (H, W)
+    smoothed = smoothed.transpose(2, 0, 1).reshape(n, k, height, width)
+    log_heatmaps = np.log(np.maximum(smoothed, 1e-10))
+
+    def value(dy: int, dx: int) -> np.ndarray:
+        return _neighbours(log_heatmaps, y, x, dy, dx)
+
+    center = value(0, 0)
+    gradient_y = 0.5*(value(1, 0) - value(-1, 0))
+    gradient_x = 0.5*(value(0, 1) - value(0, -1))
+    hessian_yy = value(1, 0) - 2*center + value(-1, 0)
+    hessian_xx = value(0, 1) - 2*center + value(0, -1)
+    hessian_xy = 0.25*(value(1, 1) - value(1, -1) - value(-1, 1) + value(-1, -1))
+
+    # offset = -H^-1 g, solved in closed form for the 2x2 Hessian
+    determinant = hessian_yy*hessian_xx - hessian_xy**2
+    inside = (y > 0) & (y < height - 1) & (x > 0) & (x < width - 1)
+    valid = inside & (np.abs(determinant) > 1e-12)
+    safe_determinant = np.where(valid, determinant, 1.0)
+    offset_y = -(hessian_xx*gradient_y - hessian_xy*gradient_x)/safe_determinant
+    offset_x = -(hessian_yy*gradient_x - hessian_xy*gradient_y)/safe_determinant
+
+    offsets = np.stack([offset_y, offset_x], axis=-1)
+    # Steps beyond half a pixel mean the quadratic fit is unreliable
+    offsets = np.where(valid[..., None], np.clip(offsets, -0.5, 0.5), 0.0)
+
+    return offsets.astype(np.float32)
@@ -11,7 +11,12 @@ import argparse
 import logging
 
 from model_loader import ModelLoader
+from model_residency import ModelResidency
 from model_inference import ModelInference
+from batch_processing import BatchPoseProcessor, open_writer
+from multi_person import MultiPersonPoseEstimator, PersonDetector
+from tracking import PoseTracker
+from server import PoseServer
 
 logging.basicConfig(
     level=logging.INFO,
@@ -30,19 +35,71 @@ def main():
     parser.add_argument("--camera", type=int, default=0)
     parser.add_argument("--available_cameras", type=bool, default=False)
     parser.add_argument("--model_type", type=str, default="default")
+    parser.add_argument("--match_model_resolution", action="store_true", help="Capture at the smallest camera mode covering the model input")
+    parser.add_argument("--serial", action="store_true", help="Capture, infer and display one frame at a time")
+    parser.add_argument("--input", type=str, nargs="+", default=None, help="Video files or image directories to process offline instead of the camera")
+    parser.add_argument("--output", type=str, default="keypoints.jsonl", help="Offline keypoint output (.jsonl or .npz)")
+    parser.add_argument("--batch_size", type=int, default=8)
+    parser.add_argument("--multi_person", action="store_true", help="Detect people first and estimate each pose on its own crop")
+    parser.add_argument("--max_people", type=int, default=8)
+    parser.add_argument("--track", action="store_true", help="Track a single person and skip inference on static frames")
+    parser.add_argument("--max_skip", type=int, default=4, help="Most consecutive frames reusing the tracked pose")
+    parser.add_argument("--serve", action="store_true", help="Serve pose inference over HTTP instead of opening a camera")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--batch_window_ms", type=float, default=5.0, help="How long the server waits to batch concurrent frames")
+    parser.add_argument("--memory_budget_mb", type=int, default=None, help="Load the pose and detector models on demand within this budget")
 
     args = parser.parse_args()
 
     iLoad = ModelLoader(model=args.model, processor=args.processor, 
                         model_type=args.model_type)
 
-    session = iLoad.load_model(iLoad.graphs)
-    iInfer = ModelInference(session=session)
+    residency = ModelResidency(budget_bytes=args.memory_budget_mb*2**20) if args.memory_budget_mb else None
+    if residency is not None:
+        session = residency.register_model(iLoad)[iLoad.model.upper()]
+    else:
+        session = iLoad.load_model(iLoad.graphs)
+
+    if args.input:
+        iBatch = BatchPoseProcessor(session=session, batch_size=args.batch_size)
+        with open_writer(args.output) as writer:
+            iBatch.process(args.input, writer)
+        return
+
+    if args.serve:
+        iBatch = BatchPoseProcessor(session=session, batch_size=args.batch_size)
+        server = PoseServer(processor=iBatch, host=args.host, port=args.port,
+                            batch_window=args.batch_window_ms/1000)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info(server.metrics.summary())
+        finally:
+            server.server_close()
+        return
+
+    person_estimator = None
+    if args.multi_person:
+        iDetectorLoad = ModelLoader(model="person_detector", processor=args.processor,
+                                    model_type=args.model_type)
+        if residency is not None:
+            detector_session = residency.register_model(iDetectorLoad)[iDetectorLoad.model.upper()]
+            # Every frame runs the detector and then the pose model, keep both resident together
+            residency.keep_together([detector_session.name, session.name])
+        else:
+            detector_session = iDetectorLoad.load_model(iDetectorLoad.graphs)
+        detector = PersonDetector(session=detector_session, max_people=args.max_people)
+        person_estimator = MultiPersonPoseEstimator(detector=detector, pose_session=session)
+
+    tracker = PoseTracker(session=session, max_skip=args.max_skip) if args.track else None
+
+    iInfer = ModelInference(session=session, person_estimator=person_estimator, tracker=tracker)
 
     if args.available_cameras:
         logger.info(iInfer.available_cameras)
 
-    iInfer.inference(camera=args.camera)
+    iInfer.inference(camera=args.camera, pipelined=not args.serial, match_model_resolution=args.match_model_resolution)
 
 if __name__=="__main__":
     main()
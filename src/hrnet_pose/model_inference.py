@@ -3,23 +3,30 @@
 # Redistribution and use in source and binary forms, with or without
 # modification, are permitted provided that the conditions in LICENSE.txt are met
 
-import torch
-import os
+import logging
 
 import cv2 as cv
 import numpy as np
 
-from torchvision.transforms import v2
-from torchvision.transforms.functional import InterpolationMode
 from onnxruntime import InferenceSession, NodeArg
-from PIL import Image
-from typing import List,Tuple
+from typing import List,Optional,Tuple
+
+from pipeline import PosePipeline
+from preprocessing import FramePreprocessor
+from keypoint_decoding import decode_heatmaps
+from multi_person import MultiPersonPoseEstimator
+from tracking import PoseTracker
+from camera_discovery import CameraDiscovery, select_mode
+
+logger = logging.getLogger(__name__)
 
 class ModelInference():
     """
-    A class for handling model inference for pose estimation (HRnet_pose) using OpenCV and PyTorch.
+    A class for handling model inference for pose estimation (HRnet_pose) using OpenCV and ONNX Runtime.
     """
-    def __init__(self, session: InferenceSession) -> None:
+    def __init__(self, session: InferenceSession, refinement: str="quarter", confidence_threshold: float=0.0,
+                 person_estimator: Optional[MultiPersonPoseEstimator]=None, tracker: Optional[PoseTracker]=None,
+                 camera_discovery: Optional[CameraDiscovery]=None) -> None:
         """
         Initialize the ModelInference class.
 
@@ -27,41 +34,30 @@ class ModelInference():
         ----------
         session : InferenceSession
             The ONNX inference session instance to be used for model inference.
+        refinement : str, optional
+            Sub-pixel keypoint refinement, one of "none", "quarter" or "taylor" (default is "quarter").
+        confidence_threshold : float, optional
+            Keypoints with a lower heatmap peak are not drawn (default is 0.0).
+        person_estimator : MultiPersonPoseEstimator, optional
+            If given, people are detected first and every person's pose is estimated on its own crop,
+            instead of treating the whole frame as a single person.
+        tracker : PoseTracker, optional
+            If given (and no person estimator), keypoints are tracked and smoothed across frames and
+            HRNet only runs when the frame changed.
+        camera_discovery : CameraDiscovery, optional
+            Finds cameras and their capture modes (default is CameraDiscovery()).
         """
         self.session = session
+        self.refinement = refinement
+        self.confidence_threshold = confidence_threshold
+        self.person_estimator = person_estimator
+        self.tracker = tracker
+        self.camera_discovery = camera_discovery if camera_discovery is not None else CameraDiscovery()
         self._expected_inputs = session.get_inputs()[0]
         self.expected_shape = self._expected_inputs.shape
-        self.device = torch.device("cuda" if torch.cuda.is_available else "cpu")
-
-        self.transformer = v2.Compose([
-            v2.Resize(size=(self.expected_shape[2], self.expected_shape[3]), interpolation=InterpolationMode.BICUBIC),
-            v2.PILToTensor(),
-            v2.ConvertImageDtype(torch.float32),                                                # Converts to float32 AND Scales
-        ])
-    
-    def _image_transformer(self, frame: Image) -> Tuple[np.array, np.array]:
-        """
-        Transforms the input image to match the model's expected input format.
-
-        Parameters:
-        ----------
-        frame : Image
-            A PIL Image to be transformed.
-
-        Returns:
-        -------
-        Tuple[np.ndarray, np.ndarray]
-            The transformed image in NumPy format (H, W, C) and the model-compatible tensor (B, C, H, W).
-        """
-        
-        transformed_frame = self.transformer(frame)
-        transformed_frame_np = transformed_frame.cpu().numpy() if self.device == "gpu" else transformed_frame.numpy()
-        transformed_frame_inference = np.expand_dims(transformed_frame_np,axis=0)
-        final_frame = np.transpose(transformed_frame_np, (1,2,0))
+        self.preprocessor = FramePreprocessor(height=self.expected_shape[2], width=self.expected_shape[3])
 
-        return (final_frame, transformed_frame_inference)
-    
-    def inference(self, camera: int=1) -> None:                                                              # Will generalize this even more to work with all models
+    def inference(self, camera: int=1, pipelined: bool=True, match_model_resolution: bool=False) -> None:                                       # Will generalize this even more to work with all models
         """
         Conducts inference by capturing frames from a camera, processing them, and displaying results.
 
@@ -69,30 +65,93 @@ class ModelInference():
         ----------
         camera : int, optional
             The camera index for OpenCV to capture from (default is 1).
+        pipelined : bool, optional
+            If True, capture, inference and display run concurrently in a PosePipeline, otherwise
+            each frame is captured, processed and shown in turn (default is True).
+        match_model_resolution : bool, optional
+            If True, the camera is switched to its smallest mode that still covers the model input,
+            so less time goes into capturing and downscaling large frames (default is False).
         """
+        mode = None
+        if match_model_resolution:
+            info = self.camera_discovery.camera(camera)                                         # Probe before opening, some cameras only allow one handle
+            mode = select_mode(info.modes, height=self.expected_shape[2], width=self.expected_shape[3]) if info else None
+
         cap = cv.VideoCapture(camera)
+        if mode is not None:
+            cap.set(cv.CAP_PROP_FRAME_WIDTH, mode.width)
+            cap.set(cv.CAP_PROP_FRAME_HEIGHT, mode.height)
+            logger.info(f"Capturing {mode.width}x{mode.height} at {mode.fps:g} FPS")
         if not cap.isOpened():                                                                  # Can also use this to automatically select a camera, probably a better option to alleviate any frustrations                 
             raise ValueError(f"Error while trying to open camera - {self.available_cameras}")   
         output_height, _ = self._frame_shape(cap=cap)
         scaler = self.expected_shape[2]/output_height
-        
-        while True: 
-            ret, frame = cap.read()
-            if not ret:
-                raise ValueError("Can't receive frame. Exiting....")
-            frame, inference_frame = self._frame_processor(frame)
-            keypoints = self._inference_onnx(inference_frame=inference_frame, scaler=scaler)                         
-            frame = frame.copy()                                                                # To prevent errors due to memory fragmentation during processing
-            for (y,x) in keypoints:
-                cv.circle(frame, (x,y), radius=3, color=(0,0,255), thickness=-1)
-            frame = cv.resize(frame, (640,480), interpolation=cv.INTER_CUBIC)
-            cv.imshow('frame', frame)
-            if cv.waitKey(1) == ord('q'):
-                break
-        cap.release()
-        cv.destroyAllWindows()
+
+        try:
+            if pipelined:
+                pipeline = PosePipeline(capture=cap, process=lambda frame: self._process_frame(frame, scaler),
+                                        render=self._render_frame)
+                pipeline.run()
+                logger.info(f"Pipeline stats: {pipeline.stats()}")
+            else:
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        raise ValueError("Can't receive frame. Exiting....")
+                    if not self._render_frame(frame, self._process_frame(frame, scaler)):
+                        break
+        finally:
+            cap.release()
+            cv.destroyAllWindows()
+
+    def _process_frame(self, frame: np.array, scaler: float) -> Tuple[np.array, np.array]:
+        """
+        Preprocesses a captured frame and runs the model on it.
+
+        Parameters:
+        ----------
+        frame : np.ndarray
+            The captured frame (H, W, C).
+        scaler : float
+            The scaling factor from heatmap to model input coordinates.
+
+        Returns:
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            The model-sized frame and its (K, 3) keypoints as (y, x, confidence). With a person
+            estimator or tracker, the captured frame and keypoints in its coordinates instead.
+        """
+        if self.person_estimator is not None:
+            keypoints, _ = self.person_estimator(frame)
+            return (frame, keypoints)
+        if self.tracker is not None:
+            return (frame, self.tracker(frame))
+
+        frame, inference_frame = self._frame_processor(frame)
+        keypoints = self._inference_onnx(inference_frame=inference_frame, scaler=scaler)
+
+        return (frame, keypoints)
+
+    def _render_frame(self, captured_frame: np.array, result: Tuple[np.array, np.array]) -> bool:
+        """
+        Draws keypoints on the processed frame and shows it.
+
+        Returns:
+        -------
+        bool
+            False once the user pressed 'q'.
+        """
+        frame, keypoints = result
+        frame = frame.copy()                                                                    # To prevent errors due to memory fragmentation during processing
+        for (y,x,confidence) in keypoints.reshape(-1, 3):
+            if confidence >= self.confidence_threshold:
+                cv.circle(frame, (int(round(x)),int(round(y))), radius=3, color=(0,0,255), thickness=-1)
+        frame = cv.resize(frame, (640,480), interpolation=cv.INTER_CUBIC)
+        cv.imshow('frame', frame)
+
+        return cv.waitKey(1) != ord('q')
            
-    def _inference_onnx(self, inference_frame: np.array, scaler: int=None, solo_scaler: bool=False) -> List[Tuple[int,int]]:
+    def _inference_onnx(self, inference_frame: np.array, scaler: float=1.0, solo_scaler: bool=False) -> np.array:
         """
         Performs inference on the input frame using the ONNX model and scales keypoints.
 
@@ -100,38 +159,28 @@ class ModelInference():
         ----------
         inference_frame : np.ndarray
             The input frame formatted for inference.
-        scaler : int, optional
+        scaler : float, optional
             The scaling factor to adjust keypoints to the original frame size.
         solo_scaler : bool, optional
             If True, returns the output shape for scaling only.
 
         Returns:
         -------
-        List[Tuple[int, int]]
-            A list of keypoints as (y, x) tuples.
+        np.ndarray
+            A (K, 3) array of keypoints as (y, x, confidence) rows, with sub-pixel (y, x) coordinates.
+            With solo_scaler, the heatmap (height, width) instead.
         
         Additional:
         ----------
         Each keypoint represents a different bodypart identifier
         https://www.researchgate.net/figure/Key-points-for-human-poses-according-to-the-COCO-output-format-R-L-right-left_fig3_353746430
         """
-        keypoint_coordinates: List[Tuple[int,int]] = []
-        outputs = self.session.run(None, {self._expected_inputs.name:inference_frame})
-        output_numpy = np.squeeze(np.squeeze(np.array(outputs), axis=0))
+        heatmaps = self.session.run(None, {self._expected_inputs.name:inference_frame})[0][0]         # (K, H, W) of the first image
 
         if solo_scaler:
-            out_height, out_width = output_numpy.shape[1],output_numpy.shape[2]
-            keypoint_coordinates.append((out_height,out_width))
-            return keypoint_coordinates
-    
-        for keypoint in range(output_numpy.shape[0]): 
-            max_val =  np.argmax(output_numpy[keypoint])                                    
-            img_height, img_width =  np.unravel_index(max_val, output_numpy[keypoint].shape)
-            coordinates_scaled = (int(img_height*scaler), int(img_width*scaler))
-            keypoint_coordinates.append(coordinates_scaled)
-        
-        return keypoint_coordinates
+            return heatmaps.shape[1:]
 
+        return decode_heatmaps(heatmaps, refinement=self.refinement, scale=scaler)
 
 
     def _frame_shape(self, cap: cv.VideoCapture) -> Tuple[int,int]:
@@ -152,7 +201,7 @@ class ModelInference():
         frame, frame_transform = self._frame_processor(frame)
         output_shape = self._inference_onnx(inference_frame=frame_transform,solo_scaler=True)
 
-        return output_shape[0]
+        return output_shape
 
     
     def _frame_processor(self, frame: np.array) -> Tuple[np.array, np.array]:
@@ -162,47 +211,27 @@ class ModelInference():
         Parameters:
         ----------
         frame : np.ndarray
-            The input frame in NumPy array format (H, W, C).
+            The input frame in NumPy array format (H, W, C), BGR as captured by OpenCV.
 
         Returns:
         -------
         Tuple[np.ndarray, np.ndarray]
-            The processed frame in (H, W, C) format and the model-ready format (B, C, H, W).
+            The resized BGR frame in (H, W, C) format and the RGB model-ready format (B, C, H, W).
+            The model-ready array is reused by the next call.
         """
-        frame = Image.fromarray(frame)
-        frame, frame_transform = self._image_transformer(frame=frame)
-
-        return (frame,frame_transform)
-        
+        return self.preprocessor(frame)
 
     @property
-    def available_cameras(self, max_cameras: int=5) -> List[int]:
+    def available_cameras(self) -> str:
         """
-        Lists available camera indices.
-
-        Parameters:
-        ----------
-        max_cameras : int, optional
-            Maximum number of cameras to check (default is 10).
+        Lists available cameras with their capture modes, see CameraDiscovery.
 
         Returns:
         -------
         str
-            A string listing available camera indices.
-        """        
-        #Log suppression is currently not working, need to figure out why
-        os.environ["OPENCV_LOG_LEVEL"] = "FATAL"                                                # Suppress logging to ignore any error that's not fatal
-
-        available_cameras: List[int] = []
-        for cam in range(max_cameras):
-            cap = cv.VideoCapture(cam)
-            if cap.isOpened():
-                available_cameras.append(str(cam))
-                cap.release()
-
-        os.environ["OPENCV_LOG_LEVEL"] = "INFO"                                                 # Restore logging back to normal
-
-        return f"Available Cameras: {' | '.join(available_cameras)}"
+            A string listing available cameras.
+        """
+        return f"Available Cameras: {' | '.join(str(camera) for camera in self.camera_discovery.cameras())}"
 
     @property
     def expected_inputs(self) -> NodeArg:
@@ -0,0 +1,214 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import numpy as np
+
+from onnxruntime import InferenceSession
+from typing import List, Tuple
+
+from batch_processing import BatchPoseProcessor
+from preprocessing import FramePreprocessor
+
+PERSON_CLASS = 0                                                                                # COCO class index of "person"
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float=0.5,
+                        max_detections: int=100) -> np.ndarray:
+    """
+    Greedy non-maximum suppression.
+
+    Parameters:
+    ----------
+    boxes : np.ndarray
+        Boxes (N, 4) as (x1, y1, x2, y2).
+    scores : np.ndarray
+        Scores (N,).
+    iou_threshold : float, optional
+        Boxes overlapping a kept box by more than this IoU are discarded (default is 0.5).
+    max_detections : int, optional
+        Maximum number of boxes to keep (default is 100).
+
+    Returns:
+    -------
+    np.ndarray
+        Indices of the kept boxes, highest score first.
+    """
+    areas = np.maximum(boxes[:, 2] - boxes[:, 0], 0)*np.maximum(boxes[:, 3] - boxes[:, 1], 0)
+    order = np.argsort(-scores)
+    keep: List[int] = []
+
+    while order.size > 0 and len(keep) < max_detections:
+        best, rest = order[0], order[1:]
+        keep.append(int(best))
+
+        # IoU of the best box with all remaining boxes at once
+        x1 = np.maximum(boxes[best, 0], boxes[rest, 0])
+        y1 = np.maximum(boxes[best, 1], boxes[rest, 1])
+        x2 = np.minimum(boxes[best, 2], boxes[rest, 2])
+        y2 = np.minimum(boxes[best, 3], boxes[rest, 3])
+        intersection = np.maximum(x2 - x1, 0)*np.maximum(y2 - y1, 0)
+        iou = intersection/np.maximum(areas[best] + areas[rest] - intersection, 1e-9)
+
+        order = rest[iou <= iou_threshold]
+
+    return np.array(keep, dtype=np.int64)
+
+
+def crop_regions(boxes: np.ndarray, frame_shape: Tuple[int, ...], aspect: float, padding: float=1.25) -> np.ndarray:
+    """
+    Expands boxes to a model's aspect ratio with padding, clipped to the frame.
+
+    Parameters:
+    ----------
+    boxes : np.ndarray
+        Boxes (P, 4+) as (x1, y1, x2, y2, ...).
+    frame_shape : Tuple[int, ...]
+        The frame shape (H, W, ...).
+    aspect : float
+        Target width / height, e.g. HRNet's 192/256.
+    padding : float, optional
+        Growth factor around each box so limbs are not cut off (default is 1.25).
+
+    Returns:
+    -------
+    np.ndarray
+        Integer regions (P, 4) as (x1, y1, x2, y2).
+    """
+    center_x = (boxes[:, 0] + boxes[:, 2])/2
+    center_y = (boxes[:, 1] + boxes[:, 3])/2
+    width = boxes[:, 2] - boxes[:, 0]
+    height = boxes[:, 3] - boxes[:, 1]
+
+    # Grow the narrower side so the crop is not distorted by the resize
+    height = np.maximum(height, width/aspect)*padding
+    width = height*aspect
+
+    regions = np.stack([center_x - width/2, center_y - height/2, center_x + width/2, center_y + height/2], axis=1)
+    regions = np.round(regions).astype(np.int64)
+    regions[:, [0, 2]] = np.clip(regions[:, [0, 2]], 0, frame_shape[1])
+    regions[:, [1, 3]] = np.clip(regions[:, [1, 3]], 0, frame_shape[0])
+
+    return regions
+
+
+class PersonDetector():
+    """
+    Finds people in a frame with a single-shot detector such as YOLOv8 from AI Hub.
+
+    The session is expected to take one RGB NCHW image scaled to [0, 1] and to return boxes (1, N, 4)
+    as (x1, y1, x2, y2) in input pixels, scores (1, N) and optionally class indices (1, N).
+    """
+    def __init__(self, session: InferenceSession, score_threshold: float=0.4, iou_threshold: float=0.5,
+                 max_people: int=8) -> None:
+        """
+        Parameters:
+        ----------
+        session : InferenceSession
+            The detector session, e.g. loaded with ModelLoader(model="person_detector", ...).
+        score_threshold : float, optional
+            Minimum detection score (default is 0.4).
+        iou_threshold : float, optional
+            Non-maximum suppression IoU threshold (default is 0.5).
+        max_people : int, optional
+            Maximum number of people returned per frame (default is 8).
+        """
+        self.session = session
+        self.score_threshold = score_threshold
+        self.iou_threshold = iou_threshold
+        self.max_people = max_people
+
+        self._input = session.get_inputs()[0]
+        _, _, self.height, self.width = self._input.shape
+        self.preprocessor = FramePreprocessor(height=self.height, width=self.width)
+
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Parameters:
+        ----------
+        frame : np.ndarray
+            A BGR frame (H, W, C).
+
+        Returns:
+        -------
+        np.ndarray
+            Person boxes (P, 5) as (x1, y1, x2, y2, score) in frame coordinates, highest score first.
+        """
+        _, tensor = self.preprocessor(frame)
+        outputs = self.session.run(None, {self._input.name: tensor})
+        boxes, scores = outputs[0][0], outputs[1][0]
+
+        candidates = scores >= self.score_threshold
+        if len(outputs) > 2:
+            candidates &= outputs[2][0] == PERSON_CLASS
+        boxes, scores = boxes[candidates], scores[candidates]
+
+        keep = non_max_suppression(boxes, scores, self.iou_threshold, self.max_people)
+        boxes = boxes[keep].astype(np.float32)*np.float32([frame.shape[1]/self.width, frame.shape[0]/self.height]*2)
+
+        return np.concatenate([boxes, scores[keep, None].astype(np.float32)], axis=1)
+
+
+class MultiPersonPoseEstimator():
+    """
+    Two-stage multi-person pose estimation: detect people, then run HRNet on every person crop.
+
+    All crops of a frame go through HRNet in as few session calls as the graph allows (one call with
+    a dynamic batch dimension), and the keypoints are mapped back to frame coordinates.
+    """
+    def __init__(self, detector: PersonDetector, pose_session: InferenceSession, padding: float=1.25,
+                 refinement: str="quarter") -> None:
+        """
+        Parameters:
+        ----------
+        detector : PersonDetector
+            The person detector.
+        pose_session : InferenceSession
+            The HRNet session.
+        padding : float, optional
+            Crops are enlarged by this factor around each box so limbs are not cut off (default is 1.25).
+        refinement : str, optional
+            Sub-pixel keypoint refinement, see decode_heatmaps (default is "quarter").
+        """
+        self.detector = detector
+        self.padding = padding
+        self.pose = BatchPoseProcessor(pose_session, batch_size=detector.max_people, refinement=refinement)
+
+    def crop_regions(self, boxes: np.ndarray, frame_shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Returns:
+        -------
+        np.ndarray
+            Integer crop regions (P, 4) around the boxes, see crop_regions.
+        """
+        return crop_regions(boxes, frame_shape, aspect=self.pose.width/self.pose.height, padding=self.padding)
+
+    def __call__(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Parameters:
+        ----------
+        frame : np.ndarray
+            A BGR frame (H, W, C).
+
+        Returns:
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            Keypoints (P, K, 3) as (y, x, confidence) in frame coordinates and the person boxes (P, 5).
+        """
+        boxes = self.detector(frame)
+        regions = self.crop_regions(boxes, frame.shape)
+        valid = (regions[:, 2] > regions[:, 0]) & (regions[:, 3] > regions[:, 1])
+        boxes, regions = boxes[valid], regions[valid]
+
+        if len(regions) == 0:
+            return np.empty((0, 0, 3), dtype=np.float32), boxes
+
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in regions]
+        keypoints = np.concatenate([self.pose.infer(crops[start:start + self.pose.batch_size])
+                                    for start in range(0, len(crops), self.pose.batch_size)])
+
+        keypoints[..., 0] += regions[:, 1, None]
+        keypoints[..., 1] += regions[:, 0, None]
+
+        return keypoints, boxes
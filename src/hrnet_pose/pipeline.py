@@ -0,0 +1,259 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STAGES: Tuple[str, ...] = ("capture", "inference", "display")
+
+
+class DropOldestQueue():
+    """
+    A bounded queue that discards its oldest item instead of blocking the producer.
+
+    A live pipeline should always work on the newest frame; a slow consumer therefore loses stale
+    frames rather than building up latency.
+    """
+    def __init__(self, maxsize: int=2) -> None:
+        """
+        Parameters:
+        ----------
+        maxsize : int, optional
+            Maximum number of queued items (default is 2).
+        """
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.dropped: int = 0
+
+    def put(self, item: Any) -> None:
+        with self._lock:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def get(self, timeout: Optional[float]=None) -> Any:
+        """
+        Raises:
+        ------
+        queue.Empty
+            If no item arrives within `timeout` seconds.
+        """
+        return self._queue.get(timeout=timeout)
+
+
+class StageLatency():
+    """
+    Rolling per-stage timings of a pipeline.
+    """
+    def __init__(self, window: int=120) -> None:
+        self._durations: Dict[str, deque] = {stage: deque(maxlen=window) for stage in STAGES + ("end_to_end",)}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._durations[stage].append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns:
+        -------
+        Dict[str, Dict[str, float]]
+            Mean latency in milliseconds and the FPS that stage alone could sustain, per stage.
+        """
+        with self._lock:
+            snapshot = {stage: list(durations) for stage, durations in self._durations.items() if durations}
+
+        summary: Dict[str, Dict[str, float]] = {}
+        for stage, durations in snapshot.items():
+            mean = sum(durations)/len(durations)
+            summary[stage] = {"mean_ms": mean*1000, "fps": 1/mean if mean > 0 else float("inf")}
+
+        return summary
+
+
+@dataclass
+class FramePacket:
+    index: int
+    frame: np.ndarray
+    captured_at: float
+    result: Any = None
+
+
+class PosePipeline():
+    """
+    Overlaps camera capture, model inference and display in three stages.
+
+    A capture thread reads frames into a small drop-oldest queue, a worker thread preprocesses and runs
+    the model on the newest frame, and the calling thread renders the newest result. Since the stages
+    run concurrently, sustained FPS is bounded by the slowest stage instead of the sum of all three.
+    Rendering stays on the calling thread because OpenCV windows must be driven from one thread.
+    """
+    def __init__(self, capture: Any, process: Callable[[np.ndarray], Any], render: Callable[[np.ndarray, Any], bool],
+                 queue_size: int=2, report_interval: float=5.0, max_frames: Optional[int]=None) -> None:
+        """
+        Parameters:
+        ----------
+        capture : Any
+            A frame source with a cv.VideoCapture style `read()` method.
+        process : Callable[[np.ndarray], Any]
+            Runs preprocessing and inference on a captured frame.
+        render : Callable[[np.ndarray, Any], bool]
+            Draws a frame with its result, returns False to stop the pipeline.
+        queue_size : int, optional
+            Capacity of the queues between stages (default is 2).
+        report_interval : float, optional
+            Seconds between latency log lines, 0 disables logging (default is 5.0).
+        max_frames : int, optional
+            Stops after this many frames were captured, e.g. for benchmarks (default is unlimited).
+        """
+        self.capture = capture
+        self.process = process
+        self.render = render
+        self.report_interval = report_interval
+        self.max_frames = max_frames
+
+        self.frames = DropOldestQueue(queue_size)
+        self.results = DropOldestQueue(queue_size)
+        self.latency = StageLatency()
+        self.rendered: int = 0
+
+        self._stop_event = threading.Event()
+        self._capture_done = threading.Event()
+        self._inference_done = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def run(self) -> None:
+        """
+        Runs the pipeline until `render` returns False, the capture ends or a stage fails.
+
+        Raises:
+        ------
+        ValueError
+            If the camera stops delivering frames.
+        """
+        threads = [
+            threading.Thread(target=self._capture_loop, name="pose-capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="pose-inference", daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            self._display_loop()
+        finally:
+            self._stop_event.set()
+            for thread in threads:
+                thread.join()
+
+        if self._error is not None:
+            raise self._error
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+        -------
+        Dict[str, Any]
+            Per-stage latency summary and the number of frames dropped between stages.
+        """
+        return {
+            "latency": self.latency.summary(),
+            "dropped_frames": self.frames.dropped,
+            "dropped_results": self.results.dropped,
+            "rendered": self.rendered,
+        }
+
+    def _fail(self, error: BaseException) -> None:
+        if self._error is None:
+            self._error = error
+        self._stop_event.set()
+
+    def _capture_loop(self) -> None:
+        index = 0
+        try:
+            while not self._stop_event.is_set():
+                if self.max_frames is not None and index >= self.max_frames:
+                    break
+
+                start = time.perf_counter()
+                ret, frame = self.capture.read()
+                if not ret:
+                    if self.max_frames is None:
+                        raise ValueError("Can't receive frame. Exiting....")
+                    break
+                captured_at = time.perf_counter()
+                self.latency.record("capture", captured_at - start)
+
+                self.frames.put(FramePacket(index=index, frame=frame, captured_at=captured_at))
+                index += 1
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._capture_done.set()
+
+    def _inference_loop(self) -> None:
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    packet = self.frames.get(timeout=0.05)
+                except queue.Empty:
+                    if self._capture_done.is_set():
+                        break
+                    continue
+
+                start = time.perf_counter()
+                packet.result = self.process(packet.frame)
+                self.latency.record("inference", time.perf_counter() - start)
+
+                self.results.put(packet)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._inference_done.set()
+
+    def _display_loop(self) -> None:
+        last_report = time.perf_counter()
+        while not self._stop_event.is_set():
+            try:
+                packet = self.results.get(timeout=0.05)
+            except queue.Empty:
+                if self._inference_done.is_set():
+                    break
+                continue
+
+            start = time.perf_counter()
+            keep_running = self.render(packet.frame, packet.result)
+            end = time.perf_counter()
+            self.latency.record("display", end - start)
+            self.latency.record("end_to_end", end - packet.captured_at)
+            self.rendered += 1
+
+            if self.report_interval and end - last_report >= self.report_interval:
+                last_report = end
+                summary = self.latency.summary()
+                logger.info(" | ".join(f"{stage}: {values['mean_ms']:.1f} ms" for stage, values in summary.items())
+                            + f" | dropped: {self.frames.dropped}")
+
+            if keep_running is False:
+                break
@@ -0,0 +1,84 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import cv2 as cv
+import numpy as np
+
+from typing import Tuple
+
+
+class FramePreprocessor():
+    """
+    Converts OpenCV frames into model input tensors with OpenCV and in-place NumPy operations.
+
+    The RGB and NCHW float32 buffers are allocated once and overwritten for every frame, so besides
+    the resize itself no intermediate images are created. The returned tensor is therefore only valid
+    until the next call; it is meant to be passed straight to `InferenceSession.run`.
+    """
+    def __init__(self, height: int, width: int, batch_size: int=1, interpolation: int=cv.INTER_CUBIC) -> None:
+        """
+        Parameters:
+        ----------
+        height : int
+            The model input height.
+        width : int
+            The model input width.
+        batch_size : int, optional
+            Number of frames per input tensor (default is 1).
+        interpolation : int, optional
+            The OpenCV interpolation used for resizing (default is bicubic).
+        """
+        self.height = height
+        self.width = width
+        self.interpolation = interpolation
+
+        self._rgb = np.empty((height, width, 3), dtype=np.uint8)
+        self._tensor = np.empty((batch_size, 3, height, width), dtype=np.float32)
+
+    @property
+    def batch_size(self) -> int:
+        return self._tensor.shape[0]
+
+    def __call__(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Resizes a BGR frame and writes it into the input tensor.
+
+        Parameters:
+        ----------
+        frame : np.ndarray
+            A BGR uint8 frame (H, W, C) as returned by cv.VideoCapture.
+
+        Returns:
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            The resized BGR frame (H, W, C) for display and the model-ready tensor (1, C, H, W) scaled to [0, 1].
+        """
+        resized = self.fill(0, frame)
+
+        return (resized, self._tensor[:1])
+
+    def fill(self, index: int, frame: np.ndarray) -> np.ndarray:
+        """
+        Writes a BGR frame into slot `index` of the batched input tensor.
+
+        Returns:
+        -------
+        np.ndarray
+            The resized BGR frame (H, W, C).
+        """
+        resized = cv.resize(frame, (self.width, self.height), interpolation=self.interpolation)
+        cv.cvtColor(resized, cv.COLOR_BGR2RGB, dst=self._rgb)
+        np.multiply(self._rgb.transpose(2, 0, 1), np.float32(1/255), out=self._tensor[index], casting="unsafe")
+
+        return resized
+
+    def batch(self, count: int) -> np.ndarray:
+        """
+        Returns:
+        -------
+        np.ndarray
+            The first `count` filled slots of the input tensor (count, C, H, W).
+        """
+        return self._tensor[:count]
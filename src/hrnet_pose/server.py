@@ -0,0 +1,404 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import json
+import logging
+import queue
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import cv2 as cv
+import numpy as np
+
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IMAGE_TYPES = ("image/jpeg", "image/png")
+RAW_TYPE = "application/octet-stream"
+MAX_BODY_BYTES = 32*2**20                                           # Fits a raw 4K BGR frame
+
+
+@dataclass
+class PoseRequest:
+    frame: np.ndarray
+    received_at: float
+    future: Future = field(default_factory=Future)
+
+
+class ServerMetrics():
+    """
+    Request and batch counters plus rolling request latencies of a pose server.
+    """
+    def __init__(self, window: int=1000) -> None:
+        self.requests: int = 0
+        self.batches: int = 0
+        self.errors: int = 0
+        self._latencies: Dict[str, deque] = {name: deque(maxlen=window) for name in ("queue", "inference", "total")}
+        self._lock = threading.Lock()
+
+    def record_batch(self, size: int, queue_seconds: List[float], inference_seconds: float) -> None:
+        with self._lock:
+            self.batches += 1
+            self.requests += size
+            self._latencies["queue"].extend(queue_seconds)
+            self._latencies["inference"].append(inference_seconds)
+
+    def record_total(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies["total"].append(seconds)
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Returns:
+        -------
+        Dict[str, Any]
+            Counters, the mean batch size and mean/p50/p95 latency in milliseconds per measurement.
+        """
+        with self._lock:
+            snapshot = {name: np.array(values) for name, values in self._latencies.items() if values}
+            summary: Dict[str, Any] = {"requests": self.requests, "batches": self.batches, "errors": self.errors,
+                                       "mean_batch_size": self.requests/self.batches if self.batches else 0.0}
+
+        for name, values in snapshot.items():
+            summary[f"{name}_ms"] = {"mean": float(values.mean()*1000),
+                                     "p50": float(np.percentile(values, 50)*1000),
+                                     "p95": float(np.percentile(values, 95)*1000)}
+
+        return summary
+
+
+class MicroBatcher():
+    """
+    Groups frames submitted from many threads into batched model calls.
+
+    A worker thread waits for a first request, then collects further requests for at most `window`
+    seconds or until the batch is full, and runs them through `infer` in one call. Under load this
+    trades a few milliseconds of queueing for far fewer session calls; a lone request only waits for
+    the window.
+    """
+    def __init__(self, infer: Callable[[List[np.ndarray]], np.ndarray], batch_size: int=8, window: float=0.005,
+                 metrics: Optional[ServerMetrics]=None) -> None:
+        """
+        Parameters:
+        ----------
+        infer : Callable[[List[np.ndarray]], np.ndarray]
+            Runs up to batch_size frames at once, e.g. BatchPoseProcessor.infer.
+        batch_size : int, optional
+            Maximum frames per call (default is 8).
+        window : float, optional
+            Seconds to wait for more requests after the first one arrived (default is 0.005).
+        metrics : ServerMetrics, optional
+            Collects batch sizes and latencies (default is a new ServerMetrics).
+        """
+        self.infer = infer
+        self.batch_size = batch_size
+        self.window = window
+        self.metrics = metrics if metrics is not None else ServerMetrics()
+
+        self._queue: "queue.Queue[PoseRequest]" = queue.Queue()
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="pose-batcher", daemon=True)
+
+    def start(self) -> "MicroBatcher":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops the worker once its current batch finished and fails the requests still queued, so no caller
+        waits for a result that would never come.
+        """
+        with self._lock:
+            self._stop_event.set()
+        self._thread.join()
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            request.future.set_exception(RuntimeError("The pose batcher stopped before the frame ran"))
+
+    def submit(self, frame: np.ndarray) -> Future:
+        """
+        Returns:
+        -------
+        Future
+            Resolves to (keypoints (K, 3), latency in seconds per stage) once the frame's batch ran, or
+            fails with RuntimeError if the batcher is stopped first.
+        """
+        request = PoseRequest(frame=frame, received_at=time.perf_counter())
+        with self._lock:
+            if self._stop_event.is_set():
+                request.future.set_exception(RuntimeError("The pose batcher is stopped"))
+            else:
+                self._queue.put(request)
+        return request.future
+
+    def _collect(self) -> List[PoseRequest]:
+        try:
+            batch = [self._queue.get(timeout=0.05)]
+        except queue.Empty:
+            return []
+
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                keypoints = self.infer([request.frame for request in batch])
+            except BaseException as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            inference_seconds = time.perf_counter() - start
+
+            queue_seconds = [start - request.received_at for request in batch]
+            self.metrics.record_batch(len(batch), queue_seconds, inference_seconds)
+            for request, frame_keypoints, waited in zip(batch, keypoints, queue_seconds):
+                request.future.set_result((frame_keypoints, {"queue": waited, "inference": inference_seconds,
+                                                             "batch_size": len(batch)}))
+
+
+def decode_frame(body: bytes, content_type: str, width: Optional[int]=None, height: Optional[int]=None) -> np.ndarray:
+    """
+    Decodes an uploaded frame.
+
+    Parameters:
+    ----------
+    body : bytes
+        An encoded JPEG/PNG image, or raw BGR uint8 pixels.
+    content_type : str
+        "image/jpeg", "image/png" or "application/octet-stream" for raw pixels.
+    width : int, optional
+        Width of a raw frame.
+    height : int, optional
+        Height of a raw frame.
+
+    Returns:
+    -------
+    np.ndarray
+        The BGR frame (H, W, 3).
+
+    Raises:
+    ------
+    ValueError
+        If the content type is unsupported or the body can't be decoded.
+    """
+    content_type = content_type.split(";")[0].strip().lower()
+    if content_type in IMAGE_TYPES:
+        frame = cv.imdecode(np.frombuffer(body, dtype=np.uint8), cv.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError(f"Can't decode {content_type} frame")
+        return frame
+    if content_type == RAW_TYPE:
+        if width is None or height is None:
+            raise ValueError("Raw frames need width and height")
+        if len(body) != width*height*3:
+            raise ValueError(f"Expected {width*height*3} bytes for a {width}x{height} BGR frame but got {len(body)}")
+        return np.frombuffer(body, dtype=np.uint8).reshape(height, width, 3)
+    raise ValueError(f"Unsupported content type '{content_type}', expected one of {IMAGE_TYPES + (RAW_TYPE,)}")
+
+
+class PoseRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /pose with a frame body returns {"keypoints": [[y, x, confidence], ...], "latency_ms": {...}, "batch_size"},
+    GET /metrics returns the server metrics and GET /health returns {"status": "ok"}.
+    Raw frames pass their size as query parameters: /pose?width=640&height=480.
+    """
+    server: "PoseServer"
+
+    def do_GET(self) -> None:
+        path = urllib.parse.urlparse(self.path).path
+        if path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif path == "/metrics":
+            self._send_json(200, self.server.metrics.summary())
+        else:
+            self._send_json(404, {"error": f"Unknown path {path}"})
+
+    def do_POST(self) -> None:
+        received_at = time.perf_counter()
+        url = urllib.parse.urlparse(self.path)
+        if url.path != "/pose":
+            self._send_json(404, {"error": f"Unknown path {url.path}"})
+            return
+
+        try:
+            query = urllib.parse.parse_qs(url.query)
+            length = int(self.headers.get("Content-Length", 0))
+            if length > self.server.max_body_bytes:
+                # The body is left unread, so the connection can't be reused
+                self.close_connection = True
+                self.server.metrics.record_error()
+                self._send_json(413, {"error": f"Frame of {length} bytes exceeds the {self.server.max_body_bytes} byte limit"})
+                return
+            if length < 0:
+                raise ValueError(f"Invalid Content-Length {length}")
+            body = self.rfile.read(length)
+            frame = decode_frame(body, self.headers.get("Content-Type", RAW_TYPE),
+                                 width=int(query["width"][0]) if "width" in query else None,
+                                 height=int(query["height"][0]) if "height" in query else None)
+        except ValueError as e:
+            self.server.metrics.record_error()
+            self._send_json(400, {"error": str(e)})
+            return
+        decoded_at = time.perf_counter()
+
+        try:
+            keypoints, latency = self.server.batcher.submit(frame).result(timeout=self.server.request_timeout)
+        except Exception as e:
+            self.server.metrics.record_error()
+            logger.error(f"Pose request failed: {e}")
+            self._send_json(500, {"error": str(e)})
+            return
+
+        total = time.perf_counter() - received_at
+        self.server.metrics.record_total(total)
+        self._send_json(200, {
+            "keypoints": np.round(keypoints, 3).tolist(),
+            "batch_size": latency["batch_size"],
+            "latency_ms": {"decode": (decoded_at - received_at)*1000, "queue": latency["queue"]*1000,
+                           "inference": latency["inference"]*1000, "total": total*1000},
+        })
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+
+class PoseServer(ThreadingHTTPServer):
+    """
+    Local HTTP server that lets many clients share one HRNet session.
+
+    Every connection is handled on its own thread, while all frames funnel into a single MicroBatcher
+    so the session is only ever called from one thread.
+    """
+    daemon_threads = True
+
+    def __init__(self, processor: Any, host: str="127.0.0.1", port: int=8080, batch_window: float=0.005,
+                 request_timeout: float=10.0, max_body_bytes: int=MAX_BODY_BYTES) -> None:
+        """
+        Parameters:
+        ----------
+        processor : Any
+            An object with `infer(frames)` and `batch_size`, e.g. BatchPoseProcessor.
+        host : str, optional
+            Interface to bind (default is "127.0.0.1").
+        port : int, optional
+            Port to bind, 0 picks a free one (default is 8080).
+        batch_window : float, optional
+            Seconds the batcher waits for more frames after the first one (default is 0.005).
+        request_timeout : float, optional
+            Seconds a request waits for its result (default is 10.0).
+        max_body_bytes : int, optional
+            Largest frame upload accepted, larger ones are refused with 413 before reading them (default is 32 MB).
+        """
+        super().__init__((host, port), PoseRequestHandler)
+        self.metrics = ServerMetrics()
+        self.batcher = MicroBatcher(processor.infer, batch_size=processor.batch_size, window=batch_window,
+                                    metrics=self.metrics)
+        self.request_timeout = request_timeout
+        self.max_body_bytes = max_body_bytes
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self, poll_interval: float=0.5) -> None:
+        self.batcher.start()
+        logger.info(f"Serving HRNet pose on {self.url}/pose")
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self.batcher.stop()
+
+
+class PoseClient():
+    """
+    Minimal client for PoseServer.
+    """
+    def __init__(self, url: str, timeout: float=10.0) -> None:
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def estimate(self, frame: np.ndarray, encoding: str="jpeg") -> Tuple[np.ndarray, Dict[str, Any]]:
+        """
+        Parameters:
+        ----------
+        frame : np.ndarray
+            A BGR frame (H, W, 3).
+        encoding : str, optional
+            "jpeg", "png" or "raw" (default is "jpeg").
+
+        Returns:
+        -------
+        Tuple[np.ndarray, Dict[str, Any]]
+            Keypoints (K, 3) as (y, x, confidence) and the rest of the server response.
+
+        Raises:
+        ------
+        ValueError
+            If the encoding is unknown or the server rejects the frame.
+        """
+        path = "/pose"
+        if encoding == "raw":
+            body, content_type = np.ascontiguousarray(frame, dtype=np.uint8).tobytes(), RAW_TYPE
+            path += f"?width={frame.shape[1]}&height={frame.shape[0]}"
+        elif encoding in ("jpeg", "png"):
+            ok, encoded = cv.imencode(f".{encoding}", frame)
+            if not ok:
+                raise ValueError(f"Can't encode frame as {encoding}")
+            body, content_type = encoded.tobytes(), f"image/{encoding}"
+        else:
+            raise ValueError(f"Unknown encoding '{encoding}', expected jpeg, png or raw")
+
+        request = urllib.request.Request(self.url + path, data=body, headers={"Content-Type": content_type})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise ValueError(f"Pose server returned {e.code}: {e.read().decode()}") from e
+
+        return np.asarray(payload.pop("keypoints"), dtype=np.float32), payload
+
+    def metrics(self) -> Dict[str, Any]:
+        with urllib.request.urlopen(self.url + "/metrics", timeout=self.timeout) as response:
+            return json.loads(response.read())
@@ -0,0 +1,224 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import math
+import time
+
+import cv2 as cv
+import numpy as np
+
+from collections import Counter
+from onnxruntime import InferenceSession
+from typing import Optional, Tuple
+
+from batch_processing import BatchPoseProcessor
+from multi_person import crop_regions
+
+
+class OneEuroFilter():
+    """
+    One-Euro filter applied element-wise to an array, e.g. all keypoint coordinates at once.
+
+    Slow movements are smoothed heavily to remove jitter, fast movements lightly to avoid lag
+    (Casiez et al., 2012).
+    """
+    def __init__(self, min_cutoff: float=1.0, beta: float=0.05, derivative_cutoff: float=1.0) -> None:
+        """
+        Parameters:
+        ----------
+        min_cutoff : float, optional
+            Cutoff frequency in Hz at rest, lower is smoother (default is 1.0).
+        beta : float, optional
+            How fast the cutoff rises with speed (per pixel/second), higher reduces lag (default is 0.05).
+        derivative_cutoff : float, optional
+            Cutoff frequency in Hz for the speed estimate (default is 1.0).
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.derivative_cutoff = derivative_cutoff
+        self.reset()
+
+    def reset(self) -> None:
+        self._value: Optional[np.ndarray] = None
+        self._derivative: Optional[np.ndarray] = None
+        self._timestamp: float = 0.0
+
+    @staticmethod
+    def _alpha(dt: float, cutoff: np.ndarray) -> np.ndarray:
+        tau = 1/(2*math.pi*cutoff)
+        return 1/(1 + tau/dt)
+
+    def __call__(self, value: np.ndarray, timestamp: float) -> np.ndarray:
+        if self._value is None:
+            self._value = value.astype(np.float32)
+            self._derivative = np.zeros_like(self._value)
+            self._timestamp = timestamp
+            return self._value.copy()
+
+        dt = max(timestamp - self._timestamp, 1e-6)
+        derivative = (value - self._value)/dt
+        alpha_derivative = self._alpha(dt, self.derivative_cutoff)
+        self._derivative = alpha_derivative*derivative + (1 - alpha_derivative)*self._derivative
+
+        alpha = self._alpha(dt, self.min_cutoff + self.beta*np.abs(self._derivative))
+        self._value = (alpha*value + (1 - alpha)*self._value).astype(np.float32)
+        self._timestamp = timestamp
+
+        return self._value.copy()
+
+
+class MotionDetector():
+    """
+    Measures how much a frame changed relative to a reference frame by differencing small grayscale thumbnails.
+    """
+    def __init__(self, size: Tuple[int, int]=(64, 48)) -> None:
+        """
+        Parameters:
+        ----------
+        size : Tuple[int, int], optional
+            Thumbnail (width, height) used for differencing (default is (64, 48)).
+        """
+        self.size = size
+        self.reference: Optional[np.ndarray] = None
+
+    def thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        small = cv.resize(frame, self.size, interpolation=cv.INTER_AREA)
+        return cv.cvtColor(small, cv.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def motion(self, thumbnail: np.ndarray) -> float:
+        """
+        Returns:
+        -------
+        float
+            Mean absolute difference to the reference in [0, 1], 1.0 without a reference.
+        """
+        if self.reference is None:
+            return 1.0
+        return float(cv.absdiff(thumbnail, self.reference).mean())/255
+
+
+class PoseTracker():
+    """
+    Tracks a single person's keypoints and runs HRNet only when the frame changed.
+
+    For each frame the motion since the last inference is measured first:
+    - little motion and a recent inference: the smoothed previous keypoints are reused (no model call),
+    - otherwise HRNet runs on a tight crop around the previous pose, which keeps a small or distant
+      person at full model resolution,
+    - every `full_frame_interval` inferences, or when the pose was lost, the whole frame is used to
+      re-acquire the person.
+    All keypoints are smoothed with a One-Euro filter and returned in frame coordinates.
+    """
+    def __init__(self, session: InferenceSession, max_skip: int=4, motion_threshold: float=0.01,
+                 full_frame_interval: int=10, roi_padding: float=1.4, confidence_threshold: float=0.3,
+                 refinement: str="quarter", smoothing: Optional[OneEuroFilter]=None) -> None:
+        """
+        Parameters:
+        ----------
+        session : InferenceSession
+            The HRNet session.
+        max_skip : int, optional
+            Maximum consecutive frames without inference, so HRNet runs at least every (max_skip + 1)th frame (default is 4).
+        motion_threshold : float, optional
+            Mean thumbnail difference below which a frame counts as static (default is 0.01).
+        full_frame_interval : int, optional
+            Inferences between full frame passes (default is 10).
+        roi_padding : float, optional
+            Growth of the crop around the previous pose (default is 1.4).
+        confidence_threshold : float, optional
+            Keypoints below this confidence are ignored when placing the crop (default is 0.3).
+        refinement : str, optional
+            Sub-pixel keypoint refinement, see decode_heatmaps (default is "quarter").
+        smoothing : OneEuroFilter, optional
+            The keypoint filter (default is OneEuroFilter()).
+        """
+        self.pose = BatchPoseProcessor(session, batch_size=1, refinement=refinement)
+        self.max_skip = max_skip
+        self.motion_threshold = motion_threshold
+        self.full_frame_interval = full_frame_interval
+        self.roi_padding = roi_padding
+        self.confidence_threshold = confidence_threshold
+        self.smoothing = smoothing if smoothing is not None else OneEuroFilter()
+
+        self.motion_detector = MotionDetector()
+        self.counts: Counter = Counter()                                                        # "skipped", "roi" and "full" frames
+        self.reset()
+
+    def reset(self) -> None:
+        self.keypoints: Optional[np.ndarray] = None
+        self.motion_detector.reference = None
+        self.smoothing.reset()
+        self._frames_since_inference = 0
+        self._inferences_since_full = 0
+
+    def __call__(self, frame: np.ndarray, timestamp: Optional[float]=None) -> np.ndarray:
+        """
+        Parameters:
+        ----------
+        frame : np.ndarray
+            A BGR frame (H, W, C).
+        timestamp : float, optional
+            Capture time in seconds (default is now).
+
+        Returns:
+        -------
+        np.ndarray
+            Smoothed keypoints (K, 3) as (y, x, confidence) in frame coordinates.
+        """
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        thumbnail = self.motion_detector.thumbnail(frame)
+
+        static = self.motion_detector.motion(thumbnail) < self.motion_threshold
+        if self.keypoints is not None and static and self._frames_since_inference < self.max_skip:
+            self._frames_since_inference += 1
+            self.counts["skipped"] += 1
+            return self.keypoints
+
+        region = self._roi(frame.shape)
+        if region is None:
+            keypoints = self.pose.infer([frame])[0]
+            self._inferences_since_full = 0
+            self.counts["full"] += 1
+        else:
+            x1, y1, x2, y2 = region
+            keypoints = self.pose.infer([frame[y1:y2, x1:x2]])[0]
+            keypoints[:, 0] += y1
+            keypoints[:, 1] += x1
+            self._inferences_since_full += 1
+            self.counts["roi"] += 1
+
+        keypoints[:, :2] = self.smoothing(keypoints[:, :2], timestamp)
+        self.keypoints = keypoints
+        self.motion_detector.reference = thumbnail
+        self._frames_since_inference = 0
+
+        return keypoints
+
+    def _roi(self, frame_shape: Tuple[int, ...]) -> Optional[np.ndarray]:
+        """
+        Returns:
+        -------
+        Optional[np.ndarray]
+            The (x1, y1, x2, y2) crop around the previous pose, or None for a full frame pass.
+        """
+        if self.keypoints is None or self._inferences_since_full >= self.full_frame_interval:
+            return None
+
+        confident = self.keypoints[self.keypoints[:, 2] >= self.confidence_threshold]
+        if len(confident) < 2:
+            return None
+
+        box = np.array([[confident[:, 1].min(), confident[:, 0].min(), confident[:, 1].max(), confident[:, 0].max()]])
+
+        # Never crop tighter than the model input, upscaling a few pixels only adds blur
+        min_height = self.pose.height/self.roi_padding
+        if box[0, 3] - box[0, 1] < min_height:
+            center_y = (box[0, 1] + box[0, 3])/2
+            box[0, 1], box[0, 3] = center_y - min_height/2, center_y + min_height/2
+        region = crop_regions(box, frame_shape, aspect=self.pose.width/self.pose.height, padding=self.roi_padding)[0]
+        if region[2] - region[0] < 2 or region[3] - region[1] < 2:
+            return None
+
+        return region
@@ -4,18 +4,60 @@
 # modification, are permitted provided that the conditions in LICENSE.txt are met
 
 import onnxruntime as ort
+import numpy as np
 import os
 import json
 import platform
+import threading
 
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import sys
 # print(ort.get_all_providers())
 
+SHARE_EP_CONTEXTS = "ep.share_ep_contexts"
+STOP_SHARE_EP_CONTEXTS = "ep.stop_share_ep_contexts"
+USE_ENV_ALLOCATORS = "session.use_env_allocators"
+
+_env_allocator_lock = threading.Lock()
+_env_allocator_registered = False
+
+
+@dataclass
+class SessionGroup:
+    """
+    Sessions loaded together so they hold one copy of the weights they have in common.
+
+    Attributes:
+        sessions (Dict[str, ort.InferenceSession]): The sessions by graph name.
+        shared_initializers (Dict[str, ort.OrtValue]): Weights every session reads from the same buffer. They
+            must stay alive as long as the sessions, so the group keeps them.
+    """
+    sessions: Dict[str, ort.InferenceSession]
+    shared_initializers: Dict[str, ort.OrtValue] = field(default_factory=dict)
+
+    def __getitem__(self, graph_name: str) -> ort.InferenceSession:
+        return self.sessions[graph_name]
+
+
+def register_env_allocator() -> None:
+    """
+    Registers one CPU arena allocator with the ORT environment, sessions created with
+    `session.use_env_allocators` then allocate from it instead of keeping an arena each.
+    """
+    global _env_allocator_registered
+    with _env_allocator_lock:
+        if _env_allocator_registered:
+            return
+        memory_info = ort.OrtMemoryInfo("Cpu", ort.OrtAllocatorType.ORT_ARENA_ALLOCATOR, 0, ort.OrtMemType.DEFAULT)
+        ort.create_and_register_allocator(memory_info, None)
+        _env_allocator_registered = True
+
+
 class ModelLoader:
-    def __init__(self, model: str, processor: str, model_type: str) -> None:
+    def __init__(self, model: str, processor: str, model_type: str, root_dir: Optional[Path]=None) -> None:
         """
         Initializes an instance with the specified model name, processor type, and model type.
 
@@ -30,12 +72,14 @@ class ModelLoader:
                 Indicates the variant of the model:
                 - For most models: "Default" or "Quantized".
                 - For LLMs: specifies model size (quantized by default).
+            root_dir (Optional[Path]): Repository root containing models.json, executioner.json and
+                the models/ directory. Defaults to the current working directory.
 
         Attributes:
             processor (str): Uppercased processor type for normalization.
             model (str): The name of the specified model.
             model_type (str): Type or variant of the model.
-            root_dir (Path): The current working directory of the environment.
+            root_dir (Path): The repository root (current working directory unless overridden).
             onnx_root (Path): The resolved path to the ONNX Runtime installation.
             model_config (dict): Parsed configuration data from models.json.
             executioner_config (dict): Parsed configuration data from executioner.json.
@@ -45,7 +89,7 @@ class ModelLoader:
         self.processor = processor.upper()
         self.model = model
         self.model_type = model_type
-        self.root_dir = Path.cwd()
+        self.root_dir = Path(root_dir) if root_dir is not None else Path.cwd()
         self.onnx_root = Path(ort.__file__).parent.resolve()
 
         self.platform_manager()
@@ -145,7 +189,8 @@ class ModelLoader:
     def load_model(self, onnx_graph: ort, htp_performance_mode: str="burst", 
                    soc_model: str="60", profiling_level: str="off",
                    profiling_file_path: str=None, 
-                   htp_graph_finalization_optimization_mode: str="3") -> ort.InferenceSession:
+                   htp_graph_finalization_optimization_mode: str="3",
+                   session_options: Optional[ort.SessionOptions]=None) -> ort.InferenceSession:
         """
         Loads an ONNX model and configures an InferenceSession with QNN execution provider options.
 
@@ -161,6 +206,8 @@ class ModelLoader:
             profiling_level (str): Profiling verbosity level (e.g., "off", "basic", "detailed").
             profiling_file_path (str, optional): Path to write profiling results. Defaults to model directory.
             htp_graph_finalization_optimization_mode (str): Graph optimization level (e.g., "1", "2", "3").
+            session_options (Optional[ort.SessionOptions]): Options to create the session with, e.g. from
+                load_session_group(). Defaults to new options.
 
         Returns:
             ort.InferenceSession: An ONNX Runtime InferenceSession configured with the specified QNN provider.
@@ -168,7 +215,7 @@ class ModelLoader:
         Raises:
             ValueError: If processor configuration is missing or invalid.
         """
-        session_options = ort.SessionOptions()
+        session_options = session_options if session_options is not None else ort.SessionOptions()
         
         model_path = self.model_subdirectory_path/onnx_graph
         executioner = self._get_executioner()
@@ -192,6 +239,54 @@ class ModelLoader:
                                        )
 
         return session
+
+    def load_session_group(self, graphs: Dict[str, str],
+                           shared_initializers: Optional[Dict[str, np.ndarray]]=None,
+                           share_ep_contexts: bool=True,
+                           share_allocator: bool=True,
+                           **load_kwargs) -> SessionGroup:
+        """
+        Loads related graphs, such as DeepSeek's CONTEXT and CONTEXT_ITER, so their common weights are resident once.
+
+        Three ORT mechanisms are combined:
+        - EP context sharing (`ep.share_ep_contexts`): QNN context graphs compiled from the same context
+          binary reuse the loaded QNN context and its weights instead of loading it per session. The last
+          session of the group sets `ep.stop_share_ep_contexts`, so later sessions don't join the group.
+        - Shared initializers: weights passed in `shared_initializers` are wrapped in one OrtValue each and
+          added to every session's options, so all sessions read the same buffer instead of a copy per graph.
+        - A shared CPU arena (`session.use_env_allocators`) instead of one arena per session.
+
+        Args:
+            graphs (Dict[str, str]): ONNX filenames by graph name, in load order.
+            shared_initializers (Optional[Dict[str, np.ndarray]]): Initializers by name that replace the weights of
+                the same name in the graphs.
+            share_ep_contexts (bool): If True, enables EP context sharing across the group.
+            share_allocator (bool): If True, all sessions allocate from one environment CPU arena.
+            **load_kwargs: Passed on to load_model(), e.g. htp_performance_mode.
+
+        Returns:
+            SessionGroup: The loaded sessions and the shared weights.
+        """
+        initializers = {name: ort.OrtValue.ortvalue_from_numpy(np.ascontiguousarray(array))
+                        for name, array in (shared_initializers or {}).items()}
+        if share_allocator:
+            register_env_allocator()
+
+        sessions = {}
+        for index, (graph_name, graph) in enumerate(graphs.items()):
+            session_options = ort.SessionOptions()
+            if share_ep_contexts:
+                session_options.add_session_config_entry(SHARE_EP_CONTEXTS, "1")
+                if index == len(graphs) - 1:
+                    session_options.add_session_config_entry(STOP_SHARE_EP_CONTEXTS, "1")
+            if share_allocator:
+                session_options.add_session_config_entry(USE_ENV_ALLOCATORS, "1")
+            for name, value in initializers.items():
+                session_options.add_initializer(name, value)
+
+            sessions[graph_name] = self.load_model(graph, session_options=session_options, **load_kwargs)
+
+        return SessionGroup(sessions=sessions, shared_initializers=initializers)
     
     @property
     def graphs(self) -> str:
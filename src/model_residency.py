@@ -0,0 +1,415 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import logging
+import mmap
+import threading
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import onnxruntime as ort
+
+from onnx_protobuf import fields, string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OVERHEAD = 1.1
+
+
+def _referenced_files(buffer: memoryview) -> Iterator[str]:
+    """
+    Yields the paths an ONNX model refers to: the external data `location` of its initializers and the
+    `ep_cache_context` of EPContext nodes whose context binary is stored next to the model (embed_mode=0).
+    """
+    graph = next((value for number, _, value in fields(buffer) if number == 7), None)
+    if graph is None:
+        return
+    for number, _, value in fields(buffer, *graph):
+        if number == 1:                                                             # NodeProto
+            op_type, attributes = None, {}
+            for node_number, _, node_value in fields(buffer, *value):
+                if node_number == 4:
+                    op_type = string(buffer, node_value)
+                elif node_number == 5:
+                    attribute = {key: item for key, _, item in fields(buffer, *node_value)}
+                    attributes[string(buffer, attribute[1])] = attribute
+            embed_mode = attributes.get("embed_mode", {3: 1}).get(3, 0)                # Embedded unless stated
+            if op_type == "EPContext" and embed_mode == 0 and "ep_cache_context" in attributes:
+                yield string(buffer, attributes["ep_cache_context"][4])
+        elif number == 5:                                                           # Initializer TensorProto
+            for tensor_number, _, tensor_value in fields(buffer, *value):
+                if tensor_number == 13:
+                    entry = {key: item for key, _, item in fields(buffer, *tensor_value)}
+                    if string(buffer, entry[1]) == "location":
+                        yield string(buffer, entry[2])
+
+
+def session_files(model_path: Path) -> Dict[Path, int]:
+    """
+    Lists the files a session maps once loaded: the model and the external data files and QNN context
+    binaries it references.
+
+    Args:
+        model_path (Path): The ONNX model.
+
+    Returns:
+        Dict[Path, int]: Sizes by resolved path, so files shared between graphs can be counted once.
+    """
+    model_path = Path(model_path).resolve()
+    files = {model_path: model_path.stat().st_size}
+    if not files[model_path]:
+        return files
+    with open(model_path, "rb") as f:
+        buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    for location in _referenced_files(buffer):
+        path = (model_path.parent/location).resolve()
+        if path.is_file():
+            files[path] = path.stat().st_size
+    return files
+
+
+def estimate_session_memory(model_path: Path, overhead: float=DEFAULT_OVERHEAD) -> int:
+    """
+    Estimates the memory a session holds once loaded, from the size of its model file and of the
+    external data and QNN context binaries the model references.
+
+    Args:
+        model_path (Path): The ONNX model.
+        overhead (float): Factor for runtime allocations on top of the weights.
+
+    Returns:
+        int: Estimated resident bytes.
+    """
+    return int(sum(session_files(model_path).values())*overhead)
+
+
+@dataclass
+class _Entry:
+    loader: Any
+    graph: str
+    estimate: int
+    files: Dict[Path, int] = field(default_factory=dict)
+    load_kwargs: Dict[str, Any] = field(default_factory=dict)
+    unit: Tuple[str, ...] = ()
+    group: Tuple[str, ...] = ()
+    session: Optional[ort.InferenceSession] = None
+    session_group: Any = None
+    pins: int = 0
+    kept: bool = False
+    loads: int = 0
+
+    @property
+    def in_use(self) -> bool:
+        return bool(self.pins) or self.kept
+
+
+class ModelResidency:
+    def __init__(self, budget_bytes: int, overhead: float=DEFAULT_OVERHEAD) -> None:
+        """
+        Keeps the sessions of several models within a memory budget inside one process, e.g. HRNet pose next to
+        the person detector, or the graphs of a DeepSeek variant.
+
+        Sessions are registered with their ModelLoader and graph and only loaded when first used. When loading
+        one would exceed the budget, the least recently used sessions that are not running are released, and
+        they are loaded again transparently on their next use through their ResidentSession. Graphs that every
+        step runs in turn are kept together as one unit (see keep_together), so a budget below the per-step
+        working set is rejected up front instead of reloading a graph on every step. Graphs sharing weights are
+        loaded with ModelLoader.load_session_group (see share_weights), so the budget keeps that sharing.
+
+        A released session is only freed once nothing else references it. An IOBinding is tied to the session
+        it was created from, so a session stays resident for good once a binding was created through its
+        ResidentSession.
+
+        Args:
+            budget_bytes (int): Total estimated bytes all resident sessions may use.
+            overhead (float): Factor for runtime allocations on top of the weight files.
+
+        Attributes:
+            budget_bytes (int): The memory budget.
+            evictions (int): Sessions released to make room so far.
+        """
+        self.budget_bytes = budget_bytes
+        self.overhead = overhead
+        self.evictions = 0
+        self._entries: Dict[str, _Entry] = {}
+        self._resident: "OrderedDict[str, None]" = OrderedDict()               # Least recently used first
+        self._lock = threading.RLock()
+
+    def register(self, name: str, loader: Any, graph: str, estimate: Optional[int]=None,
+                 **load_kwargs) -> "ResidentSession":
+        """
+        Registers a graph without loading it.
+
+        Args:
+            name (str): Unique name of the session, e.g. "DEEPSEEK_7B/CONTEXT".
+            loader (ModelLoader): Loader whose load_model() creates the session.
+            graph (str): The ONNX filename inside the loader's model subdirectory.
+            estimate (Optional[int]): Resident bytes of the session. By default it is estimated from the model
+                files, and files shared with other registered sessions are only counted once.
+            **load_kwargs: Passed on to load_model(), e.g. htp_performance_mode.
+
+        Returns:
+            ResidentSession: A stand-in for the session that loads it on demand.
+
+        Raises:
+            ValueError: If the name is taken or the session alone exceeds the budget.
+        """
+        files = {}
+        if estimate is None:
+            files = session_files(Path(loader.model_subdirectory_path)/graph)
+            estimate = int(sum(files.values())*self.overhead)
+        with self._lock:
+            if name in self._entries:
+                raise ValueError(f"Session {name} is already registered")
+            if estimate > self.budget_bytes:
+                raise ValueError(f"Session {name} needs ~{estimate/2**20:.0f} MB, more than the budget of "
+                                 f"{self.budget_bytes/2**20:.0f} MB")
+            self._entries[name] = _Entry(loader=loader, graph=graph, estimate=estimate, files=files,
+                                         load_kwargs=load_kwargs)
+
+        return ResidentSession(self, name)
+
+    def register_model(self, loader: Any, working_set: Optional[Sequence[str]]=None,
+                       session_group: Optional[Sequence[str]]=None, **load_kwargs) -> Dict[str, "ResidentSession"]:
+        """
+        Registers every ONNX graph of a loader's model as listed in models.json.
+
+        Args:
+            loader (ModelLoader): The model's loader.
+            working_set (Optional[Sequence[str]]): Graph names run on every step, e.g. EMBEDDING, CONTEXT_ITER
+                and HEAD for each DeepSeek token. They are kept together, see keep_together().
+            session_group (Optional[Sequence[str]]): Graph names sharing weights, e.g. CONTEXT and CONTEXT_ITER.
+                They are loaded as one session group, see share_weights().
+            **load_kwargs: Passed on to load_model() or load_session_group().
+
+        Returns:
+            Dict[str, ResidentSession]: Sessions by graph name ("EMBEDDING", "CONTEXT", ...), or under the
+                model name for single-graph models.
+
+        Raises:
+            ValueError: If the working set does not fit the budget.
+        """
+        graphs = loader.graphs
+        if isinstance(graphs, str):
+            graphs = {loader.model.upper(): graphs}
+
+        sessions = {graph_name: self.register(f"{loader.model.upper()}/{graph_name}", loader, graph, **load_kwargs)
+                    for graph_name, graph in graphs.items() if str(graph).endswith(".onnx")}
+        if session_group:
+            self.share_weights([sessions[graph_name].name for graph_name in session_group if graph_name in sessions])
+        if working_set:
+            self.keep_together([sessions[graph_name].name for graph_name in working_set if graph_name in sessions])
+        return sessions
+
+    def share_weights(self, names: Sequence[str]) -> None:
+        """
+        Loads sessions of one loader through its load_session_group(), so they share EP contexts and the CPU
+        arena as without a budget. They are also kept together, as a group can only be loaded as a whole.
+
+        Args:
+            names (Sequence[str]): Registered session names of the same loader.
+
+        Raises:
+            ValueError: If the sessions have different loaders or together exceed the budget.
+        """
+        with self._lock:
+            group = tuple(dict.fromkeys(names))
+            if len({id(self._entries[name].loader) for name in group}) > 1:
+                raise ValueError(f"Sessions {list(group)} must come from the same loader to share weights")
+            self.keep_together(group)
+            for name in group:
+                self._entries[name].group = group
+
+    def keep_together(self, names: Sequence[str]) -> None:
+        """
+        Treats sessions that run one after the other on every step as one unit: they are loaded and released
+        together, so the least recently used policy never releases one of them to make room for another.
+
+        Args:
+            names (Sequence[str]): Registered session names.
+
+        Raises:
+            ValueError: If the sessions together exceed the budget, which would reload them on every step.
+        """
+        with self._lock:
+            # Units overlapping an existing one are merged, e.g. a weight-sharing group and the per-step graphs
+            unit = tuple(dict.fromkeys(member for name in names for member in self._unit(name)))
+            needed = self._footprint(unit)
+            if needed > self.budget_bytes:
+                raise ValueError(f"Sessions {list(unit)} run on every step and need ~{needed/2**20:.0f} MB together, "
+                                 f"more than the budget of {self.budget_bytes/2**20:.0f} MB")
+            for name in unit:
+                self._entries[name].unit = unit
+
+    @property
+    def used_bytes(self) -> int:
+        with self._lock:
+            return self._footprint(self._resident)
+
+    @property
+    def resident(self) -> List[str]:
+        """
+        Returns:
+            List[str]: Names of the loaded sessions, least recently used first.
+        """
+        with self._lock:
+            return list(self._resident)
+
+    def session(self, name: str) -> ort.InferenceSession:
+        """
+        Returns the loaded session, loading it (and the rest of its unit) first and releasing others if needed.
+
+        Raises:
+            ValueError: If the session can't fit because the other sessions are running.
+        """
+        with self._lock:
+            entry = self._entries[name]
+            if entry.session is None:
+                unit = self._unit(name)
+                self._make_room(name, unit)
+                for member in unit:
+                    if self._entries[member].session is None:
+                        self._load(member)
+                    self._resident[member] = None
+                    self._resident.move_to_end(member)
+            self._resident[name] = None
+            self._resident.move_to_end(name)
+            return entry.session
+
+    @contextmanager
+    def pinned(self, name: str) -> Iterator[ort.InferenceSession]:
+        """
+        Keeps a session loaded while the block runs.
+        """
+        with self._lock:
+            session = self.session(name)
+            self._entries[name].pins += 1
+        try:
+            yield session
+        finally:
+            with self._lock:
+                self._entries[name].pins = max(self._entries[name].pins - 1, 0)
+
+    def keep_resident(self, name: str) -> ort.InferenceSession:
+        """
+        Loads a session and keeps it loaded until it is evicted explicitly with force=True. Calling it again
+        for a session that is already kept does not stack.
+        """
+        with self._lock:
+            session = self.session(name)
+            self._entries[name].kept = True
+            return session
+
+    def evict(self, name: str, force: bool=False) -> None:
+        """
+        Releases a session together with the rest of its unit.
+
+        Raises:
+            ValueError: If one of them is in use and force is False.
+        """
+        with self._lock:
+            unit = self._unit(name)
+            in_use = [member for member in unit if self._entries[member].in_use]
+            if in_use and not force:
+                raise ValueError(f"Session {in_use[0]} is in use")
+            for member in unit:
+                entry = self._entries[member]
+                entry.session = None
+                entry.session_group = None
+                entry.pins = 0
+                entry.kept = False
+                self._resident.pop(member, None)
+
+    def clear(self) -> None:
+        for name in self.resident:
+            self.evict(name, force=True)
+
+    def _load(self, name: str) -> None:
+        """
+        Loads a session, or every session of its weight-sharing group at once.
+        """
+        entry = self._entries[name]
+        members = entry.group or (name,)
+        if entry.group:
+            session_group = entry.loader.load_session_group({member: self._entries[member].graph for member in members},
+                                                            **entry.load_kwargs)
+            for member in members:
+                self._entries[member].session = session_group[member]
+                self._entries[member].session_group = session_group         # Keeps the shared initializers alive
+        else:
+            entry.session = entry.loader.load_model(entry.graph, **entry.load_kwargs)
+
+        for member in members:
+            member_entry = self._entries[member]
+            member_entry.loads += 1
+            if member_entry.loads > 1:
+                logger.info(f"Reloaded {member} (~{member_entry.estimate/2**20:.0f} MB)")
+
+    def _unit(self, name: str) -> Tuple[str, ...]:
+        return self._entries[name].unit or (name,)
+
+    def _footprint(self, names: Iterable[str]) -> int:
+        """
+        Estimated bytes of the sessions together, counting weight files they share once.
+        """
+        estimated, files = 0, {}
+        for name in names:
+            entry = self._entries[name]
+            if entry.files:
+                files.update(entry.files)
+            else:
+                estimated += entry.estimate
+        return estimated + int(sum(files.values())*self.overhead)
+
+    def _make_room(self, name: str, unit: Tuple[str, ...]) -> None:
+        for candidate in list(self._resident):
+            if self._footprint({*self._resident, *unit}) <= self.budget_bytes:
+                return
+            if candidate in unit or candidate not in self._resident:
+                continue
+            if any(self._entries[member].in_use for member in self._unit(candidate)):
+                continue
+            logger.info(f"Releasing {candidate} (~{self._entries[candidate].estimate/2**20:.0f} MB) to load {name}")
+            self.evict(candidate)
+            self.evictions += 1
+
+        if self._footprint({*self._resident, *unit}) > self.budget_bytes:
+            raise ValueError(f"Cannot load {name} within {self.budget_bytes/2**20:.0f} MB, "
+                             f"the resident sessions {self.resident} are in use")
+
+
+class ResidentSession:
+    def __init__(self, residency: ModelResidency, name: str) -> None:
+        """
+        Stand-in for an InferenceSession managed by a ModelResidency, usable wherever the session is.
+
+        Every call loads the session if it was released and marks it as recently used; run() also
+        keeps it loaded until the call returns.
+
+        Args:
+            residency (ModelResidency): The owning manager.
+            name (str): The registered session name.
+        """
+        self.residency = residency
+        self.name = name
+
+    def run(self, *args, **kwargs) -> List[Any]:
+        with self.residency.pinned(self.name) as session:
+            return session.run(*args, **kwargs)
+
+    def io_binding(self) -> ort.IOBinding:
+        # Bindings refer to this session, so it is kept resident once rather than pinned per binding
+        return self.residency.keep_resident(self.name).io_binding()
+
+    def run_with_iobinding(self, *args, **kwargs) -> None:
+        with self.residency.pinned(self.name) as session:
+            return session.run_with_iobinding(*args, **kwargs)
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self.residency.session(self.name), attribute)
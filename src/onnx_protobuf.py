@@ -0,0 +1,54 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+from typing import Iterator, Optional, Tuple, Union
+
+# Minimal protobuf reader for ONNX files, reads graphs without the onnx package or copying large payloads
+VARINT, FIXED64, LENGTH_DELIMITED, FIXED32 = 0, 1, 2, 5
+
+
+def read_varint(buffer: memoryview, position: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = buffer[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, position
+        shift += 7
+
+
+def fields(buffer: memoryview, start: int=0, end: Optional[int]=None) -> Iterator[Tuple[int, int, Union[int, Tuple[int, int]]]]:
+    """
+    Walks the fields of a protobuf message.
+
+    Yields:
+        Tuple[int, int, Union[int, Tuple[int, int]]]: (field number, wire type, value), where the value of a
+            length-delimited field is its (start, end) byte range so large payloads are never copied.
+    """
+    position = start
+    end = len(buffer) if end is None else end
+    while position < end:
+        key, position = read_varint(buffer, position)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == VARINT:
+            value, position = read_varint(buffer, position)
+            yield number, wire_type, value
+        elif wire_type == LENGTH_DELIMITED:
+            length, position = read_varint(buffer, position)
+            yield number, wire_type, (position, position + length)
+            position += length
+        elif wire_type == FIXED64:
+            yield number, wire_type, int.from_bytes(buffer[position:position + 8], "little")
+            position += 8
+        elif wire_type == FIXED32:
+            yield number, wire_type, int.from_bytes(buffer[position:position + 4], "little")
+            position += 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+
+
+def string(buffer: memoryview, span: Tuple[int, int]) -> str:
+    return bytes(buffer[span[0]:span[1]]).decode()
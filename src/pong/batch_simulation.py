@@ -0,0 +1,255 @@
+# -----------------------------------------------------------------------------
+#
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# -----------------------------------------------------------------------------
+
+
+import time
+import numpy as np
+from dataclasses import dataclass
+from game_config import GameConfig
+from simulation import FIELD_HEIGHT, FIELD_WIDTH, MAX_SCORE, REFERENCE_FPS, SIMULATION_HZ
+
+
+# Paddle actions, matching the screen's y axis
+UP: int = -1
+STAY: int = 0
+DOWN: int = 1
+
+OBSERVATION_SIZE: int = 6  # ball x, ball y, ball dx, ball dy, player 1 paddle y, player 2 paddle y
+
+
+class BatchPongSimulation:
+    """
+    Steps many independent pong matches at once with NumPy.
+
+    The state is kept as one array per quantity (structure of arrays), so collisions, bounces,
+    acceleration and scoring are evaluated for every game with a handful of vectorized operations.
+    The physics match `simulation.PongSimulation` without the countdown: after a point the ball is
+    served again immediately. Finished matches are frozen until the next `reset`.
+
+    The API follows the gym convention: `reset()` returns the observations and `step(actions)` returns
+    observations, rewards, done flags and an info dict.
+    """
+
+    def __init__(self, config: GameConfig, num_games: int, width: float = FIELD_WIDTH,
+                 height: float = FIELD_HEIGHT, max_score: int = MAX_SCORE, dt: float = 1 / SIMULATION_HZ,
+                 seed: int | None = None) -> None:
+        self.config = config
+        self.num_games = num_games
+        self.width = width
+        self.height = height
+        self.max_score = max_score
+        self.dt = dt
+        self.rng = np.random.default_rng(seed)
+
+        # Speeds in GameConfig are pixels per frame at the reference frame rate
+        self.ball_radius = float(config.ball_radius)
+        self.ball_initial_speed = config.ball_initial_speed * REFERENCE_FPS
+        self.ball_acceleration = config.ball_acceleration_factor * REFERENCE_FPS
+        self.paddle_x = np.array([config.player_1_paddle_width, width - config.player_2_paddle_width * 2],
+                                 dtype=np.float64)
+        self.paddle_width = np.array([config.player_1_paddle_width, config.player_2_paddle_width],
+                                     dtype=np.float64)
+        self.paddle_height = np.array([config.player_1_paddle_height, config.player_2_paddle_height],
+                                      dtype=np.float64)
+        self.paddle_speed = np.array([config.player_1_paddle_speed, config.player_2_paddle_speed],
+                                     dtype=np.float64) * REFERENCE_FPS
+
+        self.reset()
+
+    def reset(self, seed: int | None = None) -> np.ndarray:
+        """
+        Starts every match from 0-0 with the first serve towards player 2.
+
+        Returns:
+            np.ndarray: Observations of shape (num_games, OBSERVATION_SIZE).
+        """
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+
+        n = self.num_games
+        self.paddle_y = np.empty((n, 2), dtype=np.float64)
+        self.ball_x = np.empty(n, dtype=np.float64)
+        self.ball_y = np.empty(n, dtype=np.float64)
+        self.ball_dx = np.empty(n, dtype=np.float64)
+        self.ball_dy = np.empty(n, dtype=np.float64)
+        self.ball_speed = np.empty(n, dtype=np.float64)
+
+        self.scores = np.zeros((n, 2), dtype=np.int32)
+        self.hits = np.zeros(n, dtype=np.int32)  # Paddle hits in the current rally
+        self.total_hits = np.zeros(n, dtype=np.int64)
+        self.rallies = np.zeros(n, dtype=np.int32)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.done = np.zeros(n, dtype=bool)
+
+        self._serve(np.ones(n, dtype=bool), np.ones(n, dtype=np.int8))
+
+        return self.observation()
+
+    def observation(self) -> np.ndarray:
+        return np.stack([self.ball_x, self.ball_y, self.ball_dx, self.ball_dy,
+                         self.paddle_y[:, 0], self.paddle_y[:, 1]], axis=1).astype(np.float32)
+
+    def step(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict]:
+        """
+        Advances every unfinished match by one time step.
+
+        Args:
+            actions (np.ndarray): Paddle actions of shape (num_games, 2), each UP, STAY or DOWN.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray, dict]: Observations, rewards from player 1's point
+            of view (+1 when player 1 scores, -1 when player 2 scores), done flags and an info dict
+            holding the scorer of this step per game (0 if nobody scored).
+        """
+        actions = np.asarray(actions)
+        if actions.shape != (self.num_games, 2):
+            raise ValueError(f"Expected actions of shape {(self.num_games, 2)} but got {actions.shape}")
+
+        active = ~self.done
+        self.steps += active
+
+        # Paddles, kept within field bounds
+        self.paddle_y += np.clip(actions, -1, 1) * self.paddle_speed * self.dt * active[:, None]
+        np.clip(self.paddle_y, 0.0, self.height - self.paddle_height, out=self.paddle_y)
+
+        ball_x, ball_y, r = self.ball_x, self.ball_y, self.ball_radius
+        ball_x += self.ball_dx * self.dt * active
+        ball_y += self.ball_dy * self.dt * active
+
+        # Ball collision with top/bottom walls
+        top = active & (ball_y - r <= 0)
+        bottom = active & (ball_y + r >= self.height) & ~top
+        ball_y[top] = r
+        ball_y[bottom] = self.height - r
+        self.ball_dy[top] = np.abs(self.ball_dy[top])
+        self.ball_dy[bottom] = -np.abs(self.ball_dy[bottom])
+
+        # Ball collision with paddles, pushed out of the paddle to prevent sticking
+        hit_1 = active & (self.ball_dx < 0) & self._overlaps(0)
+        hit_2 = active & (self.ball_dx > 0) & self._overlaps(1) & ~hit_1
+        hit = hit_1 | hit_2
+        self.ball_speed[hit] += self.ball_acceleration
+        self.ball_dx[hit] = np.where(hit_1[hit], 1.0, -1.0) * self.ball_speed[hit]
+        self.ball_dy[hit] = np.where(self.ball_dy[hit] > 0, 1.0, -1.0) * self.ball_speed[hit]
+        ball_x[hit_1] = self.paddle_x[0] + self.paddle_width[0] + r
+        ball_x[hit_2] = self.paddle_x[1] - r
+        self.hits += hit
+
+        # Scoring (ball out of bounds)
+        scored_2 = active & (ball_x - r <= 0)
+        scored_1 = active & (ball_x + r >= self.width) & ~scored_2
+        scorer = np.where(scored_1, 1, np.where(scored_2, 2, 0)).astype(np.int8)
+        scored = scorer > 0
+
+        self.scores[:, 0] += scored_1
+        self.scores[:, 1] += scored_2
+        self.total_hits += np.where(scored, self.hits, 0)
+        self.rallies += scored
+        self.done |= self.scores.max(axis=1) >= self.max_score
+
+        serve = scored & ~self.done
+        if serve.any():
+            self._serve(serve, scorer)
+
+        rewards = scored_1.astype(np.float32) - scored_2.astype(np.float32)
+
+        return self.observation(), rewards, self.done.copy(), {"scorer": scorer}
+
+    def _overlaps(self, player: int) -> np.ndarray:
+        r = self.ball_radius
+        left = self.paddle_x[player]
+        top = self.paddle_y[:, player]
+
+        return ((self.ball_x - r < left + self.paddle_width[player]) & (self.ball_x + r > left)
+                & (self.ball_y - r < top + self.paddle_height[player]) & (self.ball_y + r > top))
+
+    def _serve(self, mask: np.ndarray, last_scorer: np.ndarray) -> None:
+        """Centers paddles and ball for the games in `mask`, the ball travels away from the last scorer."""
+        count = int(mask.sum())
+
+        self.paddle_y[mask] = self.height / 2 - self.paddle_height / 2
+        self.ball_x[mask] = self.width / 2
+        self.ball_y[mask] = self.height / 2
+        self.ball_speed[mask] = self.ball_initial_speed
+        self.ball_dx[mask] = np.where(last_scorer[mask] == 1, 1.0, -1.0) * self.ball_initial_speed
+        self.ball_dy[mask] = self.rng.choice([-1.0, 1.0], size=count) * self.ball_initial_speed
+        self.hits[mask] = 0
+
+
+def track_ball_actions(simulation: BatchPongSimulation, reaction: float = 1.0,
+                       rng: np.random.Generator | None = None) -> np.ndarray:
+    """
+    Actions for both paddles of an opponent that follows the ball's height.
+
+    Args:
+        simulation (BatchPongSimulation): The simulation to act in.
+        reaction (float): Probability that a paddle reacts on a given step, lower is a weaker player.
+        rng (np.random.Generator | None): Random generator used when `reaction` is below 1.
+
+    Returns:
+        np.ndarray: Actions of shape (num_games, 2).
+    """
+    centers = simulation.paddle_y + simulation.paddle_height / 2
+    offset = simulation.ball_y[:, None] - centers
+    dead_zone = simulation.paddle_height / 4
+
+    actions = np.where(offset < -dead_zone, UP, np.where(offset > dead_zone, DOWN, STAY)).astype(np.int8)
+    if reaction < 1.0:
+        rng = rng if rng is not None else simulation.rng
+        actions[rng.random(actions.shape) >= reaction] = STAY
+
+    return actions
+
+
+@dataclass
+class PlayabilityReport:
+    num_games: int
+    finished_fraction: float  # Matches that reached the max score within the step budget
+    player_1_win_rate: float  # Among finished matches
+    mean_rally_hits: float  # Paddle hits per point
+    mean_match_seconds: float  # Simulated game time per finished match
+    wall_seconds: float
+
+
+def evaluate_config(config: GameConfig, num_games: int = 1000, max_steps: int = 60 * SIMULATION_HZ * 10,
+                    reaction: float = 0.8, seed: int | None = 0) -> PlayabilityReport:
+    """
+    Simulates many matches between two ball-tracking players to judge whether a configuration is playable.
+
+    Short rallies point to a ball that is too fast or paddles that are too small, a skewed win rate to
+    an unfair configuration, and unfinished matches to endless rallies.
+
+    Args:
+        config (GameConfig): The configuration to evaluate, e.g. one returned by the model.
+        num_games (int): Number of matches simulated in parallel.
+        max_steps (int): Step budget per match (10 minutes of game time by default).
+        reaction (float): Reaction probability of both simulated players, see `track_ball_actions`.
+        seed (int | None): Seed for serves and reactions.
+
+    Returns:
+        PlayabilityReport: Aggregated match statistics.
+    """
+    start = time.perf_counter()
+    simulation = BatchPongSimulation(config, num_games, seed=seed)
+
+    for _ in range(max_steps):
+        simulation.step(track_ball_actions(simulation, reaction))
+        if simulation.done.all():
+            break
+
+    finished = simulation.done
+    winners_1 = finished & (simulation.scores[:, 0] >= simulation.max_score)
+    rallies = max(int(simulation.rallies.sum()), 1)
+
+    return PlayabilityReport(
+        num_games=num_games,
+        finished_fraction=float(finished.mean()),
+        player_1_win_rate=float(winners_1.sum() / finished.sum()) if finished.any() else 0.0,
+        mean_rally_hits=float(simulation.total_hits.sum() / rallies),
+        mean_match_seconds=float(simulation.steps[finished].mean() * simulation.dt) if finished.any() else 0.0,
+        wall_seconds=time.perf_counter() - start,
+    )
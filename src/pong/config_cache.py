@@ -0,0 +1,154 @@
+# -----------------------------------------------------------------------------
+#
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# -----------------------------------------------------------------------------
+
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Callable
+from game_config import GameConfig
+
+
+DEFAULT_CACHE_PATH: Path = Path(__file__).resolve().parent / "game_config_cache.json"
+DEFAULT_MAX_ENTRIES: int = 256
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercases a prompt and strips punctuation and repeated whitespace."""
+    prompt = re.sub(r"[^\w\s]", " ", prompt.lower())
+
+    return " ".join(prompt.split())
+
+
+def config_fingerprint(config: GameConfig) -> str:
+    """Hashes the gameplay-relevant fields of a configuration (the change summary is ignored)."""
+    config_json = config.model_dump_json(exclude={"change_summary"})
+
+    return hashlib.sha256(config_json.encode("utf-8")).hexdigest()[:16]
+
+
+class GameConfigCache:
+    """
+    A persistent LRU cache of generated game configurations.
+
+    Entries are keyed on the normalized prompt, the player who scored last and a fingerprint of the
+    configuration the prompt was applied to, so "Make the ball faster!" and "make the ball faster"
+    share an entry. The cache is stored as JSON and rewritten after every insertion. It also counts
+    how often each normalized prompt is requested so common prompts can be generated ahead of time.
+    """
+
+    def __init__(self, path: Path | None = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.path = Path(path) if path is not None else None
+        self.max_entries = max_entries
+
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._prompt_counts: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+        self.load()
+
+    @staticmethod
+    def make_key(prompt: str, last_scored_player: int, previous_config: GameConfig) -> str:
+        return f"{normalize_prompt(prompt)}|{last_scored_player}|{config_fingerprint(previous_config)}"
+
+    def get(self, prompt: str, last_scored_player: int, previous_config: GameConfig) -> GameConfig | None:
+        """Returns the cached configuration for a request and records the prompt as requested."""
+        key = self.make_key(prompt, last_scored_player, previous_config)
+
+        with self._lock:
+            self._prompt_counts[normalize_prompt(prompt)] += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+
+        return GameConfig.model_validate(entry)
+
+    def contains(self, prompt: str, last_scored_player: int, previous_config: GameConfig) -> bool:
+        with self._lock:
+            return self.make_key(prompt, last_scored_player, previous_config) in self._entries
+
+    def put(self, prompt: str, last_scored_player: int, previous_config: GameConfig, config: GameConfig) -> None:
+        key = self.make_key(prompt, last_scored_player, previous_config)
+
+        with self._lock:
+            self._entries[key] = config.model_dump(mode="json")
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        self.save()
+
+    def common_prompts(self, count: int = 3) -> list[str]:
+        """Returns the most frequently requested normalized prompts."""
+        with self._lock:
+            return [prompt for prompt, _ in self._prompt_counts.most_common(count)]
+
+    def precompute(self, prompts: list[str], last_scored_player: int, previous_config: GameConfig,
+                   generate: Callable[[str, int, GameConfig], GameConfig],
+                   stop_event: threading.Event | None = None) -> int:
+        """
+        Generates and stores configurations for prompts that are not cached yet.
+
+        Intended to run on a background thread while a round is being played. Generation stops
+        between prompts once `stop_event` is set.
+
+        Returns:
+            int: The number of new entries added to the cache.
+        """
+        added = 0
+        for prompt in prompts:
+            if stop_event is not None and stop_event.is_set():
+                break
+            if self.contains(prompt, last_scored_player, previous_config):
+                continue
+
+            config = generate(prompt, last_scored_player, previous_config)
+            self.put(prompt, last_scored_player, previous_config, config)
+            added += 1
+
+        return added
+
+    def load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            # A corrupt cache is only a performance loss, start over
+            return
+
+        with self._lock:
+            self._entries = OrderedDict(data.get("entries", []))
+            self._prompt_counts = Counter(data.get("prompt_counts", {}))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+
+        with self._lock:
+            data = {
+                "entries": list(self._entries.items()),
+                "prompt_counts": dict(self._prompt_counts),
+            }
+
+            # Write to a temporary file first so an interrupted write never corrupts the cache
+            temporary_path = self.path.with_suffix(".tmp")
+            with open(temporary_path, "w") as f:
+                json.dump(data, f)
+            os.replace(temporary_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
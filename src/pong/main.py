@@ -8,13 +8,17 @@
 
 import pygame
 from game_config import GameConfig
-from model_inference import generate_game_config
-import threading
-from time import sleep
-from enum import Enum, auto
-from typing import Tuple, Any
+from config_cache import GameConfigCache
+from model_executor import ModelJob, ModelJobExecutor
+from model_inference import generate_game_config, get_backend
+from prefetch import PromptPrefetcher
+from render_cache import DirtyRectRenderer, TextRenderCache
+from simulation import MAX_SCORE, Direction, FixedTimestepLoop, PongSimulation, Snapshot
+from functools import partial
+import queue
+from typing import Any
+import math
 import sys
-import random
 
 
 initial_paddle_width: int = 15
@@ -70,19 +74,32 @@ SCREEN_HEIGHT: int = 600
 
 FPS: int = 60
 
-MAX_SCORE: int = 5
 last_scored_player: int = 1
 
-MAX_COUNTDOWN: int = 3
-current_countdown: int = MAX_COUNTDOWN
-countdown_active: bool = True  # The first round starts with a countdown
+# Physics run at a fixed rate independent of the frame rate, the countdown is part of the simulation
+simulation: PongSimulation = PongSimulation(
+    game_config, SCREEN_WIDTH, SCREEN_HEIGHT, MAX_SCORE)
+frame_timer: FixedTimestepLoop = FixedTimestepLoop()
 
 running: bool = True
 
 model_loading: bool = False
-model_loading_thread: threading.Thread | None = None
+model_loading_job: ModelJob | None = None
+model_error: str | None = None
+generation_latency: float | None = None
 new_game_config: GameConfig | None = None
 
+GENERATION_TIMEOUT_SECONDS: float = 120.0
+# One slot is kept for the player's own generation, background jobs can't take it
+model_executor: ModelJobExecutor = ModelJobExecutor(max_workers=1, max_pending=4, reserved=1)
+
+config_cache: GameConfigCache = GameConfigCache()
+SPECULATIVE_PROMPT_COUNT: int = 3
+speculative_job: ModelJob | None = None
+
+prompt_prefetcher: PromptPrefetcher = PromptPrefetcher(
+    get_backend(), executor=model_executor)
+
 
 pygame.init()
 
@@ -98,9 +115,13 @@ normal_font: pygame.font.Font = pygame.font.Font(None, 24)
 
 clock: pygame.time.Clock = pygame.time.Clock()
 
+# Text is rasterized once and reused, and only the changed parts of the screen are presented
+text_cache: TextRenderCache = TextRenderCache()
+frame: DirtyRectRenderer = DirtyRectRenderer(screen)
+
 
 def render_wrapped_text(
-    surface: pygame.surface.Surface,
+    surface: pygame.surface.Surface | DirtyRectRenderer,
     text: str,
     font: pygame.font.Font,
     color: pygame.color.Color,
@@ -111,106 +132,89 @@ def render_wrapped_text(
     line_spacing: int = 5
 ) -> None:
 
-    words: list[str] = text.split(' ')
-    lines: list[str] = []
-    current_line: str = ""
-
-    for word in words:
-        test_line: str = current_line + word + " "
-        if font.size(test_line)[0] <= max_width:
-            current_line = test_line
-        else:
-            lines.append(current_line.strip())
-            current_line = word + " "
-    lines.append(current_line.strip())
-
     y_offset: int = start_y
-    for line in lines:
-        line_render: pygame.surface.Surface = font.render(
-            line, True, color, background_color)
+    for line in text_cache.wrap(font, text, max_width):
+        line_render: pygame.surface.Surface = text_cache.render(
+            font, line, color, background_color)
         line_rect: pygame.Rect = line_render.get_rect(
             center=(center_x, y_offset))
         surface.blit(line_render, line_rect)
         y_offset += font.get_height() + line_spacing
 
 
-def load_game_config_in_thread(input_str: str, last_scored_p: int, prev_config: GameConfig) -> None:
-    global new_game_config
-
-    new_game_config = generate_game_config(
-        input_str, last_scored_p, prev_config)
+def load_game_config(input_str: str, last_scored_p: int, prev_config: GameConfig, stop_event) -> GameConfig:
+    config: GameConfig = generate_game_config(
+        input_str, last_scored_p, prev_config, stop_event=stop_event)
 
+    config_cache.put(input_str, last_scored_p, prev_config, config)
 
-class Direction(Enum):
-    Up = auto()
-    Down = auto()
+    return config
 
 
-class Paddle(pygame.Rect):
-    def __init__(self, x: float, y: float, width: float, height: float, speed: float, color: pygame.color.Color) -> None:
-        super().__init__(x, y, width, height)
+def player_request_pending() -> bool:
+    """Whether the player's own prompt is being prefetched or generated, which speculation must not delay."""
+    return prompt_prefetcher.pending or model_executor.has_pending("prefill", "generate")
 
-        self.speed = speed
-        self.color = color
 
-    def move(self, direction: Direction) -> None:
-        if direction == Direction.Up:
-            self.y -= self.speed
-        elif direction == Direction.Down:
-            self.y += self.speed
+def precompute_common_prompts(prompts: list[str], prev_config: GameConfig, stop_event) -> None:
+    generate = partial(generate_game_config, stop_event=stop_event)
 
-        # Keep paddle within screen bounds
-        if self.top < 0:
-            self.top = 0
-        if self.bottom > SCREEN_HEIGHT:
-            self.bottom = SCREEN_HEIGHT
+    for scorer in (1, 2):
+        for prompt in prompts:
+            # Checked before each prompt takes the backend lock, so a prefill or the player's request never
+            # waits behind more than the generation already running, and its KV prefix is not overwritten
+            if stop_event.is_set() or player_request_pending():
+                return
+            config_cache.precompute(
+                [prompt], scorer, prev_config, generate, stop_event)
 
-    def draw(self) -> None:
-        pygame.draw.rect(screen, self.color, self)
 
+def start_speculative_generation(prev_config: GameConfig) -> None:
+    """
+    Generates the most common prompts for either scorer in the background while a round is played.
+    Speculation only runs while the player has no prefetch or generation pending.
+    """
+    global speculative_job
 
-class Ball(pygame.Rect):
-    def __init__(self, x: float, y: float, radius: float, speed: float, color: pygame.color.Color) -> None:
-        super().__init__(x - radius, y - radius, radius * 2, radius * 2)
+    stop_speculative_generation()
 
-        self.radius = radius
-        self.color = color
-        self.initial_speed = speed
-        self.current_speed = speed
-        self.dx = random.choice([-1, 1]) * self.current_speed
-        self.dy = random.choice([-1, 1]) * self.current_speed
+    prompts: list[str] = config_cache.common_prompts(SPECULATIVE_PROMPT_COUNT)
+    if not prompts or player_request_pending():
+        return
 
-    def move(self) -> None:
-        self.x += self.dx
-        self.y += self.dy
+    try:
+        speculative_job = model_executor.submit(
+            precompute_common_prompts, prompts, prev_config, label="speculate")
+    except queue.Full:
+        speculative_job = None
 
-    def bounce_x(self) -> None:
-        self.dx *= -1
-        self.current_speed += game_config.ball_acceleration_factor
 
-        # Reapply speed
-        self.dx = (1 if self.dx > 0 else -1) * self.current_speed
-        self.dy = (1 if self.dy > 0 else -1) * self.current_speed
+def stop_speculative_generation() -> None:
+    global speculative_job
 
-    def bounce_y(self) -> None:
-        self.dy *= -1
+    if speculative_job is not None:
+        speculative_job.cancel()
+        speculative_job = None
 
-    def reset(self, last_scored_player: int) -> None:
-        assert last_scored_player in [
-            1, 2], f"last_scored_player has to be either 1 or 2 but was {last_scored_player}"
 
-        self.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-        self.current_speed = self.initial_speed
+def key_direction(keys: pygame.key.ScancodeWrapper, up_key: int, down_key: int) -> Direction | None:
+    if keys[up_key] and not keys[down_key]:
+        return Direction.Up
+    if keys[down_key] and not keys[up_key]:
+        return Direction.Down
+    return None
 
-        if last_scored_player == 1:
-            self.dx = 1 * self.current_speed  # Ball goes to player 2
-        else:
-            self.dx = -1 * self.current_speed  # Ball goes to player 1
 
-        self.dy = random.choice([-1, 1]) * self.current_speed
+def draw_game(snapshot: Snapshot) -> None:
+    """Draws the paddles and ball at the interpolated positions of `snapshot`."""
+    player1_paddle, player2_paddle = simulation.player_1, simulation.player_2
 
-    def draw(self) -> None:
-        pygame.draw.circle(screen, self.color, self.center, self.radius)
+    frame.mark(pygame.draw.rect(screen, game_config.player_1_paddle_color.to_pygame_color(), pygame.Rect(
+        round(player1_paddle.x), round(snapshot.player_1_y), player1_paddle.width, player1_paddle.height)))
+    frame.mark(pygame.draw.rect(screen, game_config.player_2_paddle_color.to_pygame_color(), pygame.Rect(
+        round(player2_paddle.x), round(snapshot.player_2_y), player2_paddle.width, player2_paddle.height)))
+    frame.mark(pygame.draw.circle(screen, game_config.ball_color.to_pygame_color(),
+                                  (round(snapshot.ball_x), round(snapshot.ball_y)), simulation.ball.radius))
 
 
 def show_start_screen() -> None:
@@ -227,81 +231,74 @@ def show_start_screen() -> None:
             if event.type == pygame.KEYDOWN:
                 waiting_for_start = False
 
-        screen.fill(game_config.background_color.to_pygame_color())
+        frame.begin_frame(game_config.background_color.to_pygame_color())
 
         # Title
-        title_text = large_font.render(
-            "Prompt Pong!", True, game_config.text_color.to_pygame_color())
+        title_text = text_cache.render(
+            large_font, "Prompt Pong!", game_config.text_color.to_pygame_color())
         title_rect = title_text.get_rect(
             center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
-        screen.blit(title_text, title_rect)
+        frame.blit(title_text, title_rect)
 
         # Instructions
-        start_instruction_text = normal_font.render(
-            "Press any key to start", True, game_config.text_color.to_pygame_color())
+        start_instruction_text = text_cache.render(
+            normal_font, "Press any key to start", game_config.text_color.to_pygame_color())
         start_instruction_rect = start_instruction_text.get_rect(
             center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
-        screen.blit(start_instruction_text, start_instruction_rect)
+        frame.blit(start_instruction_text, start_instruction_rect)
 
-        credit_text = small_font.render(
-            "Powered by Snapdragon X Elite", True, game_config.text_color.to_pygame_color())
+        credit_text = text_cache.render(
+            small_font, "Powered by Snapdragon X Elite", game_config.text_color.to_pygame_color())
         credit_rect = credit_text.get_rect(
             center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 30))
-        screen.blit(credit_text, credit_rect)
+        frame.blit(credit_text, credit_rect)
 
-        pygame.display.flip()
+        frame.present()
         clock.tick(FPS)
 
 
-def init_game_state(reset_score: bool = False) -> Tuple[Paddle, Paddle, Ball]:
-    global player1_score, player2_score, game_active, input_active, countdown_active, input_string
-
-    if reset_score:
-        player1_score = 0
-        player2_score = 0
+def init_game_state(reset_score: bool = False) -> None:
+    global game_active, input_active, input_string
 
     game_active = True
     input_active = False
 
     input_string = ""
 
-    player1_paddle = Paddle(
-        game_config.player_1_paddle_width,
-        SCREEN_HEIGHT // 2 - game_config.player_1_paddle_height // 2,
-        game_config.player_1_paddle_width, game_config.player_1_paddle_height, game_config.player_1_paddle_speed, game_config.player_1_paddle_color.to_pygame_color()
-    )
-    player2_paddle = Paddle(
-        SCREEN_WIDTH - game_config.player_2_paddle_width * 2,
-        SCREEN_HEIGHT // 2 - game_config.player_2_paddle_height // 2,
-        game_config.player_2_paddle_width, game_config.player_2_paddle_height, game_config.player_2_paddle_speed, game_config.player_2_paddle_color.to_pygame_color()
-    )
-
-    ball = Ball(
-        SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, game_config.ball_radius, game_config.ball_initial_speed, game_config.ball_color.to_pygame_color()
-    )
-    ball.reset(last_scored_player)
+    # Every round starts with a countdown kept by the simulation
+    if reset_score:
+        simulation.reset(game_config, last_scored_player)
+    else:
+        simulation.new_round(game_config, last_scored_player)
+    frame_timer.reset()
 
-    return player1_paddle, player2_paddle, ball
 
+# Load the on-device model while the start screen is showing
+model_executor.submit(lambda stop_event: get_backend().warm_up(), label="warm_up")
 
 show_start_screen()
 
 # Initial object setup
-player1_paddle, player2_paddle, ball = init_game_state(True)
+init_game_state(True)
 
 # Main game Loop
 while running:
-    if model_loading and new_game_config is not None and model_loading_thread is not None and not model_loading_thread.is_alive():
+    # Poll the running generation without blocking the render loop
+    if model_loading and model_loading_job is not None and model_loading_job.done():
+        try:
+            new_game_config = model_loading_job.result()
+            generation_latency = model_executor.metrics.last("generate")
+        except Exception as e:
+            # Let the player edit the prompt and try again
+            model_error = f"The model failed to generate a game: {e}"
+            model_loading = False
+        model_loading_job = None
+
+    if model_loading and new_game_config is not None:
         game_config = new_game_config
 
-        player1_paddle, player2_paddle, ball = init_game_state()
-
-        input_string = ""
+        init_game_state()
 
-        countdown_active = True
-        input_active = False
-
-        model_loading_thread = None
         new_game_config = None
 
         model_loading = False
@@ -314,183 +311,176 @@ while running:
             if event.type == pygame.KEYDOWN:
                 # User is done with input
                 if event.key == pygame.K_RETURN:
+                    prompt_prefetcher.cancel()
+                    stop_speculative_generation()
                     model_loading = True
-                    model_loading_thread = threading.Thread(target=load_game_config_in_thread, args=(
-                        input_string, last_scored_player, game_config))
-
-                    model_loading_thread.start()
+                    model_error = None
+                    new_game_config = config_cache.get(
+                        input_string, last_scored_player, game_config)
+                    generation_latency = None
+
+                    # Cache miss, generate the configuration on the model
+                    if new_game_config is None:
+                        try:
+                            model_loading_job = model_executor.submit(load_game_config, input_string, last_scored_player, game_config,
+                                                                      label="generate", timeout=GENERATION_TIMEOUT_SECONDS, priority=True)
+                        except queue.Full:
+                            model_error = "The model is still busy, press Enter to try again."
+                            model_loading = False
 
                 # User deletes last character
                 elif event.key == pygame.K_BACKSPACE:
                     input_string = input_string[:-1]
+                    prompt_prefetcher.update(
+                        input_string, last_scored_player, game_config)
 
                 # Collect user input
                 else:
                     input_string += event.unicode
+                    prompt_prefetcher.update(
+                        input_string, last_scored_player, game_config)
 
         # Game is over
         if not game_active and not input_active:
             if event.type == pygame.KEYDOWN:
                 # "R" to restart the game
                 if event.key == pygame.K_r:
-                    countdown_active = True
+                    model_executor.cancel_all()
+                    model_loading = False
+                    model_loading_job = None
+                    speculative_job = None
+                    model_error = None
 
-                    game_config = GameConfig(original_config_dict)
+                    game_config = GameConfig(**original_config_dict)
 
-                    player1_paddle, player2_paddle, ball = init_game_state(
-                        True)
+                    init_game_state(True)
 
                 # "Q" to quit the game
                 if event.key == pygame.K_q:
                     running = False
 
-    # Player controls
-    keys: pygame.key.ScancodeWrapper = pygame.key.get_pressed()
-    if game_active and not input_active and not countdown_active:
-        # Player 1 controls (W, S)
-        if keys[pygame.K_w]:
-            player1_paddle.move(Direction.Up)
-        if keys[pygame.K_s]:
-            player1_paddle.move(Direction.Down)
-
-        # Player 2 controls (Up Arrow, Down Arrow)
-        if keys[pygame.K_UP]:
-            player2_paddle.move(Direction.Up)
-        if keys[pygame.K_DOWN]:
-            player2_paddle.move(Direction.Down)
-
-        ball.move()
-
-        # Ball collision with top/bottom walls
-        if ball.top <= 0 or ball.bottom >= SCREEN_HEIGHT:
-            ball.bounce_y()
-
-        # Ball collision with paddles
-        if ball.colliderect(player1_paddle) or ball.colliderect(player2_paddle):
-            # Check if hit on paddle's side (prevents sticking if hit from top/bottom)
-            if (ball.left < player1_paddle.right and ball.right > player1_paddle.left) or (ball.right > player2_paddle.left and ball.left < player2_paddle.right):
-                ball.bounce_x()
-
-            # Prevent ball getting stuck in paddle
-            if ball.left < player1_paddle.right and ball.dx < 0:
-                ball.left = player1_paddle.right
-            elif ball.right > player2_paddle.left and ball.dx > 0:
-                ball.right = player2_paddle.left
-
-        # Scoring (ball out of bounds)
-        scored: bool = False
-        if ball.left <= 0:
-            player2_score += 1
-            last_scored_player = 2  # Player 2 scored
-            scored = True
-        elif ball.right >= SCREEN_WIDTH:
-            player1_score += 1
-            last_scored_player = 1  # Player 1 scored
-            scored = True
-
-        if scored:
+    # Advance the simulation in fixed steps, however long the last frame took
+    frame_seconds: float = clock.tick(FPS) / 1000
+    if game_active and not input_active:
+        keys: pygame.key.ScancodeWrapper = pygame.key.get_pressed()
+        # Player 1 controls (W, S), player 2 controls (Up Arrow, Down Arrow)
+        player1_direction = key_direction(keys, pygame.K_w, pygame.K_s)
+        player2_direction = key_direction(keys, pygame.K_UP, pygame.K_DOWN)
+
+        was_counting_down: bool = simulation.countdown_active
+        for _ in range(frame_timer.advance(frame_seconds)):
+            scorer: int | None = simulation.step(
+                player1_direction, player2_direction, frame_timer.step_seconds)
+            if scorer is None:
+                continue
+
+            last_scored_player = scorer
             # Check for game over first
-            if player1_score >= MAX_SCORE or player2_score >= MAX_SCORE:
+            if simulation.game_over:
                 game_active = False
             else:
                 # Activate input after score, game still active
                 input_active = True
 
-    # Clear screen
-    screen.fill(game_config.background_color.to_pygame_color())
+            # Leave the model free for the player's prompt
+            stop_speculative_generation()
+            break
 
-    player1_paddle.draw()
-    player2_paddle.draw()
-    ball.draw()
+        # Stop countdown
+        if was_counting_down and not simulation.countdown_active:
+            start_speculative_generation(game_config)
+
+    # Clear what was drawn last frame
+    frame.begin_frame(game_config.background_color.to_pygame_color())
+
+    draw_game(simulation.interpolate(frame_timer.alpha))
 
-    score_text1 = large_font.render(
-        f"Player 1: {player1_score}", True, game_config.text_color.to_pygame_color())
-    score_text2 = large_font.render(
-        f"Player 2: {player2_score}", True, game_config.text_color.to_pygame_color())
+    score_text1 = text_cache.render(
+        large_font, f"Player 1: {simulation.scores[0]}", game_config.text_color.to_pygame_color())
+    score_text2 = text_cache.render(
+        large_font, f"Player 2: {simulation.scores[1]}", game_config.text_color.to_pygame_color())
 
-    screen.blit(score_text1, (SCREEN_WIDTH // 4 -
+    frame.blit(score_text1, (SCREEN_WIDTH // 4 -
                 score_text1.get_width() // 2, 20))
-    screen.blit(score_text2, (SCREEN_WIDTH * 3 //
+    frame.blit(score_text2, (SCREEN_WIDTH * 3 //
                 4 - score_text2.get_width() // 2, 20))
 
     # Input Prompt (after score or game over)
     if input_active:
         prompt_text: str = f"Player {last_scored_player} scored! Enter a prompt to change the game! (Press ENTER):"
 
-        prompt_render = normal_font.render(
-            prompt_text, True, game_config.text_color.to_pygame_color())
+        prompt_render = text_cache.render(
+            normal_font, prompt_text, game_config.text_color.to_pygame_color())
         prompt_rect = prompt_render.get_rect(
             center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
 
-        screen.blit(prompt_render, prompt_rect)
+        frame.blit(prompt_render, prompt_rect)
 
         input_display_text = input_string + "_"  # Add cursor
 
-        render_wrapped_text(screen, input_display_text, normal_font, game_config.text_color.to_pygame_color(), game_config.text_background_color.to_pygame_color(),
+        render_wrapped_text(frame, input_display_text, normal_font, game_config.text_color.to_pygame_color(), game_config.text_background_color.to_pygame_color(),
                             SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20, SCREEN_WIDTH // 2)
 
     # Countdown screen before a round begins
-    if countdown_active:
-        countdown_render = normal_font.render(
-            f"Round starting in {current_countdown}...", True, game_config.text_color.to_pygame_color())
+    if game_active and simulation.countdown_active:
+        countdown_render = text_cache.render(
+            normal_font, f"Round starting in {math.ceil(simulation.countdown_remaining)}...", game_config.text_color.to_pygame_color())
         countdown_rect = countdown_render.get_rect(
             center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - (game_config.ball_radius + 15)))
 
-        ball_direction_render = large_font.render(
-            "->" if last_scored_player == 1 else "<-", True, game_config.text_color.to_pygame_color())
+        ball_direction_render = text_cache.render(
+            large_font, "->" if last_scored_player == 1 else "<-", game_config.text_color.to_pygame_color())
         ball_direction_rect = ball_direction_render.get_rect(
             center=((SCREEN_WIDTH // 4) * (3 if last_scored_player ==
                     1 else 1), SCREEN_HEIGHT // 2 - 2))
 
-        screen.blit(countdown_render, countdown_rect)
-        screen.blit(ball_direction_render, ball_direction_rect)
+        frame.blit(countdown_render, countdown_rect)
+        frame.blit(ball_direction_render, ball_direction_rect)
 
         if game_config.change_summary != "":
-            render_wrapped_text(screen, f"Changes: {game_config.change_summary}", normal_font, game_config.text_color.to_pygame_color(), None,
+            render_wrapped_text(frame, f"Changes: {game_config.change_summary}", normal_font, game_config.text_color.to_pygame_color(), None,
                                 SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + (game_config.ball_radius + 15), SCREEN_WIDTH * 0.75)
 
-        current_countdown -= 1
+        if generation_latency is not None:
+            latency_render = text_cache.render(
+                small_font, f"Generated on-device in {generation_latency:.1f}s", game_config.text_color.to_pygame_color())
+            latency_rect = latency_render.get_rect(
+                center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 30))
+            frame.blit(latency_render, latency_rect)
 
-    if model_loading:
-        model_loading_render = normal_font.render(
-            "The on-device model is generating your game!", True, game_config.text_color.to_pygame_color())
+    if model_loading or model_error is not None:
+        model_loading_render = text_cache.render(
+            normal_font, model_error if model_error is not None else "The on-device model is generating your game!", game_config.text_color.to_pygame_color())
         model_loading_rect = model_loading_render.get_rect(
             center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 50))
 
-        screen.blit(model_loading_render, model_loading_rect)
+        frame.blit(model_loading_render, model_loading_rect)
 
     # Final game over message
-    if not game_active and not input_active and not countdown_active:
-        if player1_score >= MAX_SCORE:
-            game_over_text = large_font.render(
-                "Player 1 Wins!", True, game_config.text_color.to_pygame_color())
+    if not game_active and not input_active:
+        if simulation.winner == 1:
+            game_over_text = text_cache.render(
+                large_font, "Player 1 Wins!", game_config.text_color.to_pygame_color())
         else:
-            game_over_text = large_font.render(
-                "Player 2 Wins!", True, game_config.text_color.to_pygame_color())
+            game_over_text = text_cache.render(
+                large_font, "Player 2 Wins!", game_config.text_color.to_pygame_color())
 
-        restart_text = small_font.render(
-            "Press 'R' to Restart or 'Q' to Quit", True, game_config.text_color.to_pygame_color())
+        restart_text = text_cache.render(
+            small_font, "Press 'R' to Restart or 'Q' to Quit", game_config.text_color.to_pygame_color())
 
         game_over_rect = game_over_text.get_rect(
             center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
         restart_rect = restart_text.get_rect(
             center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
 
-        screen.blit(game_over_text, game_over_rect)
-        screen.blit(restart_text, restart_rect)
+        frame.blit(game_over_text, game_over_rect)
+        frame.blit(restart_text, restart_rect)
 
     # Re-render the game!
-    pygame.display.flip()
-    clock.tick(FPS)
+    frame.present()
 
-    # Add a delay between countdown messages
-    if countdown_active:
-        sleep(1)
-
-        # Stop countdown
-        if current_countdown <= 0:
-            current_countdown = MAX_COUNTDOWN
-            countdown_active = False
+prompt_prefetcher.cancel()
+model_executor.shutdown()
 
 pygame.quit()
 sys.exit()
@@ -0,0 +1,202 @@
+# -----------------------------------------------------------------------------
+#
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# -----------------------------------------------------------------------------
+
+
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyMetrics:
+    """
+    Keeps the most recent end-to-end latencies (queue wait + run time) of jobs per label.
+    """
+
+    def __init__(self, window: int = 100) -> None:
+        self._latencies: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, label: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies[label].append(seconds)
+
+    def last(self, label: str) -> float | None:
+        with self._lock:
+            latencies = self._latencies.get(label)
+            return latencies[-1] if latencies else None
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Returns count, mean, p50, p95 and last latency in seconds for each label."""
+        with self._lock:
+            snapshot = {label: list(latencies) for label, latencies in self._latencies.items() if latencies}
+
+        summary = {}
+        for label, latencies in snapshot.items():
+            ordered = sorted(latencies)
+            summary[label] = {
+                "count": len(ordered),
+                "mean": sum(ordered) / len(ordered),
+                "p50": ordered[len(ordered) // 2],
+                "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                "last": latencies[-1],
+            }
+
+        return summary
+
+
+class ModelJob:
+    """
+    A handle to a model call submitted to a ModelJobExecutor.
+
+    The job never blocks the caller: poll `done()` every frame and read `result()` once it returns True.
+    A timed-out or cancelled job finishes immediately with TimeoutError or CancelledError, its stop event
+    is set so the model call can end early, and any late result from the worker is discarded.
+    """
+
+    def __init__(self, label: str, timeout: float | None) -> None:
+        self.label = label
+        self.future: Future = Future()
+        self.stop_event: threading.Event = threading.Event()
+        self.submitted_at: float = time.perf_counter()
+        self.deadline: float | None = None if timeout is None else self.submitted_at + timeout
+
+        self._lock = threading.Lock()
+
+    def done(self) -> bool:
+        if self.deadline is not None and not self.future.done() and time.perf_counter() >= self.deadline:
+            self.stop_event.set()
+            self._finish(exception=TimeoutError(
+                f"Model job '{self.label}' timed out after {self.deadline - self.submitted_at:.1f}s"))
+
+        return self.future.done()
+
+    def result(self, timeout: float | None = None) -> Any:
+        return self.future.result(timeout)
+
+    def exception(self, timeout: float | None = None) -> BaseException | None:
+        return self.future.exception(timeout)
+
+    def cancel(self) -> None:
+        self.stop_event.set()
+        if not self.future.cancel():
+            self._finish(exception=CancelledError(f"Model job '{self.label}' was cancelled"))
+
+    def _finish(self, result: Any = None, exception: BaseException | None = None) -> bool:
+        with self._lock:
+            if self.future.done():
+                return False
+            if exception is not None:
+                self.future.set_exception(exception)
+            else:
+                self.future.set_result(result)
+            return True
+
+
+class ModelJobExecutor:
+    """
+    Runs model calls on a fixed pool of worker threads with a bounded number of outstanding jobs.
+
+    Submitted callables receive the job's stop event as the `stop_event` keyword argument and should
+    return early once it is set. The executor is created once and reused across game restarts, so no
+    threads are created per request.
+
+    A cancelled or timed-out job keeps its slot until its call actually returns. `reserved` slots are
+    therefore only handed to `priority` jobs, so background work that ignores its stop event can't
+    starve a request the player is waiting for.
+    """
+
+    def __init__(self, max_workers: int = 1, max_pending: int = 4, reserved: int = 0, name: str = "model") -> None:
+        if not 0 <= reserved < max_pending:
+            raise ValueError(f"Need 0 <= reserved < max_pending, got {reserved} and {max_pending}")
+        self.metrics = LatencyMetrics()
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_pending - reserved)
+        self._reserved_slots = threading.BoundedSemaphore(reserved) if reserved else None
+        self._slot_of: dict[ModelJob, threading.BoundedSemaphore] = {}
+        self._jobs: set[ModelJob] = set()
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, label: str = "job",
+               timeout: float | None = None, priority: bool = False, **kwargs: Any) -> ModelJob:
+        """
+        Queues `fn(*args, stop_event=..., **kwargs)` and returns its job handle.
+
+        Priority jobs take a reserved slot first and fall back to the shared ones.
+
+        Raises:
+            queue.Full: If no slot is free for the job.
+        """
+        candidates = [self._reserved_slots, self._slots] if priority else [self._slots]
+        slot = next((candidate for candidate in candidates
+                     if candidate is not None and candidate.acquire(blocking=False)), None)
+        if slot is None:
+            raise queue.Full(f"Cannot queue model job '{label}', too many jobs are pending")
+
+        job = ModelJob(label=label, timeout=timeout)
+        with self._lock:
+            self._jobs.add(job)
+            self._slot_of[job] = slot
+
+        try:
+            self._executor.submit(self._run, job, fn, args, kwargs)
+        except RuntimeError:
+            self._release(job)
+            raise
+
+        return job
+
+    def has_pending(self, *labels: str) -> bool:
+        """Returns whether a job with one of `labels`, or any job without labels, is queued or running."""
+        with self._lock:
+            return any(not labels or job.label in labels for job in self._jobs)
+
+    def cancel_all(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs)
+
+        for job in jobs:
+            job.cancel()
+
+    def shutdown(self) -> None:
+        """Cancels every job and stops the workers without waiting for a running model call."""
+        self.cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: ModelJob, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        try:
+            # A job can time out while queued, its future is then already finished
+            with job._lock:
+                if job.future.done() or not job.future.set_running_or_notify_cancel():
+                    return
+
+            try:
+                result = fn(*args, stop_event=job.stop_event, **kwargs)
+            except BaseException as e:
+                job._finish(exception=e)
+            else:
+                job._finish(result=result)
+
+            latency = time.perf_counter() - job.submitted_at
+            self.metrics.record(job.label, latency)
+            logger.info(f"Model job '{job.label}' finished in {latency:.2f}s")
+
+        finally:
+            self._release(job)
+
+    def _release(self, job: ModelJob) -> None:
+        with self._lock:
+            self._jobs.discard(job)
+            slot = self._slot_of.pop(job)
+        slot.release()
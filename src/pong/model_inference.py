@@ -6,21 +6,34 @@
 # -----------------------------------------------------------------------------
 
 
-from ollama import chat
+import os
+import sys
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import CancelledError
+from pathlib import Path
 from game_config import GameConfig
 from pydantic import ValidationError
 
 
 MODEL_NAME: str = "qwen2.5-coder:3b"
 
+DEEPSEEK_MODEL_NAME: str = "deepseek_7b"
 
-def generate_game_config(user_prompt: str, last_scored_player: int, previous_config: GameConfig) -> GameConfig:
-    max_retries: int = 25
-    retry_count: int = 0
+# Backend used by generate_game_config when none is passed ("deepseek" or "ollama")
+DEFAULT_BACKEND: str = os.environ.get("PONG_BACKEND", "deepseek")
 
-    error: str | None = None
+# Repository root holding models.json, executioner.json and the models/ directory
+REPO_ROOT: Path = Path(__file__).resolve().parents[2]
 
-    ai_prompt = f"""
+
+class ConfigBackend(ABC):
+    """
+    A text generation backend that turns a prompt into raw GameConfig JSON.
+    """
+
+    def build_prompt(self, user_prompt: str, last_scored_player: int, previous_config: GameConfig, error: str | None = None) -> str:
+        return f"""
     <goal>
     Generate a new configuration for the Pong game using the provided player {last_scored_player} prompt, "{user_prompt}", and context.
     </goal>
@@ -39,25 +52,225 @@ def generate_game_config(user_prompt: str, last_scored_player: int, previous_con
     </output>
     """
 
+    def build_prompt_prefix(self, partial_prompt: str, last_scored_player: int, previous_config: GameConfig) -> str | None:
+        """Returns a prefix of the final prompt for a prompt still being typed, or None if the layout has no stable prefix."""
+        return None
+
+    @abstractmethod
+    def generate(self, prompt: str, temperature: float, stop_event: threading.Event | None = None) -> str:
+        """Returns the model response for the prompt, expected to contain a GameConfig JSON object."""
+
+    def prefill(self, prompt_prefix: str, stop_event: threading.Event | None = None) -> None:
+        """Processes a prompt prefix ahead of time so a following generate call only pays for the rest."""
+
+    def warm_up(self) -> None:
+        """Loads the model ahead of the first request."""
+
+    def close(self) -> None:
+        """Releases any resources held by the backend."""
+
+
+class OllamaBackend(ConfigBackend):
+    """
+    Generates configurations through a locally running Ollama daemon.
+    """
+
+    def __init__(self, model_name: str = MODEL_NAME) -> None:
+        from ollama import chat
+
+        self.model_name = model_name
+        self._chat = chat
+
+    def generate(self, prompt: str, temperature: float, stop_event: threading.Event | None = None) -> str:
+        response = self._chat(
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+            model=self.model_name,
+            options={
+                "temperature": temperature,
+                "num_ctx": 4096,
+                "repeat_penalty": 1.1,
+            },
+            format=GameConfig.model_json_schema(),
+        )
+
+        return response.message.content
+
+
+class DeepSeekBackend(ConfigBackend):
+    """
+    Generates configurations in-process with the ONNX DeepSeek pipeline from src/deepseek_r1.
+
+    The ONNX Runtime sessions are created on first use and kept warm for every following round, so
+    the per-round latency is only the on-device prefill and decode time.
+
+    The prompt places the player's text last, so a partially typed prompt can be prefilled while the
+    player is still typing and generate() only processes the tokens after the shared prefix.
+    """
+
+    def __init__(self, model: str = DEEPSEEK_MODEL_NAME, processor: str = "npu", model_type: str = "default",
+                 max_tokens: int = 1024, top_k: int = 10, repetition_penalty: float = 1.1) -> None:
+        self.model = model
+        self.processor = processor
+        self.model_type = model_type
+        self.max_tokens = max_tokens
+        self.top_k = top_k
+        self.repetition_penalty = repetition_penalty
+
+        self._inference = None
+        # The pipeline owns a single KV cache, requests must not interleave
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._inference is not None:
+            return self._inference
+
+        sys.path.append(str(REPO_ROOT / "src"))
+        from model_loader import ModelLoader
+        from deepseek_r1.deepseek_model_inference import DeepSeekModelInference
+        from deepseek_r1.embedding_table import load_embedding_table
+
+        loader = ModelLoader(model=self.model, processor=self.processor,
+                             model_type=self.model_type, root_dir=REPO_ROOT)
+        graphs = loader.graphs
+        model_sessions = {graph_name: loader.load_model(graph, htp_performance_mode="sustained_high_performance")
+                          for graph_name, graph in graphs.items() if str(graph).endswith(".onnx")}
+        embedding_table = load_embedding_table(loader.model_subdirectory_path/graphs["EMBEDDING"],
+                                               session=model_sessions["EMBEDDING"],
+                                               max_tokens=graphs["META_DATA"]["max_seq_len"])
+
+        self._inference = DeepSeekModelInference(model_sessions=model_sessions,
+                                                 tokenizer=graphs["TOKENIZER"],
+                                                 model_subdirectory=loader.model_subdirectory_path,
+                                                 model_meta=graphs["META_DATA"],
+                                                 embedding_table=embedding_table)
+        return self._inference
+
+    def build_prompt(self, user_prompt: str, last_scored_player: int, previous_config: GameConfig, error: str | None = None) -> str:
+        return self._prompt_head(last_scored_player, previous_config, error) + f'{user_prompt}"'
+
+    def build_prompt_prefix(self, partial_prompt: str, last_scored_player: int, previous_config: GameConfig) -> str | None:
+        return self._prompt_head(last_scored_player, previous_config) + partial_prompt
+
+    def _prompt_head(self, last_scored_player: int, previous_config: GameConfig, error: str | None = None) -> str:
+        error_line = f"Avoid errors similar to the last configuration issue: {error}\n" if error is not None else ""
+
+        return (
+            "You configure a game of Pong. The current configuration is:\n"
+            f"{previous_config.model_dump_json()}\n"
+            "Respond ONLY with the complete new configuration as a JSON object with the same properties. "
+            "Change only what the player asks for and describe the changes in change_summary (less than 12 words).\n"
+            f"{error_line}"
+            f'Player {last_scored_player} prompt: "'
+        )
+
+    def warm_up(self) -> None:
+        with self._lock:
+            self._load()
+
+    def prefill(self, prompt_prefix: str, stop_event: threading.Event | None = None) -> None:
+        with self._lock:
+            if stop_event is not None and stop_event.is_set():
+                return
+            inference = self._load()
+            token_ids = inference.tokenize(inference.query(prompt_prefix, close_turn=False))
+            inference.prefill(token_ids=token_ids, reuse_prefix=True, stop_event=stop_event)
+
+    def generate(self, prompt: str, temperature: float, stop_event: threading.Event | None = None) -> str:
+        with self._lock:
+            inference = self._load()
+            response = inference.run_inference(query=prompt,
+                                               top_k=self.top_k,
+                                               temperature=temperature,
+                                               max_tokens=self.max_tokens,
+                                               repetition_penalty=self.repetition_penalty,
+                                               stream=False,
+                                               reuse_prefix=True,
+                                               stop_event=stop_event)
+
+        return extract_json_object(response)
+
+    def close(self) -> None:
+        with self._lock:
+            self._inference = None
+
+
+class StubBackend(ConfigBackend):
+    """
+    An offline backend returning canned responses, used for tests and for playing without a model.
+
+    Responses are returned in order and the last one is repeated once the list is exhausted. Every
+    received prompt is recorded in `prompts`.
+    """
+
+    def __init__(self, responses: list[str | GameConfig]) -> None:
+        if not responses:
+            raise ValueError("StubBackend requires at least one response")
+
+        self.responses = [response.model_dump_json() if isinstance(response, GameConfig) else response
+                          for response in responses]
+        self.prompts: list[str] = []
+
+    def generate(self, prompt: str, temperature: float, stop_event: threading.Event | None = None) -> str:
+        self.prompts.append(prompt)
+        index = min(len(self.prompts), len(self.responses)) - 1
+
+        return self.responses[index]
+
+
+def extract_json_object(text: str) -> str:
+    """Returns the outermost JSON object of a response, skipping any <think> reasoning block."""
+    answer = text.rsplit("</think>", 1)[-1]
+    start, end = answer.find("{"), answer.rfind("}")
+    if start == -1 or end < start:
+        return answer
+
+    return answer[start:end + 1]
+
+
+_backends: dict[str, ConfigBackend] = {}
+
+
+def get_backend(name: str = DEFAULT_BACKEND) -> ConfigBackend:
+    """Returns the shared backend instance for `name`, creating it on first use."""
+    if name not in _backends:
+        if name == "deepseek":
+            _backends[name] = DeepSeekBackend()
+        elif name == "ollama":
+            _backends[name] = OllamaBackend()
+        else:
+            raise ValueError(
+                f"Unknown backend '{name}'. Available backends: deepseek, ollama")
+
+    return _backends[name]
+
+
+def generate_game_config(user_prompt: str, last_scored_player: int, previous_config: GameConfig,
+                         backend: ConfigBackend | None = None,
+                         stop_event: threading.Event | None = None) -> GameConfig:
+    max_retries: int = 25
+    retry_count: int = 0
+
+    error: str | None = None
+    result: str | None = None
+
+    if backend is None:
+        backend = get_backend()
+
     while retry_count < max_retries:
+        if stop_event is not None and stop_event.is_set():
+            raise CancelledError("Game configuration generation was cancelled")
+
         try:
-            response = chat(
-                messages=[
-                    {
-                        "role": "user",
-                        "content": ai_prompt,
-                    }
-                ],
-                model=MODEL_NAME,
-                options={
-                    "temperature": min(1, 0.00001 + (0.15 * retry_count)),
-                    "num_ctx": 4096,
-                    "repeat_penalty": 1.1,
-                },
-                format=GameConfig.model_json_schema(),
-            )
-
-            result = response.message.content
+            ai_prompt = backend.build_prompt(
+                user_prompt, last_scored_player, previous_config, error)
+
+            result = backend.generate(
+                ai_prompt, temperature=min(1, 0.00001 + (0.15 * retry_count)), stop_event=stop_event)
 
             error = None
 
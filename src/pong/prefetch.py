@@ -0,0 +1,113 @@
+# -----------------------------------------------------------------------------
+#
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# -----------------------------------------------------------------------------
+
+
+import logging
+import queue
+import threading
+from concurrent.futures import CancelledError, Future
+from game_config import GameConfig
+from model_executor import ModelJob, ModelJobExecutor
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_DEBOUNCE_SECONDS: float = 0.3
+
+
+class PromptPrefetcher:
+    """
+    Prefills the model with the prompt the player is still typing.
+
+    Every keystroke restarts a short debounce timer. Once typing pauses, the prompt prefix for the
+    current text is handed to the backend's prefill on a background thread. A keystroke arriving while
+    a prefill runs cancels it between tokens, and the backend keeps whatever prefix was processed, so
+    on Enter only the tokens after the shared prefix (the tail of the prompt and the answer) remain.
+
+    With an executor, the prefill runs as a "prefill" job on the shared model workers instead of on the
+    debounce timer thread.
+    """
+
+    def __init__(self, backend, debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+                 executor: ModelJobExecutor | None = None) -> None:
+        self.backend = backend
+        self.debounce_seconds = debounce_seconds
+        self.executor = executor
+
+        self._timer: threading.Timer | None = None
+        self._job: ModelJob | None = None
+        self._stop_event: threading.Event = threading.Event()
+        self._lock = threading.Lock()
+
+    def update(self, partial_prompt: str, last_scored_player: int, previous_config: GameConfig) -> None:
+        """Schedules a prefill of `partial_prompt`, replacing any pending or running one."""
+        prompt_prefix = self.backend.build_prompt_prefix(
+            partial_prompt, last_scored_player, previous_config)
+
+        with self._lock:
+            self._cancel_locked()
+            if prompt_prefix is None or partial_prompt.strip() == "":
+                return
+
+            self._stop_event = threading.Event()
+            self._timer = threading.Timer(self.debounce_seconds, self._prefill,
+                                          args=(prompt_prefix, self._stop_event))
+            self._timer.daemon = True
+            self._timer.start()
+
+    @property
+    def pending(self) -> bool:
+        """Whether a prefill is waiting for its debounce timer, queued or running."""
+        with self._lock:
+            if self._stop_event.is_set():
+                return False
+            timer_pending = self._timer is not None and self._timer.is_alive()
+            job_pending = self._job is not None and not self._job.done()
+            return timer_pending or job_pending
+
+    def cancel(self) -> None:
+        """Stops any pending or running prefill, e.g. when the player presses Enter."""
+        with self._lock:
+            self._cancel_locked()
+
+    def _cancel_locked(self) -> None:
+        self._stop_event.set()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+
+    def _prefill(self, prompt_prefix: str, stop_event: threading.Event) -> None:
+        if self.executor is not None:
+            with self._lock:
+                if stop_event.is_set():
+                    return
+                try:
+                    self._job = self.executor.submit(
+                        self.backend.prefill, prompt_prefix, label="prefill")
+                    self._job.future.add_done_callback(self._log_failure)
+                except queue.Full:
+                    # The workers are busy, skip this prefill rather than queueing behind them
+                    pass
+            return
+
+        try:
+            self.backend.prefill(prompt_prefix, stop_event)
+        except Exception as e:
+            # Prefetching is an optimization only, the request on Enter still runs normally
+            logger.warning(f"Prompt prefetch failed: {e}")
+
+    @staticmethod
+    def _log_failure(future: Future) -> None:
+        """Logs a failed prefill job like the thread path does, cancelled and timed-out prefills are expected."""
+        if future.cancelled():
+            return
+        e = future.exception()
+        if e is not None and not isinstance(e, (CancelledError, TimeoutError)):
+            logger.warning(f"Prompt prefetch failed: {e}")
@@ -0,0 +1,151 @@
+# -----------------------------------------------------------------------------
+#
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# -----------------------------------------------------------------------------
+
+
+import pygame
+from collections import OrderedDict
+
+
+DEFAULT_MAX_SURFACES: int = 256
+DEFAULT_MAX_LAYOUTS: int = 64
+
+ColorLike = pygame.color.Color | tuple[int, ...]
+
+
+def _color_key(color: ColorLike | None) -> tuple[int, ...] | None:
+    # pygame.Color is not hashable
+    return None if color is None else tuple(color)
+
+
+class TextRenderCache:
+    """
+    An LRU cache of rendered text surfaces and wrapped text layouts.
+
+    Rasterizing text with `font.render` is by far the most expensive part of drawing a pong frame,
+    yet the HUD changes only a few times per round. Surfaces are keyed on (font, text, color,
+    background) and line wraps on (font, text, max width), so an unchanged label costs a dictionary
+    lookup instead of a rasterization and a `font.size` call per word.
+    """
+
+    def __init__(self, max_surfaces: int = DEFAULT_MAX_SURFACES, max_layouts: int = DEFAULT_MAX_LAYOUTS) -> None:
+        self.max_surfaces = max_surfaces
+        self.max_layouts = max_layouts
+
+        self._surfaces: OrderedDict[tuple, pygame.surface.Surface] = OrderedDict()
+        self._layouts: OrderedDict[tuple, tuple[str, ...]] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def render(self, font: pygame.font.Font, text: str, color: ColorLike,
+               background_color: ColorLike | None = None) -> pygame.surface.Surface:
+        """Returns an antialiased rendering of `text`, rasterizing it only on a cache miss."""
+        key = (font, text, _color_key(color), _color_key(background_color))
+
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, True, color, background_color)
+        self._surfaces[key] = surface
+        while len(self._surfaces) > self.max_surfaces:
+            self._surfaces.popitem(last=False)
+
+        return surface
+
+    def wrap(self, font: pygame.font.Font, text: str, max_width: float) -> tuple[str, ...]:
+        """Splits `text` into lines no wider than `max_width`, breaking between words."""
+        key = (font, text, max_width)
+
+        lines = self._layouts.get(key)
+        if lines is not None:
+            self._layouts.move_to_end(key)
+            return lines
+
+        lines = tuple(self._wrap_words(font, text, max_width))
+        self._layouts[key] = lines
+        while len(self._layouts) > self.max_layouts:
+            self._layouts.popitem(last=False)
+
+        return lines
+
+    def _wrap_words(self, font: pygame.font.Font, text: str, max_width: float) -> list[str]:
+        words: list[str] = text.split(' ')
+        lines: list[str] = []
+        current_line: str = ""
+
+        for word in words:
+            test_line: str = current_line + word + " "
+            if font.size(test_line)[0] <= max_width:
+                current_line = test_line
+            else:
+                lines.append(current_line.strip())
+                current_line = word + " "
+        lines.append(current_line.strip())
+
+        return lines
+
+    def clear(self) -> None:
+        self._surfaces.clear()
+        self._layouts.clear()
+
+    def __len__(self) -> int:
+        return len(self._surfaces)
+
+
+class DirtyRectRenderer:
+    """
+    Redraws and presents only the parts of the screen that changed.
+
+    Every frame the areas drawn in the previous frame are cleared with the background color, the
+    frame is drawn through `blit` and `draw`, which record the touched rectangles, and `present`
+    pushes only the old and new rectangles to the display instead of flipping the whole window.
+    A change of background color, or an explicit `invalidate`, triggers a full redraw.
+    """
+
+    def __init__(self, surface: pygame.surface.Surface) -> None:
+        self.surface = surface
+
+        self._previous: list[pygame.Rect] = []
+        self._current: list[pygame.Rect] = []
+        self._background_color: tuple[int, ...] | None = None
+        self._full_redraw: bool = True
+
+    def begin_frame(self, background_color: ColorLike) -> None:
+        background_key = _color_key(background_color)
+        if background_key != self._background_color:
+            self._background_color = background_key
+            self._full_redraw = True
+
+        if self._full_redraw:
+            self.surface.fill(background_color)
+        else:
+            for rect in self._previous:
+                self.surface.fill(background_color, rect)
+
+    def blit(self, source: pygame.surface.Surface, destination: pygame.Rect | tuple[int, int]) -> pygame.Rect:
+        return self.mark(self.surface.blit(source, destination))
+
+    def mark(self, rect: pygame.Rect) -> pygame.Rect:
+        """Records an area drawn this frame, e.g. the Rect returned by a pygame.draw call."""
+        self._current.append(rect)
+        return rect
+
+    def invalidate(self) -> None:
+        self._full_redraw = True
+
+    def present(self) -> None:
+        if self._full_redraw:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self._previous + self._current)
+
+        self._previous = self._current
+        self._current = []
+        self._full_redraw = False
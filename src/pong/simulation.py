@@ -0,0 +1,328 @@
+# -----------------------------------------------------------------------------
+#
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+#
+# -----------------------------------------------------------------------------
+
+
+import random
+from dataclasses import dataclass, field
+from enum import Enum, auto
+from typing import Callable
+from game_config import GameConfig
+
+
+FIELD_WIDTH: int = 800
+FIELD_HEIGHT: int = 600
+
+# GameConfig speeds are expressed in pixels per frame at this frame rate
+REFERENCE_FPS: int = 60
+SIMULATION_HZ: int = 60
+
+MAX_SCORE: int = 5
+COUNTDOWN_SECONDS: float = 3.0
+
+
+class Direction(Enum):
+    Up = auto()
+    Down = auto()
+
+
+@dataclass
+class PaddleState:
+    x: float
+    y: float
+    width: float
+    height: float
+    speed: float  # pixels per second
+
+    @property
+    def left(self) -> float:
+        return self.x
+
+    @property
+    def right(self) -> float:
+        return self.x + self.width
+
+    @property
+    def top(self) -> float:
+        return self.y
+
+    @property
+    def bottom(self) -> float:
+        return self.y + self.height
+
+    def move(self, direction: Direction | None, dt: float, field_height: float) -> None:
+        if direction == Direction.Up:
+            self.y -= self.speed * dt
+        elif direction == Direction.Down:
+            self.y += self.speed * dt
+
+        # Keep paddle within field bounds
+        self.y = min(max(self.y, 0.0), field_height - self.height)
+
+
+@dataclass
+class BallState:
+    x: float  # center
+    y: float  # center
+    radius: float
+    speed: float  # pixels per second along each axis
+    initial_speed: float
+    acceleration: float  # speed gained per paddle hit, pixels per second
+    dx: float = 0.0
+    dy: float = 0.0
+
+    @property
+    def left(self) -> float:
+        return self.x - self.radius
+
+    @property
+    def right(self) -> float:
+        return self.x + self.radius
+
+    @property
+    def top(self) -> float:
+        return self.y - self.radius
+
+    @property
+    def bottom(self) -> float:
+        return self.y + self.radius
+
+    def overlaps(self, paddle: PaddleState) -> bool:
+        return (self.left < paddle.right and self.right > paddle.left
+                and self.top < paddle.bottom and self.bottom > paddle.top)
+
+    def bounce_x(self, direction: int) -> None:
+        """Sends the ball horizontally in `direction` (1 right, -1 left) and speeds it up."""
+        self.speed += self.acceleration
+        self.dx = direction * self.speed
+        self.dy = (1 if self.dy > 0 else -1) * self.speed
+
+
+@dataclass
+class Snapshot:
+    """Positions needed to draw a frame."""
+    player_1_y: float
+    player_2_y: float
+    ball_x: float
+    ball_y: float
+
+    def lerp(self, other: 'Snapshot', alpha: float) -> 'Snapshot':
+        return Snapshot(*(a + (b - a) * alpha for a, b in zip(
+            (self.player_1_y, self.player_2_y, self.ball_x, self.ball_y),
+            (other.player_1_y, other.player_2_y, other.ball_x, other.ball_y))))
+
+
+class PongSimulation:
+    """
+    Headless pong physics and scoring advanced in fixed time steps.
+
+    The simulation knows nothing about rendering or wall-clock time: every call to `step` advances the
+    game by `dt` seconds. A round starts with a countdown during which nothing moves, and ends
+    when a player scores; `new_round` starts the next one. The previous and current positions are kept
+    so a renderer can interpolate between steps.
+    """
+
+    def __init__(self, config: GameConfig, width: float = FIELD_WIDTH, height: float = FIELD_HEIGHT,
+                 max_score: int = MAX_SCORE, countdown_seconds: float = COUNTDOWN_SECONDS,
+                 rng: random.Random | None = None) -> None:
+        self.width = width
+        self.height = height
+        self.max_score = max_score
+        self.countdown_seconds = countdown_seconds
+        self.rng = rng if rng is not None else random.Random()
+
+        self.reset(config)
+
+    def reset(self, config: GameConfig | None = None, last_scored_player: int = 1) -> None:
+        """Clears the scores and starts the first round."""
+        self.scores: list[int] = [0, 0]
+        self.rally_hits: list[int] = []
+        self.new_round(config, last_scored_player)
+
+    def new_round(self, config: GameConfig | None = None, last_scored_player: int | None = None) -> None:
+        """Places paddles and ball for a new round, optionally with a new configuration."""
+        if config is not None:
+            self.config = config
+        if last_scored_player is not None:
+            assert last_scored_player in [
+                1, 2], f"last_scored_player has to be either 1 or 2 but was {last_scored_player}"
+            self.last_scored_player = last_scored_player
+
+        config = self.config
+        self.player_1 = PaddleState(
+            x=config.player_1_paddle_width,
+            y=self.height / 2 - config.player_1_paddle_height / 2,
+            width=config.player_1_paddle_width, height=config.player_1_paddle_height,
+            speed=config.player_1_paddle_speed * REFERENCE_FPS)
+        self.player_2 = PaddleState(
+            x=self.width - config.player_2_paddle_width * 2,
+            y=self.height / 2 - config.player_2_paddle_height / 2,
+            width=config.player_2_paddle_width, height=config.player_2_paddle_height,
+            speed=config.player_2_paddle_speed * REFERENCE_FPS)
+
+        speed = config.ball_initial_speed * REFERENCE_FPS
+        self.ball = BallState(
+            x=self.width / 2, y=self.height / 2, radius=config.ball_radius,
+            speed=speed, initial_speed=speed,
+            acceleration=config.ball_acceleration_factor * REFERENCE_FPS,
+            # The ball travels towards the player who did not score
+            dx=speed if self.last_scored_player == 1 else -speed,
+            dy=self.rng.choice([-1, 1]) * speed)
+
+        self.countdown_remaining: float = self.countdown_seconds
+        self.round_over: bool = False
+        self.hits: int = 0
+        self.previous: Snapshot = self.snapshot()
+
+    @property
+    def countdown_active(self) -> bool:
+        return self.countdown_remaining > 0
+
+    @property
+    def game_over(self) -> bool:
+        return max(self.scores) >= self.max_score
+
+    @property
+    def winner(self) -> int | None:
+        if not self.game_over:
+            return None
+        return 1 if self.scores[0] >= self.max_score else 2
+
+    def snapshot(self) -> Snapshot:
+        return Snapshot(self.player_1.y, self.player_2.y, self.ball.x, self.ball.y)
+
+    def interpolate(self, alpha: float) -> Snapshot:
+        """Positions blended between the previous and the current step (alpha in [0, 1])."""
+        return self.previous.lerp(self.snapshot(), alpha)
+
+    def step(self, player_1_direction: Direction | None, player_2_direction: Direction | None,
+             dt: float = 1 / SIMULATION_HZ) -> int | None:
+        """
+        Advances the game by `dt` seconds.
+
+        Returns:
+            int | None: The player who scored during this step, if any.
+        """
+        self.previous = self.snapshot()
+        if self.round_over:
+            return None
+
+        if self.countdown_active:
+            self.countdown_remaining = max(0.0, self.countdown_remaining - dt)
+            return None
+
+        self.player_1.move(player_1_direction, dt, self.height)
+        self.player_2.move(player_2_direction, dt, self.height)
+
+        ball = self.ball
+        ball.x += ball.dx * dt
+        ball.y += ball.dy * dt
+
+        # Ball collision with top/bottom walls
+        if ball.top <= 0:
+            ball.y = ball.radius
+            ball.dy = abs(ball.dy)
+        elif ball.bottom >= self.height:
+            ball.y = self.height - ball.radius
+            ball.dy = -abs(ball.dy)
+
+        # Ball collision with paddles, pushed out of the paddle to prevent sticking
+        if ball.dx < 0 and ball.overlaps(self.player_1):
+            ball.bounce_x(1)
+            ball.x = self.player_1.right + ball.radius
+            self.hits += 1
+        elif ball.dx > 0 and ball.overlaps(self.player_2):
+            ball.bounce_x(-1)
+            ball.x = self.player_2.left - ball.radius
+            self.hits += 1
+
+        # Scoring (ball out of bounds)
+        scorer: int | None = None
+        if ball.left <= 0:
+            scorer = 2
+        elif ball.right >= self.width:
+            scorer = 1
+
+        if scorer is not None:
+            self.scores[scorer - 1] += 1
+            self.last_scored_player = scorer
+            self.rally_hits.append(self.hits)
+            self.round_over = True
+
+        return scorer
+
+
+class FixedTimestepLoop:
+    """
+    Converts variable frame times into a whole number of fixed simulation steps.
+
+    Leftover time is carried over to the next frame and exposed as `alpha` for interpolation. The
+    number of steps per frame is capped so a long stall (e.g. a window drag) cannot snowball.
+    """
+
+    def __init__(self, step_seconds: float = 1 / SIMULATION_HZ, max_steps_per_frame: int = 5) -> None:
+        self.step_seconds = step_seconds
+        self.max_steps_per_frame = max_steps_per_frame
+        self.accumulator: float = 0.0
+
+    def advance(self, frame_seconds: float) -> int:
+        """Adds a frame's elapsed time and returns how many steps to simulate."""
+        self.accumulator += min(frame_seconds, self.step_seconds * self.max_steps_per_frame)
+        steps = int(self.accumulator // self.step_seconds)
+        self.accumulator -= steps * self.step_seconds
+
+        return steps
+
+    def reset(self) -> None:
+        self.accumulator = 0.0
+
+    @property
+    def alpha(self) -> float:
+        return self.accumulator / self.step_seconds
+
+
+Policy = Callable[[PongSimulation, int], Direction | None]
+
+
+def track_ball(simulation: PongSimulation, player: int) -> Direction | None:
+    """A simple opponent that follows the ball's height."""
+    paddle = simulation.player_1 if player == 1 else simulation.player_2
+    center = paddle.y + paddle.height / 2
+    if simulation.ball.y < center - paddle.height / 4:
+        return Direction.Up
+    if simulation.ball.y > center + paddle.height / 4:
+        return Direction.Down
+    return None
+
+
+@dataclass
+class MatchResult:
+    winner: int | None
+    scores: list[int]
+    rally_hits: list[int] = field(default_factory=list)
+    steps: int = 0
+
+
+def simulate_match(config: GameConfig, player_1_policy: Policy = track_ball, player_2_policy: Policy = track_ball,
+                   max_steps: int = 100_000, rng: random.Random | None = None,
+                   countdown_seconds: float = 0.0) -> MatchResult:
+    """
+    Plays a complete match without rendering, as fast as the CPU allows.
+
+    Returns:
+        MatchResult: The winner (None if `max_steps` ran out), final scores and paddle hits per rally.
+    """
+    simulation = PongSimulation(config, rng=rng, countdown_seconds=countdown_seconds)
+
+    steps = 0
+    while not simulation.game_over and steps < max_steps:
+        if simulation.round_over:
+            simulation.new_round()
+        simulation.step(player_1_policy(simulation, 1), player_2_policy(simulation, 2))
+        steps += 1
+
+    return MatchResult(winner=simulation.winner, scores=list(simulation.scores),
+                       rally_hits=list(simulation.rally_hits), steps=steps)
@@ -5,7 +5,10 @@
 
 from pytest import fixture
 from pathlib import Path
+import ctypes
 import json
+import sys
+import numpy as np
 
 @fixture
 def root_dir():
@@ -68,4 +71,180 @@ def load_config(root_dir):
             model_config = json.load(f)
         return model_config
 
-    return _get_config 
\ No newline at end of file
+    return _get_config
+
+@fixture
+def pong_config():
+    # Pong modules import each other by file name, like when main.py runs from src/pong
+    pong_directory = str(Path(__file__).resolve().parent.parent/"src"/"pong")
+    if pong_directory not in sys.path:
+        sys.path.append(pong_directory)
+    from game_config import GameConfig
+
+    color = {"red": 0, "green": 0, "blue": 0}
+    return GameConfig(player_1_paddle_width=15, player_1_paddle_height=100,
+                      player_2_paddle_width=15, player_2_paddle_height=100,
+                      ball_radius=10, background_color=color, ball_color=color,
+                      player_1_paddle_color=color, player_2_paddle_color=color,
+                      text_color=color, text_background_color=color,
+                      player_1_paddle_speed=7.0, player_2_paddle_speed=7.0,
+                      ball_initial_speed=5.0, ball_acceleration_factor=0.1,
+                      change_summary="")
+
+class FakeNodeArg:
+    def __init__(self, name, shape):
+        self.name = name
+        self.shape = shape
+        self.type = "tensor(float)"
+
+class FakeIOBinding:
+    """
+    Records buffer pointers like ort.IOBinding, FakeSession.run_with_iobinding() reads and writes through them.
+    """
+    def __init__(self):
+        self.inputs = {}
+        self.outputs = {}
+
+    def bind_input(self, name, device_type, device_id, element_type, shape, buffer_ptr):
+        self.inputs[name] = (np.dtype(element_type), tuple(shape), buffer_ptr)
+
+    def bind_output(self, name, device_type="cpu", device_id=0, element_type=None, shape=None, buffer_ptr=None):
+        self.outputs[name] = (np.dtype(element_type), tuple(shape), buffer_ptr)
+
+    def clear_binding_inputs(self):
+        self.inputs = {}
+
+    def clear_binding_outputs(self):
+        self.outputs = {}
+
+    @staticmethod
+    def view(dtype, shape, buffer_ptr):
+        size = int(np.prod(shape))*dtype.itemsize
+        memory = (ctypes.c_char*size).from_address(buffer_ptr)
+        return np.frombuffer(memory, dtype=dtype).reshape(shape)
+
+class FakeSession:
+    """
+    Minimal stand-in for ort.InferenceSession that computes its outputs with NumPy.
+    """
+    def __init__(self, inputs, outputs, compute):
+        self._inputs = [FakeNodeArg(name, shape) for name, shape in inputs]
+        self._outputs = [FakeNodeArg(name, shape) for name, shape in outputs]
+        self._compute = compute
+        self.run_count = 0
+
+    def get_inputs(self):
+        return self._inputs
+
+    def get_outputs(self):
+        return self._outputs
+
+    def run(self, output_names, input_feed):
+        self.run_count += 1
+        return self._compute(input_feed)
+
+    def io_binding(self):
+        return FakeIOBinding()
+
+    def run_with_iobinding(self, binding):
+        feed = {name: FakeIOBinding.view(*bound).copy() for name, bound in binding.inputs.items()}
+        for output, result in zip(self._outputs, self.run(None, feed)):
+            dtype, shape, buffer_ptr = binding.outputs[output.name]
+            if result.shape != shape:
+                raise ValueError(f"Output {output.name} is {result.shape}, the bound buffer is {shape}")
+            FakeIOBinding.view(dtype, shape, buffer_ptr)[...] = result
+
+@fixture
+def deepseek_sessions():
+    """
+    Builds fake EMBEDDING/CONTEXT/CONTEXT_ITER/HEAD sessions of a tiny causal "model".
+
+    The hidden state of a token is the sum of the embeddings of all valid tokens up to and including it,
+    the KV cache stores the per-token embeddings, so prefix reuse can be checked for exact parity.
+    `iter_tokens` is the CONTEXT_ITER sequence dimension, e.g. "seq" for a graph taking several tokens per run.
+    """
+    def _build(hidden_size=8, vocab_size=32, num_layers=2, window=4, seed=0, iter_tokens=1):
+        rng = np.random.default_rng(seed)
+        table = rng.standard_normal((vocab_size, hidden_size)).astype(np.float32)
+        head_weights = rng.standard_normal((hidden_size, vocab_size)).astype(np.float32)
+        kv_names = [f"{kind}_{layer}" for layer in range(num_layers) for kind in ("keys", "values")]
+
+        def embedding(feed):
+            return [table[feed["input_ids"]]]
+
+        def context(feed):
+            states = feed["input_hidden_states"].copy()
+            states[:, int(feed["past_seq_len"].item()) + 1:] = 0
+            kv = [states[:, None] * (1 + index // 2) for index in range(len(kv_names))]
+            return [np.cumsum(states, axis=1), *kv]
+
+        def context_iter(feed):
+            states = feed["input_hidden_states"]
+            hidden = np.cumsum(states, axis=1) + feed["past_keys_0"][:, 0].sum(axis=1, keepdims=True)
+            kv = [np.concatenate([feed[f"past_{name}"], states[:, None] * (1 + index // 2)], axis=2)
+                  for index, name in enumerate(kv_names)]
+            return [hidden, *kv]
+
+        def head(feed):
+            return [feed["output_hidden_states"] @ head_weights]
+
+        kv_inputs = [(f"past_{name}", [1, 1, "past", hidden_size]) for name in kv_names]
+        kv_outputs = [(f"present_{name}", [1, 1, "total", hidden_size]) for name in kv_names]
+        seq_inputs = [("past_seq_len", [1, 1]), ("total_seq_len", [1])]
+        sessions = {
+            "EMBEDDING": FakeSession([("input_ids", [1, "seq"])], [("embeddings", [1, window, hidden_size])], embedding),
+            "CONTEXT": FakeSession([("input_hidden_states", [1, window, hidden_size]), *kv_inputs, *seq_inputs],
+                                   [("output_hidden_states", [1, window, hidden_size]), *kv_outputs], context),
+            "CONTEXT_ITER": FakeSession([("input_hidden_states", [1, iter_tokens, hidden_size]), *kv_inputs, *seq_inputs],
+                                        [("output_hidden_states", [1, iter_tokens, hidden_size]), *kv_outputs], context_iter),
+            "HEAD": FakeSession([("output_hidden_states", [1, "seq", hidden_size])], [("logits", [1, "seq", vocab_size])], head),
+        }
+        meta = {"num_heads": 1, "num_key_value_heads": 1, "num_layers": num_layers,
+                "attn_head_size": hidden_size, "max_seq_len": window}
+        return sessions, meta
+
+    return _build
+
+@fixture
+def deepseek_inference(tmp_path, deepseek_sessions):
+    """
+    Factory returning a DeepSeekModelInference wired to the fake sessions and a word level tokenizer.
+    """
+    from tokenizers import Tokenizer
+    from tokenizers.models import WordLevel
+    from tokenizers.pre_tokenizers import Whitespace
+    from src.deepseek_r1.deepseek_model_inference import DeepSeekModelInference
+
+    vocab = {word: index for index, word in enumerate(["[UNK]"] + [f"w{index}" for index in range(1, 32)])}
+    tokenizer = Tokenizer(WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    tokenizer.save(str(tmp_path/"tokenizer.json"))
+
+    def _build(**kwargs):
+        sessions, meta = deepseek_sessions(**kwargs)
+        return DeepSeekModelInference(model_sessions=sessions, tokenizer="tokenizer.json",
+                                      model_subdirectory=tmp_path, model_meta=meta)
+
+    return _build
+
+@fixture
+def hrnet_session():
+    """
+    Factory for a fake HRNet session whose heatmaps peak, for every joint, at the brightest pixel of
+    the input image (downsampled 4x like the real model).
+    """
+    def _build(batch="batch", height=256, width=192, num_keypoints=17):
+        out_height, out_width = height // 4, width // 4
+        grid_y, grid_x = np.mgrid[0:out_height, 0:out_width]
+
+        def compute(feed):
+            images = feed["image"]
+            brightness = images.sum(axis=1).reshape(len(images), -1)
+            peak_y, peak_x = np.divmod(np.argmax(brightness, axis=1), width)
+            heatmaps = np.exp(-((grid_y - peak_y[:, None, None] / 4)**2 + (grid_x - peak_x[:, None, None] / 4)**2) / 2)
+            return [np.repeat(heatmaps[:, None], num_keypoints, axis=1).astype(np.float32)]
+
+        return FakeSession([("image", [batch, 3, height, width])],
+                           [("heatmaps", [batch, num_keypoints, out_height, out_width])], compute)
+
+    return _build
@@ -0,0 +1,82 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import numpy as np
+
+
+# Minimal protobuf writer for the few ONNX messages the tests need
+def varint(value):
+    out = bytearray()
+    value &= (1 << 64) - 1                                                  # Negative int64 as two's complement
+    while True:
+        byte, value = value & 0x7F, value >> 7
+        out.append(byte | (0x80 if value else 0))
+        if not value:
+            return bytes(out)
+
+def field(number, value):
+    if isinstance(value, int):
+        return varint(number << 3) + varint(value)
+    value = value.encode() if isinstance(value, str) else value
+    return varint(number << 3 | 2) + varint(len(value)) + value
+
+ONNX_TYPES = {np.dtype(np.float32): 1, np.dtype(np.uint8): 2, np.dtype(np.int8): 3, np.dtype(np.int64): 7,
+              np.dtype(np.float16): 10}
+
+def tensor(name, array, external=None):
+    array = np.asarray(array)
+    message = b"".join(field(1, dim) for dim in array.shape) + field(2, ONNX_TYPES[array.dtype]) + field(8, name)
+    if external is None:
+        return message + field(9, array.tobytes())
+    location, offset = external
+    for key, value in (("location", location), ("offset", str(offset)), ("length", str(array.nbytes))):
+        message += field(13, field(1, key) + field(2, value))
+    return message + field(14, 1)
+
+def value_info(name, elem_type, dims):
+    shape = b"".join(field(1, field(1, dim) if isinstance(dim, int) else field(2, dim)) for dim in dims)
+    return field(1, name) + field(2, field(1, field(1, elem_type) + field(2, shape)))
+
+def node(op_type, inputs, outputs, **attributes):
+    message = b"".join(field(1, name) for name in inputs) + b"".join(field(2, name) for name in outputs) + field(4, op_type)
+    for name, value in attributes.items():
+        if isinstance(value, int):
+            message += field(5, field(1, name) + field(3, value) + field(20, 2))
+        elif isinstance(value, str):
+            message += field(5, field(1, name) + field(4, value) + field(20, 3))
+    return message
+
+def write_model(path, graph):
+    path.write_bytes(field(1, 8) + field(8, field(1, "") + field(2, 17)) + field(7, graph))
+    return path
+
+def write_embedding_graph(path, table, scale=None, zero_point=None, dequantize=None, axis=None, external=False):
+    initializers = {"table": table}
+    if scale is not None:
+        initializers["scale"] = np.asarray(scale, dtype=np.float32)
+        initializers["zero_point"] = np.asarray(zero_point, dtype=table.dtype)
+
+    if dequantize == "before":
+        nodes = [node("DequantizeLinear", ["table", "scale", "zero_point"], ["weights"], axis=axis),
+                 node("Gather", ["weights", "input_ids"], ["embeddings"])]
+    elif dequantize == "after":
+        nodes = [node("Gather", ["table", "input_ids"], ["gathered"]),
+                 node("DequantizeLinear", ["gathered", "scale", "zero_point"], ["embeddings"], axis=axis)]
+    else:
+        nodes = [node("Gather", ["table", "input_ids"], ["embeddings"])]
+
+    tensors = b""
+    if external:
+        table_bytes = table.tobytes()
+        (path.parent/"table.bin").write_bytes(b"\0"*16 + table_bytes)
+        tensors += field(5, tensor("table", table, external=("table.bin", 16)))
+        initializers.pop("table")
+    tensors += b"".join(field(5, tensor(name, array)) for name, array in initializers.items())
+
+    graph = (b"".join(field(1, graph_node) for graph_node in nodes) + field(2, "embedding") + tensors
+             + field(11, value_info("input_ids", 7, [1, "seq"]))
+             + field(12, value_info("embeddings", 1 if scale is not None else ONNX_TYPES[table.dtype],
+                                    [1, "seq", table.shape[1]])))
+    return write_model(path, graph)
@@ -0,0 +1,78 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import numpy as np
+import pytest
+
+from src.deepseek_r1.deepseek_model_inference import SinkWindowPolicy
+
+
+def _ids(*token_ids):
+    return np.array([token_ids], dtype=np.int64)
+
+def test_policy_evicts_the_middle_in_chunks():
+    policy = SinkWindowPolicy(sink_tokens=2, window=8, evict_chunk=3)
+
+    assert policy.eviction(9) is None
+    assert policy.eviction(10) == (2, 5)
+
+    with pytest.raises(ValueError):
+        SinkWindowPolicy(window=4, evict_chunk=5)
+
+def test_long_generation_keeps_sinks_and_recent_window(deepseek_inference):
+    tokens = _ids(*[(index % 31) + 1 for index in range(40)])
+    reference = deepseek_inference(window=4)
+    reference.prefill(tokens, io_binding=False)
+
+    iInfer = deepseek_inference(window=4)
+    iInfer.context_policy = SinkWindowPolicy(sink_tokens=2, window=8, evict_chunk=3)
+    iInfer.prefill(tokens[:, :4], io_binding=False)
+    lengths = []
+    for token_id in tokens[0, 4:]:
+        iInfer.extend(_ids(token_id), io_binding=False)
+        lengths.append(iInfer.sequence_length)
+
+    assert max(lengths) <= 2 + 8
+    assert iInfer.sequence_length + iInfer.evicted_positions == reference.sequence_length
+    assert len(iInfer.token_ids) == 40
+
+    # The fake model's KV entries only depend on their own token, so the kept values match exactly. The window
+    # keys were rotated back, which changes each rotary pair's angle but not its magnitude.
+    kept = iInfer.sequence_length - 2
+    for name, cache in iInfer.kv_cache.items():
+        window = reference.kv_cache[name][:, :, -kept:]
+        np.testing.assert_array_equal(cache[:, :, :2], reference.kv_cache[name][:, :, :2])
+        if name.startswith("past_values"):
+            np.testing.assert_array_equal(cache[:, :, 2:], window)
+        else:
+            assert not np.allclose(cache[:, :, 2:], window)
+            half = window.shape[-1]//2
+            np.testing.assert_allclose(np.hypot(cache[..., 2:, :half], cache[..., 2:, half:]),
+                                       np.hypot(window[..., :half], window[..., half:]), rtol=1e-5)
+
+def test_shifted_keys_match_keys_rotated_at_the_new_position():
+    policy = SinkWindowPolicy(rope_theta=100.0)
+    head_size = 8
+    frequency = 100.0 ** (-np.arange(0, head_size, 2)/head_size)
+
+    def rotate(keys, position):
+        cos, sin = np.cos(position*frequency), np.sin(position*frequency)
+        first, second = keys[..., :head_size//2], keys[..., head_size//2:]
+        return np.concatenate([first*cos - second*sin, second*cos + first*sin], axis=-1)
+
+    keys = np.random.default_rng(0).standard_normal((1, 2, 3, head_size))
+    np.testing.assert_allclose(policy.shift_positions(rotate(keys, 37), 30), rotate(keys, 7), atol=1e-10)
+
+def test_evicted_context_cannot_be_rewound(deepseek_inference):
+    iInfer = deepseek_inference(window=4)
+    iInfer.context_policy = SinkWindowPolicy(sink_tokens=1, window=4, evict_chunk=2)
+    iInfer.prefill(_ids(*range(1, 12)), io_binding=False)
+
+    assert iInfer.evicted_positions > 0
+    with pytest.raises(ValueError, match="evicted"):
+        iInfer.rewind(num_tokens=5)
+    # A prompt sharing the prefix is prefilled from scratch instead
+    iInfer.prefill(_ids(*range(1, 13)), io_binding=False, reuse_prefix=True)
+    assert iInfer.session_mapper["CONTEXT"].run_count == 2
@@ -0,0 +1,52 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import numpy as np
+import pytest
+
+
+def test_follow_up_turns_only_process_new_tokens(deepseek_inference):
+    np.random.seed(0)
+    iInfer = deepseek_inference(window=4)
+    sessions = iInfer.session_mapper
+    conversation = iInfer.conversation(io_binding=False)
+
+    conversation.send("w1 w2 w3 w4 w5", max_tokens=3)
+    history = conversation.token_count
+    iter_runs = sessions["CONTEXT_ITER"].run_count
+
+    conversation.send("w6 w7", max_tokens=3)
+
+    assert sessions["CONTEXT"].run_count == 1
+    # One CONTEXT_ITER step per token added since the first turn, the history is not processed again
+    assert sessions["CONTEXT_ITER"].run_count - iter_runs == conversation.token_count - history
+    assert [role for role, _ in conversation.messages] == ["user", "assistant", "user", "assistant"]
+
+def test_retained_cache_matches_full_prefill(deepseek_inference):
+    np.random.seed(1)
+    iInfer = deepseek_inference(window=4)
+    conversation = iInfer.conversation(io_binding=False)
+    conversation.send("w1 w2 w3", max_tokens=2)
+    conversation.send("w9 w10 w11", max_tokens=2)
+
+    reference = deepseek_inference(window=4)
+    logits = reference.prefill(np.array([conversation.state.token_ids], dtype=np.int64), io_binding=False)
+
+    np.testing.assert_allclose(conversation.state.last_logits, logits, rtol=1e-5)
+
+@pytest.mark.parametrize("io_binding", [False, True])
+def test_conversations_share_a_model_without_mixing_state(deepseek_inference, io_binding):
+    np.random.seed(2)
+    iInfer = deepseek_inference(window=4)
+    first, second = iInfer.conversation(io_binding=io_binding), iInfer.conversation(io_binding=io_binding)
+
+    first.send("w1 w2 w3 w4 w5", max_tokens=2)
+    second.send("w20 w21", max_tokens=2)
+    first_ids = list(first.state.token_ids)
+    first.send("w6", max_tokens=2)
+
+    assert first.state.token_ids[:len(first_ids)] == first_ids
+    assert "w20" not in iInfer.tokenizer.decode(first.state.token_ids)
+    assert iInfer.token_ids == []
@@ -0,0 +1,43 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import numpy as np
+import pytest
+
+
+def _expected(token_ids, pooling):
+    # The fake model's hidden state at a position is the sum of the embeddings up to it
+    table = np.random.default_rng(0).standard_normal((32, 8)).astype(np.float32)
+    hidden_states = np.cumsum(table[token_ids], axis=0)
+    return hidden_states.mean(axis=0) if pooling == "mean" else hidden_states[-1]
+
+@pytest.mark.parametrize("iter_tokens", [1, "seq"])
+def test_pooling_masks_padding_and_covers_overflow(deepseek_inference, iter_tokens):
+    iInfer = deepseek_inference(iter_tokens=iter_tokens)
+
+    for pooling in ("mean", "last"):
+        embeddings = iInfer.embed(["w3 w1", "w3 w1 w4 w1 w5 w9"], pooling=pooling, io_binding=False, dtype=np.float32)
+        np.testing.assert_allclose(embeddings[0], _expected([3, 1], pooling), rtol=1e-5, atol=1e-5)
+        np.testing.assert_allclose(embeddings[1], _expected([3, 1, 4, 1, 5, 9], pooling), rtol=1e-5, atol=1e-5)
+
+    assert iInfer.session_mapper["HEAD"].run_count == 0
+
+def test_embeddings_are_written_to_a_float16_memmap(deepseek_inference, tmp_path):
+    iInfer = deepseek_inference()
+    iInfer.prefill(np.array([[7, 8]], dtype=np.int64), io_binding=False)
+    state = iInfer.save_state()
+
+    embeddings = iInfer.embed(["w1 w2", "w5", "w1 w2"], output_path=tmp_path/"corpus.npy", normalize=True)
+
+    stored = np.load(tmp_path/"corpus.npy", mmap_mode="r")
+    assert stored.dtype == np.float16 and stored.shape == (3, 8)
+    np.testing.assert_array_equal(stored, embeddings)
+    np.testing.assert_allclose(np.linalg.norm(stored.astype(np.float32), axis=1), 1, atol=1e-3)
+    np.testing.assert_array_equal(stored[0], stored[2])
+    assert iInfer.session_mapper["CONTEXT"].run_count == 3                         # The prefill and two distinct texts
+    assert iInfer.token_ids == state.token_ids
+
+    with pytest.raises(ValueError, match="pooling"):
+        iInfer.embed(["w1"], pooling="max")
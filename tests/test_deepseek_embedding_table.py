@@ -0,0 +1,103 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import mmap
+
+import numpy as np
+import onnxruntime as ort
+import pytest
+
+from src.deepseek_r1.embedding_table import EmbeddingTable, load_embedding_table
+from tests.onnx_graphs import write_embedding_graph
+
+
+@pytest.mark.parametrize("variant", ["float", "float16", "external", "quantized_after", "per_column_after",
+                                     "per_row_before", "per_column_before", "square_per_row", "square_per_column"])
+def test_lookup_matches_embedding_session(tmp_path, variant):
+    rng = np.random.default_rng(0)
+    # A square table can't tell per row from per column scales by their size, only the axis attribute can
+    vocab_size, hidden_size = (64, 64) if variant.startswith("square") else (512, 64)
+    path = tmp_path/"embedding.onnx"
+
+    if variant in ("float", "external"):
+        write_embedding_graph(path, rng.standard_normal((vocab_size, hidden_size)).astype(np.float32),
+                              external=variant == "external")
+    elif variant == "float16":
+        write_embedding_graph(path, rng.standard_normal((vocab_size, hidden_size)).astype(np.float16))
+    else:
+        table = rng.integers(0, 256, (vocab_size, hidden_size), dtype=np.uint8)
+        if variant == "quantized_after":
+            write_embedding_graph(path, table, scale=0.02, zero_point=128, dequantize="after")
+        elif variant == "per_column_after":
+            write_embedding_graph(path, table, scale=rng.uniform(0.01, 0.1, hidden_size),
+                                  zero_point=rng.integers(100, 150, hidden_size), dequantize="after", axis=-1)
+        elif variant in ("per_row_before", "square_per_row"):
+            write_embedding_graph(path, table, scale=rng.uniform(0.01, 0.1, vocab_size),
+                                  zero_point=rng.integers(100, 150, vocab_size), dequantize="before", axis=0)
+        else:
+            write_embedding_graph(path, table, scale=rng.uniform(0.01, 0.1, hidden_size),
+                                  zero_point=rng.integers(100, 150, hidden_size), dequantize="before", axis=1)
+
+    session = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+    embedding_table = EmbeddingTable.from_onnx(path)
+    token_ids = np.array([[0, 7, 7, min(300, vocab_size - 2), vocab_size - 1]], dtype=np.int64)
+
+    expected = session.run(None, {"input_ids": token_ids})[0]
+    np.testing.assert_allclose(embedding_table.lookup(token_ids), expected, rtol=1e-6, atol=1e-6)
+    assert embedding_table.lookup(token_ids).dtype == expected.dtype
+    assert embedding_table.verify(session)
+
+def test_dequantization_axis_must_match_the_parameter_shape(tmp_path):
+    rng = np.random.default_rng(3)
+    table = rng.integers(0, 256, (32, 8), dtype=np.uint8)
+
+    # Per row parameters on the hidden axis
+    path = write_embedding_graph(tmp_path/"embedding.onnx", table, scale=rng.uniform(0.01, 0.1, 32),
+                                 zero_point=rng.integers(100, 150, 32), dequantize="before", axis=1)
+    with pytest.raises(ValueError, match="axis 1"):
+        EmbeddingTable.from_onnx(path)
+    assert load_embedding_table(path) is None
+
+    # After the Gather, only the hidden axis belongs to the table
+    path = write_embedding_graph(tmp_path/"embedding.onnx", table, scale=rng.uniform(0.01, 0.1, 8),
+                                 zero_point=rng.integers(100, 150, 8), dequantize="after", axis=1)
+    with pytest.raises(ValueError, match="not an axis of the embedding table"):
+        EmbeddingTable.from_onnx(path)
+
+def test_verify_rejects_a_different_dtype(tmp_path):
+    table = np.random.default_rng(2).standard_normal((64, 8)).astype(np.float16)
+    path = write_embedding_graph(tmp_path/"embedding.onnx", table)
+    session = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+
+    assert not EmbeddingTable(table).verify(session)
+    assert EmbeddingTable(table, dtype=np.float16).verify(session)
+
+def test_large_inline_tables_are_memory_mapped(tmp_path):
+    table = np.random.default_rng(1).standard_normal((1024, 32)).astype(np.float32)
+    embedding_table = EmbeddingTable.from_onnx(write_embedding_graph(tmp_path/"embedding.onnx", table))
+
+    assert isinstance(embedding_table.weights.base, mmap.mmap)
+    np.testing.assert_array_equal(embedding_table.lookup(np.array([[5]]))[0, 0], table[5])
+
+def test_unsupported_graphs_fall_back_to_the_session(tmp_path):
+    path = tmp_path/"embedding.onnx"
+    path.write_bytes(b"")
+
+    assert load_embedding_table(path) is None
+    with pytest.raises(ValueError, match="Token ids"):
+        EmbeddingTable(np.zeros((4, 2), dtype=np.float32)).lookup(np.array([[4]]))
+
+def test_decode_skips_the_embedding_session(deepseek_inference):
+    reference = deepseek_inference()
+    reference_logits = reference.prefill(np.array([[1, 2, 3, 4, 5, 6]], dtype=np.int64), io_binding=False)
+
+    iInfer = deepseek_inference()
+    sessions = iInfer.session_mapper
+    iInfer.embedding_table = EmbeddingTable(sessions["EMBEDDING"].run(None, {"input_ids": np.arange(32)[None]})[0][0])
+    runs = sessions["EMBEDDING"].run_count
+    logits = iInfer.prefill(np.array([[1, 2, 3, 4, 5, 6]], dtype=np.int64), io_binding=False)
+
+    assert sessions["EMBEDDING"].run_count == runs
+    np.testing.assert_allclose(logits, reference_logits, rtol=1e-6)
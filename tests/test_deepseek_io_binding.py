@@ -0,0 +1,61 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import numpy as np
+
+from src.deepseek_r1.deepseek_model_inference import SinkWindowPolicy
+
+
+def _ids(*token_ids):
+    return np.array([token_ids], dtype=np.int64)
+
+def test_io_binding_matches_plain_runs(deepseek_inference):
+    reference = deepseek_inference(window=4)
+    reference.prefill(_ids(1, 2, 3), io_binding=False)
+    expected = reference.extend(_ids(7, 8, 9), io_binding=False)
+
+    iInfer = deepseek_inference(window=4)
+    iInfer.prefill(_ids(1, 2, 3))
+    actual = iInfer.extend(_ids(7, 8, 9))
+
+    np.testing.assert_allclose(actual, expected, rtol=1e-6)
+    assert iInfer.session_mapper["CONTEXT_ITER"].run_count == 3
+
+def test_state_swaps_rebind_the_io_buffers(deepseek_inference):
+    iInfer = deepseek_inference(window=4)
+    iInfer.prefill(_ids(1, 2, 3, 4, 5))
+    first = iInfer.save_state()
+    iInfer.prefill(_ids(9, 9, 9))
+    iInfer.extend(_ids(10, 11, 12))
+
+    iInfer.load_state(first)
+    assert iInfer.output_hidden_states_buffer is None
+    logits = iInfer.extend(_ids(6))
+
+    reference = deepseek_inference(window=4)
+    expected = reference.prefill(_ids(1, 2, 3, 4, 5, 6), io_binding=False)
+    np.testing.assert_allclose(logits, expected, rtol=1e-6)
+
+def test_io_binding_continues_from_evicted_and_restored_caches(tmp_path, deepseek_inference):
+    tokens = _ids(*[(index % 31) + 1 for index in range(20)])
+    policy = SinkWindowPolicy(sink_tokens=2, window=8, evict_chunk=3)
+    reference = deepseek_inference(window=4)
+    reference.context_policy = policy
+    reference.prefill(tokens, io_binding=False)
+
+    iInfer = deepseek_inference(window=4)
+    iInfer.context_policy = policy
+    iInfer.prefill(tokens)
+    assert iInfer.evicted_positions == reference.evicted_positions > 0
+    np.testing.assert_allclose(iInfer.last_logits, reference.last_logits, rtol=1e-5)
+
+    # The restored KV cache is a read-only memory map, binding it as an input must not need a copy
+    iInfer.save_snapshot(tmp_path/"snapshot")
+    restored = deepseek_inference(window=4)
+    restored.context_policy = policy
+    restored.restore_snapshot(tmp_path/"snapshot")
+    assert not restored.kv_cache["past_keys_0"].flags.writeable
+
+    np.testing.assert_allclose(restored.extend(_ids(5, 6)), reference.extend(_ids(5, 6), io_binding=False), rtol=1e-5)
@@ -0,0 +1,79 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import json
+
+import numpy as np
+import pytest
+
+from src.deepseek_r1.deepseek_model_inference import Conversation
+
+
+def _ids(*token_ids):
+    return np.array([token_ids], dtype=np.int64)
+
+def test_restored_snapshot_continues_without_prefill(tmp_path, deepseek_inference):
+    np.random.seed(0)
+    original = deepseek_inference(window=4)
+    original.prefill(_ids(1, 2, 3, 4, 5, 6), io_binding=False)
+    original.save_snapshot(tmp_path/"snapshot", generated_ids=[5, 6])
+
+    restored = deepseek_inference(window=4)
+    stored = restored.restore_snapshot(tmp_path/"snapshot")
+
+    assert stored["generated_ids"] == [5, 6]
+    assert restored.session_mapper["CONTEXT"].run_count == 0
+    assert isinstance(restored.kv_cache["past_keys_0"], np.memmap)
+    assert not restored.kv_cache["past_keys_0"].flags.writeable
+
+    expected = original.generate(original.extend(_ids(7, 8), io_binding=False), top_k=5, temperature=1.0,
+                                 max_tokens=4, io_binding=False, stream=False)
+    np.random.seed(123)                                                     # Overwritten by the snapshot's RNG state
+    restored.restore_snapshot(tmp_path/"snapshot")
+    actual = restored.generate(restored.extend(_ids(7, 8), io_binding=False), top_k=5, temperature=1.0,
+                               max_tokens=4, io_binding=False, stream=False)
+
+    assert actual == expected
+    np.testing.assert_allclose(restored.last_logits, original.last_logits, rtol=1e-6)
+
+def test_snapshot_is_reused_as_a_shared_prefix(tmp_path, deepseek_inference):
+    system_prompt = deepseek_inference(window=4)
+    system_prompt.prefill(_ids(1, 2, 3, 4, 5, 6), io_binding=False)
+    system_prompt.save_snapshot(tmp_path/"system")
+
+    replica = deepseek_inference(window=4)
+    replica.restore_snapshot(tmp_path/"system")
+    logits = replica.prefill(_ids(1, 2, 3, 4, 5, 6, 7, 8), io_binding=False, reuse_prefix=True)
+
+    reference = deepseek_inference(window=4).prefill(_ids(1, 2, 3, 4, 5, 6, 7, 8), io_binding=False)
+    assert replica.session_mapper["CONTEXT"].run_count == 0
+    assert replica.session_mapper["CONTEXT_ITER"].run_count == 2
+    np.testing.assert_allclose(logits, reference, rtol=1e-5)
+
+def test_conversation_round_trip(tmp_path, deepseek_inference):
+    np.random.seed(1)
+    conversation = deepseek_inference(window=4).conversation(io_binding=False)
+    conversation.send("w1 w2 w3 w4 w5", max_tokens=3)
+    conversation.save(tmp_path/"chat")
+    expected = conversation.send("w6 w7", max_tokens=3)
+
+    restored = Conversation.restore(deepseek_inference(window=4), tmp_path/"chat", io_binding=False)
+    assert restored.messages == conversation.messages[:2]
+    assert restored.send("w6 w7", max_tokens=3) == expected
+    assert restored.state.token_ids == conversation.state.token_ids
+
+def test_snapshot_rejects_other_models(tmp_path, deepseek_inference):
+    iInfer = deepseek_inference(window=4, num_layers=2)
+    iInfer.prefill(_ids(1, 2, 3), io_binding=False)
+    iInfer.save_snapshot(tmp_path/"snapshot")
+
+    with pytest.raises(ValueError, match="num_layers"):
+        deepseek_inference(window=4, num_layers=3).restore_snapshot(tmp_path/"snapshot")
+
+    state = json.loads((tmp_path/"snapshot"/"state.json").read_text())
+    state["version"] = 0
+    (tmp_path/"snapshot"/"state.json").write_text(json.dumps(state))
+    with pytest.raises(ValueError, match="version"):
+        deepseek_inference(window=4).restore_snapshot(tmp_path/"snapshot")
@@ -0,0 +1,77 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import numpy as np
+import pytest
+
+from src.deepseek_r1.deepseek_model_inference import PromptLookup, SinkWindowPolicy
+
+
+def _generate(iInfer, lookahead=None, max_tokens=30, seed=0):
+    np.random.seed(seed)
+    logits = iInfer.prefill(np.array([[3, 1, 4, 1]], dtype=np.int64), io_binding=False)
+    return iInfer.generate(logits=logits, top_k=1, temperature=1.0, max_tokens=max_tokens, repetition_penalty=None,
+                           io_binding=False, stream=False, lookahead=lookahead)
+
+def test_lookup_proposes_continuation_of_longest_suffix():
+    lookup = PromptLookup(max_ngram=2, min_ngram=1, max_draft=3)
+    lookup.reset([5, 6, 7, 8, 6, 9, 5, 6])
+
+    # "5 6" was followed by "7 8 6", the more recent "6 9" only matches the 1-gram
+    assert lookup.propose() == [7, 8, 6]
+    assert lookup.propose(max_draft=1) == [7]
+
+    lookup.append(1)
+    assert lookup.propose() == []
+    with pytest.raises(ValueError):
+        PromptLookup(max_ngram=1, min_ngram=2)
+
+def test_greedy_speculation_matches_plain_decoding(deepseek_inference):
+    reference = deepseek_inference(iter_tokens="seq")
+    expected = _generate(reference)
+
+    iInfer = deepseek_inference(iter_tokens="seq")
+    lookahead = PromptLookup(max_draft=4)
+    generated = _generate(iInfer, lookahead=lookahead)
+
+    assert generated == expected
+    assert lookahead.accepted > 0
+    assert iInfer.session_mapper["CONTEXT_ITER"].run_count < reference.session_mapper["CONTEXT_ITER"].run_count
+
+    # The cache holds exactly the accepted tokens, as after plain decoding
+    assert iInfer.token_ids == reference.token_ids
+    assert iInfer.sequence_length == reference.sequence_length
+    for name, cache in iInfer.kv_cache.items():
+        np.testing.assert_allclose(cache, reference.kv_cache[name], rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(iInfer.last_logits, reference.last_logits, rtol=1e-5, atol=1e-5)
+
+def test_single_token_graph_decodes_without_lookup(deepseek_inference):
+    expected = _generate(deepseek_inference())
+
+    lookahead = PromptLookup()
+    assert _generate(deepseek_inference(), lookahead=lookahead) == expected
+    assert lookahead.proposed == 0
+
+def test_speculation_stays_within_the_context_window(deepseek_inference):
+    iInfer = deepseek_inference(iter_tokens="seq")
+    policy = SinkWindowPolicy(sink_tokens=2, window=6, evict_chunk=2)
+    iInfer.context_policy = policy
+    context_iter = iInfer.session_mapper["CONTEXT_ITER"]
+    compute, total_lengths = context_iter._compute, []
+    def record(feed):
+        assert feed["past_keys_0"].shape[2] == feed["past_seq_len"].item()
+        total_lengths.append(int(feed["total_seq_len"].item()))
+        return compute(feed)
+    context_iter._compute = record
+
+    lookahead = PromptLookup(max_draft=4)
+    generated = _generate(iInfer, lookahead=lookahead, max_tokens=40)
+
+    assert lookahead.proposed > 0 and iInfer.evicted_positions > 0
+    assert max(total_lengths) <= policy.max_length
+    assert iInfer.kv_cache["past_keys_0"].shape[2] == iInfer.sequence_length <= policy.max_length
+    # Every cached token is either still in the cache or was evicted, rejected drafts are gone
+    assert iInfer.sequence_length + iInfer.evicted_positions == 4 + len(iInfer.token_ids) - iInfer.context_token_count
+    assert len(iInfer.token_ids) == iInfer.context_token_count + len(generated) - 1
@@ -0,0 +1,47 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import numpy as np
+
+from src.deepseek_r1.deepseek_model_inference import DeepSeekModelInference
+
+
+def _reference_logprobs(iInfer, token_ids):
+    logprobs = []
+    for position in range(1, len(token_ids)):
+        logits = iInfer.prefill(np.array([token_ids[:position]], dtype=np.int64), io_binding=False)[0, -1].astype(np.float64)
+        logprobs.append(logits[token_ids[position]] - np.log(np.exp(logits).sum()))
+    return np.array(logprobs)
+
+def test_token_logprobs_is_stable_for_large_logits():
+    logits = np.array([[1e4, 1e4 - 1, 0.0], [1.0, 2.0, 3.0]], dtype=np.float32)
+
+    logprobs = DeepSeekModelInference.token_logprobs(logits, np.array([1, 2]))
+
+    assert np.isfinite(logprobs).all()
+    np.testing.assert_allclose(logprobs, [-1 - np.log1p(np.exp(-1)), 3 - np.log(np.exp([1, 2, 3]).sum())], rtol=1e-6)
+
+def test_scores_match_prefill_logits_beyond_the_window(deepseek_inference):
+    text = "w3 w1 w4 w1 w5 w9 w2"                                                   # Longer than the 4 token window
+    token_ids = [3, 1, 4, 1, 5, 9, 2]
+    expected = _reference_logprobs(deepseek_inference(), token_ids)
+
+    for iter_tokens in (1, "seq"):
+        scores = deepseek_inference(iter_tokens=iter_tokens).score([text], io_binding=False)[0]
+        np.testing.assert_array_equal(scores.token_ids, token_ids)
+        np.testing.assert_allclose(scores.logprobs, expected, rtol=1e-5, atol=1e-5)
+        assert np.isclose(scores.perplexity, np.exp(-expected.mean()), rtol=1e-5)
+
+def test_scoring_keeps_the_generation_state(deepseek_inference):
+    iInfer = deepseek_inference()
+    iInfer.prefill(np.array([[7, 8]], dtype=np.int64), io_binding=False)
+    state = iInfer.save_state()
+
+    scores = iInfer.score(["w1 w2 w3", "w4", "w1 w2 w3"], io_binding=False)
+
+    assert iInfer.session_mapper["CONTEXT"].run_count == 2                        # The duplicate and the single token are not run
+    assert len(scores[1].logprobs) == 0 and np.isnan(scores[1].perplexity)
+    np.testing.assert_array_equal(scores[0].logprobs, scores[2].logprobs)
+    assert iInfer.token_ids == state.token_ids and iInfer.sequence_length == state.sequence_length
@@ -0,0 +1,70 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import numpy as np
+
+from src.deepseek_r1.deepseek_model_inference import AhoCorasick, StopConditions
+
+
+def _generate(iInfer, prompt=(3, 1, 4, 1), max_tokens=12, stop_conditions=None, seed=0):
+    np.random.seed(seed)
+    logits = iInfer.prefill(np.array([prompt], dtype=np.int64), io_binding=False)
+    return iInfer.generate(logits=logits, top_k=3, temperature=1.0, max_tokens=max_tokens, io_binding=False,
+                           stream=False, stop_conditions=stop_conditions)
+
+def test_matcher_reports_overlapping_patterns_while_streaming():
+    matcher = AhoCorasick(["he", "she", "his", "hers"])
+
+    matches = [(position, index) for position, character in enumerate("ushers") for index in matcher.feed(character)]
+
+    assert sorted(matches) == [(3, 0), (3, 1), (5, 3)]
+    matcher.reset()
+    assert [matcher.feed(token_id) for token_id in (1, 2)] == [[], []]
+
+def test_stop_token_sequence_and_string_end_generation(deepseek_inference):
+    expected = _generate(deepseek_inference())
+
+    stop = StopConditions(stop_token_ids=[expected[3:5]])
+    assert _generate(deepseek_inference(), stop_conditions=stop) == expected[:5]
+    assert stop.reason == "stop_tokens"
+
+    iInfer = deepseek_inference()
+    stop_string = iInfer.tokenizer.decode([expected[2]])
+    stop = StopConditions(stop_strings=[stop_string])
+    generated = _generate(iInfer, stop_conditions=stop)
+    assert generated == expected[:len(generated)]
+    assert stop_string in iInfer.tokenizer.decode([generated[-1]])
+    assert stop.matched == stop_string and len(generated) <= 3
+
+def test_think_budget_forces_end_of_think_block(deepseek_inference):
+    stop = StopConditions(think_budget=0, think_start="w5", think_end="w6")
+    generated = _generate(deepseek_inference(), prompt=(3, 1, 4, 5), stop_conditions=stop)
+
+    assert generated[0] == 6
+    assert len(generated) == 13 and not stop.thinking
+
+    # Stop strings only apply after the think block
+    stop = StopConditions(stop_strings=["w"], think_budget=2, think_start="w5", think_end="w6")
+    generated = _generate(deepseek_inference(), prompt=(3, 1, 4, 5), stop_conditions=stop)
+    # The token after the forced end of the think block is the first answer token, it stops generation
+    assert generated[2] == 6 and len(generated) == 4
+    assert stop.think_tokens == 3 and stop.reason == "stop_string"                  # Two sampled plus the forced end
+
+def test_trim_cuts_the_stop_string_from_the_answer():
+    stop = StopConditions(stop_strings=["END"])
+    stop.matched = "END"
+
+    assert stop.trim("the END of<think> END </think>answer END more") == "the END of<think> END </think>answer "
+
+def test_run_inference_counts_the_tokens_generated_before_a_stop(deepseek_inference):
+    iInfer = deepseek_inference()
+    np.random.seed(0)
+    iInfer.run_inference("w3 w1 w4", top_k=3, temperature=1.0, max_tokens=12, io_binding=False, stream=False)
+    assert iInfer.generated_token_count == 13
+
+    np.random.seed(0)
+    response = iInfer.run_inference("w3 w1 w4", top_k=3, temperature=1.0, max_tokens=12, io_binding=False,
+                                    stream=False, stop_conditions=StopConditions(stop_strings=["w"]))
+    assert iInfer.generated_token_count == 1 and response == ""
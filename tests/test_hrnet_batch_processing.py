@@ -0,0 +1,72 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import json
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent/"src"/"hrnet_pose"))
+
+import cv2 as cv
+import numpy as np
+import pytest
+
+from src.hrnet_pose.batch_processing import BatchPoseProcessor, iter_frames, open_writer
+
+
+def bright_spot_frame(y, x, height=480, width=640):
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[y-4:y+4, x-4:x+4] = 255
+    return frame
+
+@pytest.fixture
+def footage(tmp_path):
+    spots = [(100, 200), (300, 500), (240, 320)]
+
+    image_directory = tmp_path/"images"
+    image_directory.mkdir()
+    for index, spot in enumerate(spots):
+        cv.imwrite(str(image_directory/f"{index:03d}.png"), bright_spot_frame(*spot))
+
+    video_path = tmp_path/"clip.avi"
+    writer = cv.VideoWriter(str(video_path), cv.VideoWriter_fourcc(*"MJPG"), 10, (640, 480))
+    for spot in spots*3:
+        writer.write(bright_spot_frame(*spot))
+    writer.release()
+
+    return image_directory, video_path, spots
+
+@pytest.mark.parametrize("graph_batch, expected_batches", [("batch", 3), (1, 12)])
+def test_batch_processing_writes_frame_coordinates(tmp_path, footage, hrnet_session, graph_batch, expected_batches):
+    image_directory, video_path, spots = footage
+    processor = BatchPoseProcessor(hrnet_session(batch=graph_batch), batch_size=4)
+
+    with open_writer(tmp_path/"keypoints.jsonl") as writer:
+        stats = processor.process([image_directory, video_path], writer)
+
+    records = [json.loads(line) for line in open(tmp_path/"keypoints.jsonl")]
+    assert stats.frames == len(records) == 12
+    assert stats.batches == expected_batches
+    assert [record["frame"] for record in records[3:]] == list(range(9))
+
+    for record, spot in zip(records, spots*4):
+        keypoints = np.array(record["keypoints"])
+        assert keypoints.shape == (17, 3)
+        np.testing.assert_allclose(keypoints[:, :2], np.tile(spot, (17, 1)), atol=12)
+
+def test_npz_output_and_missing_input(tmp_path, footage, hrnet_session):
+    image_directory, _, _ = footage
+    processor = BatchPoseProcessor(hrnet_session(), batch_size=2)
+
+    with open_writer(tmp_path/"keypoints.npz") as writer:
+        processor.process([image_directory], writer)
+
+    data = np.load(tmp_path/"keypoints.npz")
+    assert data["keypoints"].shape == (3, 17, 3)
+    assert list(data["frames"]) == [0, 0, 0]
+
+    with pytest.raises(ValueError):
+        list(iter_frames(tmp_path/"missing.mp4"))
+    with pytest.raises(ValueError):
+        open_writer(tmp_path/"keypoints.csv")
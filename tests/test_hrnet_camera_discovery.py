@@ -0,0 +1,95 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent/"src"/"hrnet_pose"))
+
+import cv2 as cv
+
+from src.hrnet_pose.camera_discovery import CameraDiscovery, CameraMode, list_video_devices, select_mode
+
+
+class FakeCamera():
+    """Snaps requested resolutions to the smallest supported mode that covers them, like most UVC drivers."""
+    MODES = [(640, 480, 30.0), (1280, 720, 30.0), (1920, 1080, 15.0)]
+
+    def __init__(self, opened=True, delay=0.0):
+        time.sleep(delay)
+        self.opened = opened
+        self.requested = [640, 480]
+        self.released = False
+
+    def isOpened(self):
+        return self.opened
+
+    def set(self, prop, value):
+        self.requested[0 if prop == cv.CAP_PROP_FRAME_WIDTH else 1] = value
+
+    def get(self, prop):
+        width, height, fps = next((mode for mode in self.MODES if mode[0] >= self.requested[0] and mode[1] >= self.requested[1]),
+                                  self.MODES[-1])
+        return {cv.CAP_PROP_FRAME_WIDTH: width, cv.CAP_PROP_FRAME_HEIGHT: height, cv.CAP_PROP_FPS: fps}[prop]
+
+    def release(self):
+        self.released = True
+
+def fake_video4linux(tmp_path, nodes):
+    dev, sysfs = tmp_path/"dev", tmp_path/"sysfs"
+    for name, (label, index) in nodes.items():
+        (dev).mkdir(exist_ok=True)
+        (dev/name).touch()
+        (sysfs/name).mkdir(parents=True)
+        (sysfs/name/"name").write_text(label + "\n")
+        (sysfs/name/"index").write_text(f"{index}\n")
+    return str(dev), str(sysfs)
+
+def test_lists_capture_nodes_from_sysfs(tmp_path):
+    dev, sysfs = fake_video4linux(tmp_path, {"video0": ("Integrated Camera", 0), "video1": ("Integrated Camera", 1),
+                                             "video2": ("USB Camera", 0)})
+
+    devices = list_video_devices(dev, sysfs)
+
+    assert [(device.index, device.name) for device in devices] == [(0, "Integrated Camera"), (2, "USB Camera")]
+
+def test_discovery_only_opens_listed_devices_and_caches(tmp_path):
+    dev, sysfs = fake_video4linux(tmp_path, {"video0": ("Integrated Camera", 0), "video1": ("Metadata", 1)})
+    opened = []
+    def opener(index):
+        opened.append(index)
+        return FakeCamera()
+
+    discovery = CameraDiscovery(opener=opener, dev_directory=dev, sysfs_directory=sysfs, use_sysfs=True)
+    cameras = discovery.cameras()
+
+    assert opened == [0]
+    assert [(mode.width, mode.height) for mode in cameras[0].modes] == [(640, 480), (1280, 720), (1920, 1080)]
+
+    discovery.cameras()
+    assert opened == [0]
+
+    # A newly plugged in camera invalidates the cache
+    fake_video4linux(tmp_path, {"video2": ("USB Camera", 0)})
+    assert [camera.index for camera in discovery.cameras()] == [0, 2]
+
+def test_probes_indices_in_parallel_and_skips_hanging_cameras():
+    def opener(index):
+        return FakeCamera(opened=index in (0, 1), delay=5.0 if index == 1 else 0.2)
+
+    discovery = CameraDiscovery(max_cameras=5, timeout=1.0, opener=opener, use_sysfs=False)
+    start = time.perf_counter()
+    cameras = discovery.cameras()
+
+    assert time.perf_counter() - start < 2.0
+    assert [camera.index for camera in cameras] == [0]
+
+def test_select_mode_prefers_smallest_covering_mode():
+    modes = [CameraMode(320, 240, 30), CameraMode(640, 480, 30), CameraMode(640, 480, 60), CameraMode(1920, 1080, 30)]
+
+    assert select_mode(modes, height=256, width=192) == CameraMode(640, 480, 60)
+    assert select_mode(modes, height=2000, width=192) == CameraMode(1920, 1080, 30)
+    assert select_mode(modes, height=256, width=192, min_fps=90) == CameraMode(640, 480, 60)
+    assert select_mode([], height=256, width=192) is None
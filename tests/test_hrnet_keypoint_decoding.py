@@ -0,0 +1,63 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent/"src"/"hrnet_pose"))
+
+import numpy as np
+import pytest
+
+from src.hrnet_pose.keypoint_decoding import decode_heatmaps
+from src.hrnet_pose.model_inference import ModelInference
+
+
+def gaussian_heatmaps(centers, height=64, width=48, sigma=2.0):
+    grid_y, grid_x = np.mgrid[0:height, 0:width]
+    return np.stack([np.exp(-((grid_y - y)**2 + (grid_x - x)**2)/(2*sigma**2)) for y, x in centers]).astype(np.float32)
+
+def test_decode_matches_per_joint_argmax():
+    heatmaps = np.random.default_rng(0).random((17, 64, 48), dtype=np.float32)
+
+    keypoints = decode_heatmaps(heatmaps, refinement="none", scale=4)
+
+    expected = [np.unravel_index(np.argmax(heatmap), heatmap.shape) for heatmap in heatmaps]
+    assert keypoints.shape == (17, 3)
+    np.testing.assert_array_equal(keypoints[:, :2], np.array(expected)*4)
+    np.testing.assert_array_equal(keypoints[:, 2], heatmaps.reshape(17, -1).max(axis=1))
+
+@pytest.mark.parametrize("refinement, tolerance", [("quarter", 0.3), ("taylor", 0.1)])
+def test_refinement_recovers_sub_pixel_peaks(refinement, tolerance):
+    centers = np.array([(20.3, 10.7), (33.6, 25.2), (5.25, 40.8)])
+    heatmaps = gaussian_heatmaps(centers)
+
+    refined = decode_heatmaps(heatmaps, refinement=refinement)[:, :2]
+    integer = decode_heatmaps(heatmaps, refinement="none")[:, :2]
+
+    assert np.all(np.abs(refined - centers) <= tolerance)
+    assert np.abs(refined - centers).sum() < np.abs(integer - centers).sum()
+
+def test_decode_batched_and_border_peaks():
+    heatmaps = gaussian_heatmaps([(0, 0), (63, 47)])
+    batched = np.stack([heatmaps, heatmaps[::-1]])
+
+    keypoints = decode_heatmaps(batched, refinement="taylor")
+
+    assert keypoints.shape == (2, 2, 3)
+    np.testing.assert_array_equal(keypoints[0, :, :2], [(0, 0), (63, 47)])
+    np.testing.assert_array_equal(keypoints[1, 0], keypoints[0, 1])
+
+    with pytest.raises(ValueError):
+        decode_heatmaps(heatmaps, refinement="cubic")
+
+def test_model_inference_returns_scaled_keypoints(hrnet_session):
+    iInfer = ModelInference(session=hrnet_session(batch=1))
+    frame = np.zeros((256, 192, 3), dtype=np.uint8)
+    frame[100, 60] = 255
+
+    _, keypoints = iInfer._process_frame(frame, scaler=4)
+
+    assert keypoints.shape == (17, 3)
+    np.testing.assert_allclose(keypoints[:, :2], np.tile([100, 60], (17, 1)), atol=1)
@@ -0,0 +1,66 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent/"src"/"hrnet_pose"))
+
+import numpy as np
+
+from tests.conftest import FakeSession
+from src.hrnet_pose.multi_person import MultiPersonPoseEstimator, PersonDetector, non_max_suppression
+
+
+def fake_detector(detections):
+    """A 320x320 detector session returning fixed (x1, y1, x2, y2, score, class) rows in input pixels."""
+    detections = np.array(detections, dtype=np.float32)
+
+    def compute(feed):
+        return [detections[None, :, :4], detections[None, :, 4], detections[None, :, 5].astype(np.int64)]
+
+    return FakeSession([("image", [1, 3, 320, 320])],
+                       [("boxes", [1, len(detections), 4]), ("scores", [1, len(detections)]),
+                        ("class_idx", [1, len(detections)])], compute)
+
+def test_non_max_suppression_keeps_best_of_overlapping_boxes():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60], [0, 0, 10, 10]], dtype=np.float32)
+    scores = np.array([0.8, 0.9, 0.7, 0.1])
+
+    assert non_max_suppression(boxes, scores, iou_threshold=0.5).tolist() == [1, 2]
+    assert non_max_suppression(boxes, scores, max_detections=1).tolist() == [1]
+
+def test_multi_person_estimator_batches_crops_and_remaps(hrnet_session):
+    # Frame is 640x480, the detector sees it as 320x320
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    people = [(150, 100), (300, 500)]
+    for y, x in people:
+        frame[y-2:y+2, x-2:x+2] = 255
+
+    detector = PersonDetector(fake_detector([
+        (30, 40, 70, 160, 0.9, 0),                                                              # person around (150, 100)
+        (31, 41, 71, 161, 0.6, 0),                                                              # duplicate of the first person
+        (230, 130, 270, 270, 0.8, 0),                                                           # person around (300, 500)
+        (150, 150, 200, 200, 0.9, 2),                                                           # a car
+        (10, 10, 20, 20, 0.1, 0),                                                               # low score
+    ]))
+    pose_session = hrnet_session()
+    estimator = MultiPersonPoseEstimator(detector, pose_session)
+
+    keypoints, boxes = estimator(frame)
+
+    assert pose_session.run_count == 1
+    assert boxes.shape == (2, 5)
+    np.testing.assert_allclose(boxes[0, :4], [60, 60, 140, 240])
+    assert keypoints.shape == (2, 17, 3)
+    for person, (y, x) in zip(keypoints, people):
+        np.testing.assert_allclose(person[:, :2], np.tile([y, x], (17, 1)), atol=4)
+
+def test_multi_person_estimator_without_people(hrnet_session):
+    detector = PersonDetector(fake_detector([(10, 10, 20, 20, 0.1, 0)]))
+    estimator = MultiPersonPoseEstimator(detector, hrnet_session(batch=1))
+
+    keypoints, boxes = estimator(np.zeros((480, 640, 3), dtype=np.uint8))
+
+    assert len(keypoints) == 0 and len(boxes) == 0
@@ -0,0 +1,68 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent/"src"/"hrnet_pose"))
+
+import numpy as np
+import pytest
+
+from src.hrnet_pose.pipeline import DropOldestQueue, PosePipeline
+
+
+class FakeCapture():
+    def __init__(self, frames: int, delay: float=0.0) -> None:
+        self.remaining = frames
+        self.delay = delay
+
+    def read(self):
+        time.sleep(self.delay)
+        if self.remaining == 0:
+            return False, None
+        self.remaining -= 1
+        return True, np.full((4, 4, 3), self.remaining, dtype=np.uint8)
+
+def test_drop_oldest_queue_keeps_newest_items():
+    q = DropOldestQueue(maxsize=2)
+    for item in range(5):
+        q.put(item)
+
+    assert q.dropped == 3
+    assert [q.get(timeout=0), q.get(timeout=0)] == [3, 4]
+
+def test_pipeline_overlaps_stages():
+    stage_seconds = 0.01
+    rendered = []
+
+    def process(frame):
+        time.sleep(stage_seconds)
+        return int(frame[0, 0, 0])
+
+    def render(frame, result):
+        time.sleep(stage_seconds)
+        rendered.append(result)
+        return True
+
+    pipeline = PosePipeline(FakeCapture(30, delay=stage_seconds), process, render,
+                            queue_size=4, report_interval=0, max_frames=30)
+    start = time.perf_counter()
+    pipeline.run()
+    elapsed = time.perf_counter() - start
+
+    assert rendered == sorted(rendered, reverse=True)
+    assert len(rendered) + pipeline.frames.dropped + pipeline.results.dropped == 30
+    # Serial execution would take 3 stages x 30 frames x 10 ms
+    assert elapsed < 3*30*stage_seconds*0.8
+    assert set(pipeline.stats()["latency"]) >= {"capture", "inference", "display", "end_to_end"}
+
+def test_pipeline_stops_on_render_and_raises_capture_errors():
+    pipeline = PosePipeline(FakeCapture(100), lambda frame: None, lambda frame, result: False, report_interval=0)
+    pipeline.run()
+    assert pipeline.rendered == 1
+
+    with pytest.raises(ValueError):
+        PosePipeline(FakeCapture(0), lambda frame: None, lambda frame, result: True, report_interval=0).run()
@@ -0,0 +1,40 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent/"src"/"hrnet_pose"))
+
+import cv2 as cv
+import numpy as np
+
+from src.hrnet_pose.preprocessing import FramePreprocessor
+
+
+def test_preprocessor_matches_reference_conversion():
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+    preprocessor = FramePreprocessor(height=256, width=192)
+
+    resized, tensor = preprocessor(frame)
+
+    reference = cv.resize(frame, (192, 256), interpolation=cv.INTER_CUBIC)
+    expected = cv.cvtColor(reference, cv.COLOR_BGR2RGB).transpose(2, 0, 1)[None].astype(np.float32)/255
+    assert np.array_equal(resized, reference)
+    assert tensor.shape == (1, 3, 256, 192) and tensor.dtype == np.float32
+    assert tensor.flags["C_CONTIGUOUS"]
+    np.testing.assert_allclose(tensor, expected, rtol=1e-6)
+
+def test_preprocessor_reuses_its_input_buffer():
+    preprocessor = FramePreprocessor(height=8, width=8, batch_size=2)
+    black = np.zeros((16, 16, 3), dtype=np.uint8)
+
+    _, first = preprocessor(black)
+    preprocessor.fill(1, black + 255)
+    _, second = preprocessor(black + 255)
+
+    assert np.shares_memory(first, second)
+    assert preprocessor.batch(2).shape == (2, 3, 8, 8)
+    assert np.all(preprocessor.batch(2) == 1.0)
@@ -0,0 +1,122 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent/"src"/"hrnet_pose"))
+
+import numpy as np
+import pytest
+
+from src.hrnet_pose.batch_processing import BatchPoseProcessor
+from src.hrnet_pose.server import MicroBatcher, PoseClient, PoseServer
+
+
+def bright_spot_frame(y, x, height=480, width=640):
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[y-8:y+8, x-8:x+8] = 255
+    return frame
+
+@pytest.fixture
+def pose_server(hrnet_session):
+    session = hrnet_session()
+    server = PoseServer(BatchPoseProcessor(session, batch_size=8), port=0, batch_window=0.05)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server, session
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+def test_micro_batcher_groups_concurrent_frames():
+    calls = []
+    def infer(frames):
+        calls.append(len(frames))
+        return np.stack([np.full((17, 3), frame[0, 0, 0], dtype=np.float32) for frame in frames])
+
+    batcher = MicroBatcher(infer, batch_size=4, window=0.2).start()
+    futures = [batcher.submit(np.full((2, 2, 3), index, dtype=np.uint8)) for index in range(6)]
+    results = [future.result(timeout=5) for future in futures]
+    batcher.stop()
+
+    assert calls == [4, 2]
+    assert [int(keypoints[0, 0]) for keypoints, _ in results] == list(range(6))
+    assert results[0][1]["batch_size"] == 4
+    assert batcher.metrics.summary()["mean_batch_size"] == 3
+
+def test_stopping_the_batcher_fails_queued_frames():
+    started, release = threading.Event(), threading.Event()
+    def infer(frames):
+        started.set()
+        release.wait(timeout=5)
+        return np.zeros((len(frames), 17, 3), dtype=np.float32)
+
+    batcher = MicroBatcher(infer, batch_size=1, window=0).start()
+    running = batcher.submit(np.zeros((2, 2, 3), dtype=np.uint8))
+    assert started.wait(timeout=5)
+    queued = [batcher.submit(np.zeros((2, 2, 3), dtype=np.uint8)) for _ in range(3)]
+    stopper = threading.Thread(target=batcher.stop)
+    stopper.start()
+    # Frames submitted once stop() began are failed right away, keep submitting until that happens
+    while not queued[-1].done():
+        queued.append(batcher.submit(np.zeros((2, 2, 3), dtype=np.uint8)))
+    release.set()
+    stopper.join(timeout=5)
+
+    assert running.result(timeout=5)[0].shape == (17, 3)
+    for future in queued:
+        with pytest.raises(RuntimeError, match="stopped"):
+            future.result(timeout=1)
+
+@pytest.mark.parametrize("encoding", ["jpeg", "png", "raw"])
+def test_server_returns_keypoints_in_frame_coordinates(pose_server, encoding):
+    server, _ = pose_server
+    keypoints, response = PoseClient(server.url).estimate(bright_spot_frame(120, 400), encoding=encoding)
+
+    assert keypoints.shape == (17, 3)
+    np.testing.assert_allclose(keypoints[:, :2], np.tile([112, 392], (17, 1)), atol=6)
+    assert set(response["latency_ms"]) == {"decode", "queue", "inference", "total"}
+
+def test_server_batches_concurrent_clients(pose_server):
+    server, session = pose_server
+    client = PoseClient(server.url)
+    spots = [(100 + 30*index, 100 + 50*index) for index in range(8)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda spot: client.estimate(bright_spot_frame(*spot))[0], spots))
+
+    for spot, keypoints in zip(spots, results):
+        np.testing.assert_allclose(keypoints[0, :2], np.array(spot) - 8, atol=6)
+
+    metrics = client.metrics()
+    assert metrics["requests"] == 8
+    assert session.run_count == metrics["batches"] < 8
+    assert metrics["total_ms"]["p95"] > 0
+
+def test_server_rejects_bad_frames(pose_server):
+    server, session = pose_server
+    client = PoseClient(server.url)
+
+    with pytest.raises(ValueError, match="400"):
+        client.estimate(np.zeros((4, 4), dtype=np.uint8)[..., None].repeat(2, axis=2), encoding="raw")
+
+    assert session.run_count == 0
+    assert client.metrics()["errors"] == 1
+
+def test_server_refuses_oversized_frames(hrnet_session):
+    session = hrnet_session()
+    server = PoseServer(BatchPoseProcessor(session, batch_size=8), port=0, max_body_bytes=1024)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    try:
+        with pytest.raises(ValueError, match="413"):
+            PoseClient(server.url).estimate(np.zeros((20, 20, 3), dtype=np.uint8), encoding="raw")
+        assert session.run_count == 0
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
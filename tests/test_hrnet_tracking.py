@@ -0,0 +1,53 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent/"src"/"hrnet_pose"))
+
+import numpy as np
+
+from src.hrnet_pose.tracking import OneEuroFilter, PoseTracker
+
+
+def block_frame(y, x, height=480, width=640, size=40):
+    frame = np.full((height, width, 3), 40, dtype=np.uint8)
+    frame[y:y + size, x:x + size] = 255
+    return frame
+
+def test_one_euro_filter_reduces_jitter_but_follows_motion():
+    rng = np.random.default_rng(0)
+    smoothing = OneEuroFilter(min_cutoff=1.0, beta=0.0)
+    noisy = 100 + rng.normal(0, 2, size=(60, 17, 2))
+
+    smoothed = np.array([smoothing(value, index/30) for index, value in enumerate(noisy)])
+
+    assert smoothed[30:].std(axis=0).mean() < noisy[30:].std(axis=0).mean()/2
+
+    fast = OneEuroFilter(min_cutoff=1.0, beta=1.0)
+    for index in range(30):
+        position = fast(np.array([[10.0*index, 0.0]]), index/30)
+    assert abs(position[0, 0] - 290) < 15
+
+def test_tracker_skips_static_frames_and_crops_moving_person(hrnet_session):
+    session = hrnet_session(batch=1)
+    tracker = PoseTracker(session, max_skip=4, motion_threshold=0.001, full_frame_interval=100)
+
+    static = block_frame(200, 300)
+    for index in range(10):
+        keypoints = tracker(static, timestamp=index/30)
+
+    # First frame, then every 5th frame when nothing moves
+    assert session.run_count == 2
+    assert tracker.counts["skipped"] == 8
+    np.testing.assert_allclose(keypoints[:, :2], np.tile([200, 300], (17, 1)), atol=5)
+
+    for index in range(10, 20):
+        keypoints = tracker(block_frame(200, 300 + 10*(index - 9)), timestamp=index/30)
+
+    assert session.run_count == 12
+    assert tracker.counts["roi"] == 11
+    # The smoothed pose lags a little behind the block's corner at x=400
+    assert 370 < keypoints[0, 1] < 405
@@ -3,11 +3,51 @@
 # Redistribution and use in source and binary forms, with or without
 # modification, are permitted provided that the conditions in LICENSE.txt are met
 
+import numpy as np
 from unittest.mock import patch
 from src.model_loader import ModelLoader
 from src.deepseek_r1.deepseek_model_inference import DeepSeekModelInference
 
 
-"""
-Update this to add unit tests for deepseek model inference
-"""
\ No newline at end of file
+def _ids(*token_ids):
+    return np.array([token_ids], dtype=np.int64)
+
+def test_prefill_continues_past_the_context_window(deepseek_inference):
+    iInfer = deepseek_inference(window=4)
+
+    logits = iInfer.prefill(_ids(1, 2, 3, 4, 5, 6), io_binding=False)
+
+    assert iInfer.token_ids == [1, 2, 3, 4, 5, 6]
+    assert iInfer.sequence_length == 6
+    assert iInfer.session_mapper["CONTEXT_ITER"].run_count == 2
+    assert logits.shape == (1, 1, 32)
+
+def test_prefill_reuses_shared_prefix(deepseek_inference):
+    reference = deepseek_inference(window=4).prefill(_ids(1, 2, 3, 4, 5, 6, 7, 8), io_binding=False)
+
+    iInfer = deepseek_inference(window=4)
+    iInfer.prefill(_ids(1, 2, 3, 4, 5, 6), io_binding=False)
+    iter_runs = iInfer.session_mapper["CONTEXT_ITER"].run_count
+    logits = iInfer.prefill(_ids(1, 2, 3, 4, 5, 6, 7, 8), io_binding=False, reuse_prefix=True)
+
+    assert iInfer.session_mapper["CONTEXT"].run_count == 1
+    assert iInfer.session_mapper["CONTEXT_ITER"].run_count - iter_runs == 2
+    np.testing.assert_allclose(logits, reference, rtol=1e-5)
+
+def test_prefill_rewinds_diverged_tail(deepseek_inference):
+    reference = deepseek_inference(window=4).prefill(_ids(1, 2, 3, 4, 5, 6, 7), io_binding=False)
+
+    iInfer = deepseek_inference(window=4)
+    iInfer.prefill(_ids(1, 2, 3, 4, 5, 9, 9), io_binding=False)
+    logits = iInfer.prefill(_ids(1, 2, 3, 4, 5, 6, 7), io_binding=False, reuse_prefix=True)
+
+    assert iInfer.session_mapper["CONTEXT"].run_count == 1
+    assert iInfer.token_ids == [1, 2, 3, 4, 5, 6, 7]
+    np.testing.assert_allclose(logits, reference, rtol=1e-5)
+
+def test_prefill_restarts_when_context_window_diverges(deepseek_inference):
+    iInfer = deepseek_inference(window=4)
+    iInfer.prefill(_ids(1, 2, 3, 4, 5), io_binding=False)
+    iInfer.prefill(_ids(1, 9, 3, 4, 5), io_binding=False, reuse_prefix=True)
+
+    assert iInfer.session_mapper["CONTEXT"].run_count == 2
@@ -4,8 +4,11 @@
 # Redistribution and use in source and binary forms, with or without
 # modification, are permitted provided that the conditions in LICENSE.txt are met
 
+import numpy as np
+
 from unittest.mock import patch
-from src.model_loader import ModelLoader
+from src.model_loader import SHARE_EP_CONTEXTS, STOP_SHARE_EP_CONTEXTS, USE_ENV_ALLOCATORS, ModelLoader
+from tests.onnx_graphs import write_embedding_graph
 
 
 def test_model_loader_initialization(model_paths):
@@ -68,3 +71,41 @@ def test_validate_executioner_config_structure(load_config):
 
 
                                            
+
+def test_session_group_shares_initializers(tmp_path):
+    table = np.arange(12, dtype=np.float32).reshape(4, 3)
+    write_embedding_graph(tmp_path/"ctx.onnx", table)
+    write_embedding_graph(tmp_path/"iter.onnx", table)
+    loader = ModelLoader(model="hrnet_pose", processor="cpu", model_type="default")
+    loader.model_subdirectory_path = tmp_path
+
+    group = loader.load_session_group({"CONTEXT": "ctx.onnx", "CONTEXT_ITER": "iter.onnx"},
+                                      shared_initializers={"table": table*10})
+
+    # Both sessions read the one shared copy instead of the weights stored in their graphs
+    for graph_name in ("CONTEXT", "CONTEXT_ITER"):
+        embeddings = group[graph_name].run(None, {"input_ids": np.array([[1]], dtype=np.int64)})[0]
+        np.testing.assert_array_equal(embeddings[0, 0], table[1]*10)
+    assert list(group.shared_initializers) == ["table"]
+
+def test_session_group_sets_sharing_options():
+    loader = ModelLoader(model="deepseek_7b", processor="cpu", model_type="default")
+    graphs = {"CONTEXT": "ctx.onnx", "CONTEXT_ITER": "iter.onnx", "HEAD": "head.onnx"}
+
+    with patch.object(ModelLoader, "load_model", side_effect=lambda graph, session_options, **kwargs: session_options):
+        group = loader.load_session_group(graphs, htp_performance_mode="burst")
+
+    def entry(graph_name, key):
+        try:
+            return group[graph_name].get_session_config_entry(key)
+        except RuntimeError:                                                          # Not set
+            return None
+
+    assert [entry(graph_name, SHARE_EP_CONTEXTS) for graph_name in graphs] == ["1", "1", "1"]
+    assert [entry(graph_name, STOP_SHARE_EP_CONTEXTS) for graph_name in graphs] == [None, None, "1"]
+    assert [entry(graph_name, USE_ENV_ALLOCATORS) for graph_name in graphs] == ["1", "1", "1"]
+
+    with patch.object(ModelLoader, "load_model", side_effect=lambda graph, session_options, **kwargs: session_options):
+        group = loader.load_session_group(graphs, share_ep_contexts=False, share_allocator=False)
+    assert all(entry(graph_name, key) is None for graph_name in graphs
+               for key in (SHARE_EP_CONTEXTS, STOP_SHARE_EP_CONTEXTS, USE_ENV_ALLOCATORS))
@@ -0,0 +1,152 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import numpy as np
+import pytest
+
+from src.model_loader import SessionGroup
+from src.model_residency import ModelResidency, estimate_session_memory
+from tests.conftest import FakeSession
+from tests.onnx_graphs import field, node, tensor, write_model
+
+MB = 2**20
+
+
+class FakeLoader:
+    """Stands in for ModelLoader, load_model() creates a session running `identity` and counts the loads."""
+    def __init__(self, directory, model, graphs):
+        self.model_subdirectory_path = directory
+        self.model = model
+        self.graphs = graphs
+        self.loaded = []
+        self.groups = []
+
+    def load_model(self, graph, **kwargs):
+        self.loaded.append(graph)
+        return FakeSession([("x", [1])], [("y", [1])], lambda feed: [feed["x"]])
+
+    def load_session_group(self, graphs, **kwargs):
+        self.groups.append((list(graphs.values()), kwargs))
+        return SessionGroup(sessions={name: self.load_model(graph) for name, graph in graphs.items()})
+
+@pytest.fixture
+def loader(tmp_path):
+    def _build(model, graphs):
+        return FakeLoader(tmp_path, model, graphs)
+    return _build
+
+def write_context_model(path, binary, weights=None):
+    graph = field(1, node("EPContext", ["input_ids"], ["logits"], embed_mode=0, ep_cache_context=binary))
+    if weights is not None:
+        graph += field(5, tensor("weights", np.zeros(4, dtype=np.float32), external=(weights, 0)))
+    return write_model(path, graph)
+
+def test_estimate_includes_referenced_weight_files(tmp_path):
+    model_path = write_context_model(tmp_path/"deepseek_ctx.onnx_ctx.onnx", "deepseek_ctx.serialized.bin",
+                                     weights="weights.data")
+    (tmp_path/"deepseek_ctx.serialized.bin").write_bytes(b"0"*900)
+    (tmp_path/"weights.data").write_bytes(b"0"*100)
+    (tmp_path/"deepseek_other.bin").write_bytes(b"0"*5000)                               # Not referenced
+
+    assert estimate_session_memory(model_path, overhead=1.0) == model_path.stat().st_size + 1000
+
+def test_shared_context_binaries_are_counted_once(tmp_path, loader):
+    (tmp_path/"shared.bin").write_bytes(b"0"*MB)
+    write_context_model(tmp_path/"ctx.onnx", "shared.bin")
+    write_context_model(tmp_path/"iter.onnx", "shared.bin")
+    residency = ModelResidency(budget_bytes=2*MB, overhead=1.0)
+    sessions = residency.register_model(loader("deepseek_7b", {"CONTEXT": "ctx.onnx", "CONTEXT_ITER": "iter.onnx"}))
+
+    sessions["CONTEXT"].get_inputs()
+    sessions["CONTEXT_ITER"].get_inputs()
+    assert residency.resident == ["DEEPSEEK_7B/CONTEXT", "DEEPSEEK_7B/CONTEXT_ITER"]
+    assert residency.used_bytes < 2*MB
+    assert residency.evictions == 0
+
+def test_least_recently_used_sessions_are_released_and_reloaded(loader):
+    residency = ModelResidency(budget_bytes=100*MB)
+    pose = residency.register("HRNET_POSE", loader("hrnet_pose", "hrnet.onnx"), "hrnet.onnx", estimate=30*MB)
+    deepseek_loader = loader("deepseek_7b", {"CONTEXT": "ctx.onnx", "HEAD": "head.onnx", "TOKENIZER": "tokenizer.json"})
+    context = residency.register("DEEPSEEK/CONTEXT", deepseek_loader, "ctx.onnx", estimate=50*MB)
+    head = residency.register("DEEPSEEK/HEAD", deepseek_loader, "head.onnx", estimate=40*MB)
+    x = {"x": np.ones(1, dtype=np.float32)}
+
+    assert residency.resident == []                                                   # Nothing loads before use
+    pose.run(None, x)
+    context.run(None, x)
+    assert residency.used_bytes == 80*MB
+
+    pose.run(None, x)                                                                 # Pose becomes the most recent
+    head.run(None, x)
+    assert residency.resident == ["HRNET_POSE", "DEEPSEEK/HEAD"]
+    assert residency.evictions == 1
+
+    # Using the released session loads it again behind the same handle
+    assert context.get_inputs()[0].name == "x"
+    assert deepseek_loader.loaded == ["ctx.onnx", "head.onnx", "ctx.onnx"]
+    assert residency.used_bytes <= residency.budget_bytes
+
+def test_running_sessions_are_not_released(loader):
+    residency = ModelResidency(budget_bytes=100*MB)
+    first = residency.register("A", loader("a", "a.onnx"), "a.onnx", estimate=60*MB)
+    second = residency.register("B", loader("b", "b.onnx"), "b.onnx", estimate=60*MB)
+
+    with residency.pinned("A"):
+        with pytest.raises(ValueError, match="in use"):
+            second.get_inputs()
+    second.get_inputs()
+    assert residency.resident == ["B"]
+
+    with pytest.raises(ValueError, match="budget"):
+        residency.register("C", loader("c", "c.onnx"), "c.onnx", estimate=200*MB)
+    assert first.name == "A"
+
+def test_register_model_uses_the_graphs_of_models_json(loader):
+    residency = ModelResidency(budget_bytes=100*MB)
+    sessions = residency.register_model(loader("deepseek_7b", {"CONTEXT": "ctx.onnx", "HEAD": "head.onnx",
+                                                               "TOKENIZER": "tokenizer.json"}), estimate=MB)
+
+    assert sorted(sessions) == ["CONTEXT", "HEAD"]
+    assert sessions["HEAD"].name == "DEEPSEEK_7B/HEAD"
+
+def test_working_set_is_loaded_and_released_as_one_unit(loader):
+    deepseek_loader = loader("deepseek_7b", {"EMBEDDING": "embed.onnx", "CONTEXT": "ctx.onnx",
+                                             "CONTEXT_ITER": "iter.onnx", "HEAD": "head.onnx"})
+    with pytest.raises(ValueError, match="every step"):
+        ModelResidency(budget_bytes=50*MB).register_model(deepseek_loader, estimate=20*MB,
+                                                          working_set=("EMBEDDING", "CONTEXT_ITER", "HEAD"))
+
+    residency = ModelResidency(budget_bytes=70*MB)
+    sessions = residency.register_model(deepseek_loader, estimate=20*MB,
+                                        working_set=("EMBEDDING", "CONTEXT_ITER", "HEAD"))
+    x = {"x": np.ones(1, dtype=np.float32)}
+
+    sessions["EMBEDDING"].run(None, x)                                                # Loads the whole working set
+    assert sorted(residency.resident) == ["DEEPSEEK_7B/CONTEXT_ITER", "DEEPSEEK_7B/EMBEDDING", "DEEPSEEK_7B/HEAD"]
+    sessions["CONTEXT"].run(None, x)                                                  # Prefill releases the unit
+    assert residency.resident == ["DEEPSEEK_7B/CONTEXT"]
+
+    deepseek_loader.loaded.clear()
+    for _ in range(8):                                                                # Decoding reloads it once
+        for graph_name in ("EMBEDDING", "CONTEXT_ITER", "HEAD"):
+            sessions[graph_name].run(None, x)
+    assert sorted(deepseek_loader.loaded) == ["embed.onnx", "head.onnx", "iter.onnx"]
+
+def test_weight_sharing_graphs_load_as_a_session_group(loader):
+    deepseek_loader = loader("deepseek_7b", {"EMBEDDING": "embed.onnx", "CONTEXT": "ctx.onnx",
+                                             "CONTEXT_ITER": "iter.onnx", "HEAD": "head.onnx"})
+    residency = ModelResidency(budget_bytes=100*MB)
+    sessions = residency.register_model(deepseek_loader, estimate=20*MB, working_set=("EMBEDDING", "CONTEXT_ITER", "HEAD"),
+                                        session_group=("CONTEXT", "CONTEXT_ITER"), htp_performance_mode="burst")
+
+    sessions["CONTEXT"].get_inputs()
+    assert deepseek_loader.groups == [(["ctx.onnx", "iter.onnx"], {"htp_performance_mode": "burst"})]
+    # The group overlaps the per-step graphs, so the whole model forms one unit
+    assert sorted(deepseek_loader.loaded) == ["ctx.onnx", "embed.onnx", "head.onnx", "iter.onnx"]
+
+    residency.evict("DEEPSEEK_7B/HEAD")
+    assert residency.resident == []
+    sessions["CONTEXT_ITER"].get_inputs()
+    assert len(deepseek_loader.groups) == 2
@@ -0,0 +1,66 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import random
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent/"src"/"pong"))
+
+import numpy as np
+import pytest
+
+from src.pong.batch_simulation import DOWN, OBSERVATION_SIZE, UP, BatchPongSimulation, evaluate_config, track_ball_actions
+from src.pong.simulation import Direction, PongSimulation, track_ball
+
+
+def test_batch_simulation_matches_scalar_simulation(pong_config):
+    scalar = PongSimulation(pong_config, countdown_seconds=0.0, rng=random.Random(3))
+    batch = BatchPongSimulation(pong_config, num_games=1)
+    batch.ball_dy[:] = scalar.ball.dy
+
+    to_action = {Direction.Up: UP, Direction.Down: DOWN, None: 0}
+    for _ in range(5_000):
+        actions = np.array([[to_action[track_ball(scalar, 1)], to_action[track_ball(scalar, 2)]]])
+        assert np.array_equal(actions, track_ball_actions(batch))
+
+        scorer = scalar.step(track_ball(scalar, 1), track_ball(scalar, 2))
+        _, _, _, info = batch.step(actions)
+
+        assert info["scorer"][0] == (scorer or 0)
+        if scorer is not None:
+            break
+        assert batch.ball_x[0] == pytest.approx(scalar.ball.x)
+        assert batch.ball_y[0] == pytest.approx(scalar.ball.y)
+        assert batch.paddle_y[0] == pytest.approx([scalar.player_1.y, scalar.player_2.y])
+
+    assert scorer is not None
+    assert batch.rallies[0] == 1 and batch.total_hits[0] == scalar.rally_hits[0]
+
+def test_batch_simulation_gym_api(pong_config):
+    batch = BatchPongSimulation(pong_config, num_games=8, seed=0)
+    observation = batch.reset()
+    assert observation.shape == (8, OBSERVATION_SIZE)
+
+    total_rewards = np.zeros(8)
+    for _ in range(50_000):
+        observation, rewards, done, _ = batch.step(np.zeros((8, 2), dtype=np.int8))
+        total_rewards += rewards
+        if done.all():
+            break
+
+    # Nobody moves, so every serve scores for the server
+    assert done.all()
+    assert np.all(np.abs(total_rewards) == batch.max_score)
+
+    with pytest.raises(ValueError):
+        batch.step(np.zeros((3, 2)))
+
+def test_evaluate_config_flags_unplayable_ball_speed(pong_config):
+    fast = pong_config.model_copy(update={"ball_initial_speed": 15.0})
+
+    report = evaluate_config(fast, num_games=64)
+
+    assert report.finished_fraction == 1.0
+    assert report.mean_rally_hits < 2
@@ -0,0 +1,51 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent/"src"/"pong"))
+
+from src.pong.config_cache import GameConfigCache, normalize_prompt
+
+
+def test_normalized_prompts_share_an_entry(tmp_path, pong_config):
+    cache = GameConfigCache(path=tmp_path/"cache.json")
+    faster = pong_config.model_copy(update={"ball_initial_speed": 9.0})
+
+    cache.put("Make the ball faster!", 1, pong_config, faster)
+
+    assert normalize_prompt("  Make the  ball faster!! ") == "make the ball faster"
+    assert cache.get("make the ball faster", 1, pong_config) == faster
+    assert cache.get("make the ball faster", 2, pong_config) is None
+    assert cache.get("make the ball faster", 1, faster) is None
+
+def test_lru_eviction_and_persistence(tmp_path, pong_config):
+    path = tmp_path/"cache.json"
+    cache = GameConfigCache(path=path, max_entries=2)
+
+    cache.put("a", 1, pong_config, pong_config)
+    cache.put("b", 1, pong_config, pong_config)
+    cache.get("a", 1, pong_config)
+    cache.put("c", 1, pong_config, pong_config)
+
+    reloaded = GameConfigCache(path=path, max_entries=2)
+    assert len(reloaded) == 2
+    assert reloaded.contains("a", 1, pong_config)
+    assert not reloaded.contains("b", 1, pong_config)
+    assert reloaded.common_prompts(1) == ["a"]
+
+def test_precompute_only_generates_misses(tmp_path, pong_config):
+    cache = GameConfigCache(path=None)
+    cache.put("bigger paddles", 1, pong_config, pong_config)
+    requested = []
+
+    def generate(prompt, last_scored_player, previous_config):
+        requested.append(prompt)
+        return previous_config
+
+    added = cache.precompute(["bigger paddles", "slower ball"], 1, pong_config, generate)
+
+    assert added == 1
+    assert requested == ["slower ball"]
@@ -0,0 +1,96 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import queue
+import threading
+import time
+import pytest
+from concurrent.futures import CancelledError
+from src.pong.model_executor import ModelJobExecutor
+
+
+def test_job_result_and_latency_metric():
+    executor = ModelJobExecutor(max_workers=1)
+    job = executor.submit(lambda value, stop_event: value * 2, 21, label="double")
+
+    assert job.result(timeout=5) == 42
+    executor.shutdown()
+    assert executor.metrics.summary()["double"]["count"] == 1
+
+def test_failures_are_surfaced_on_the_job():
+    executor = ModelJobExecutor(max_workers=1)
+
+    def fail(stop_event):
+        raise ValueError("no valid configuration")
+
+    job = executor.submit(fail)
+    with pytest.raises(ValueError):
+        job.result(timeout=5)
+    executor.shutdown()
+
+def test_timeout_and_cancel_set_the_stop_event():
+    executor = ModelJobExecutor(max_workers=1)
+    started = threading.Event()
+
+    def wait_for_stop(stop_event):
+        started.set()
+        stop_event.wait(5)
+        return "late"
+
+    timed_out = executor.submit(wait_for_stop, timeout=0.01)
+    started.wait(5)
+    queued = executor.submit(wait_for_stop)
+    threading.Event().wait(0.05)
+
+    assert timed_out.done()
+    assert isinstance(timed_out.exception(), TimeoutError)
+    assert timed_out.stop_event.is_set()
+
+    queued.cancel()
+    with pytest.raises(CancelledError):
+        queued.result(timeout=5)
+    executor.shutdown()
+
+def test_bounded_queue_rejects_jobs():
+    executor = ModelJobExecutor(max_workers=1, max_pending=1)
+    release = threading.Event()
+    executor.submit(lambda stop_event: release.wait(5))
+
+    with pytest.raises(queue.Full):
+        executor.submit(lambda stop_event: None)
+
+    release.set()
+    executor.shutdown()
+
+def test_reserved_slot_is_kept_for_priority_jobs():
+    executor = ModelJobExecutor(max_workers=1, max_pending=2, reserved=1)
+    release = threading.Event()
+    background = executor.submit(lambda stop_event: release.wait(5), label="warm_up")
+    background.cancel()                                                                # Still holds its slot until it returns
+
+    with pytest.raises(queue.Full):
+        executor.submit(lambda stop_event: None, label="speculate")
+    job = executor.submit(lambda stop_event: "config", label="generate", priority=True)
+
+    release.set()
+    assert job.result(timeout=5) == "config"
+    executor.shutdown()
+
+def test_pending_jobs_are_reported_by_label():
+    executor = ModelJobExecutor(max_workers=1)
+    release = threading.Event()
+
+    job = executor.submit(lambda stop_event: release.wait(5), label="prefill")
+    assert executor.has_pending("prefill", "generate")
+    assert executor.has_pending()
+    assert not executor.has_pending("generate")
+
+    release.set()
+    job.result(timeout=5)
+    deadline = time.perf_counter() + 5                                        # The job is released after its result
+    while executor.has_pending() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert not executor.has_pending()
+    executor.shutdown()
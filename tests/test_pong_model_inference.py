@@ -0,0 +1,34 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent/"src"/"pong"))
+
+from src.pong.model_inference import StubBackend, extract_json_object, generate_game_config
+
+
+def test_generate_game_config_with_stub_backend(pong_config):
+    faster = pong_config.model_copy(update={"ball_initial_speed": 9.0, "change_summary": "Faster ball"})
+    backend = StubBackend([faster])
+
+    config = generate_game_config("make the ball faster", 1, pong_config, backend=backend)
+
+    assert config.ball_initial_speed == 9.0
+    assert len(backend.prompts) == 1
+    assert "make the ball faster" in backend.prompts[0]
+
+def test_generate_game_config_retries_with_validation_error(pong_config):
+    backend = StubBackend(["{\"ball_radius\": 3}", pong_config])
+
+    config = generate_game_config("smaller ball", 2, pong_config, backend=backend)
+
+    assert config == pong_config
+    assert len(backend.prompts) == 2
+    assert "ValidationError" in backend.prompts[1]
+
+def test_extract_json_object_skips_reasoning():
+    response = "Let me think.</think>\nHere it is: {\"a\": {\"b\": 1}} done"
+    assert extract_json_object(response) == "{\"a\": {\"b\": 1}}"
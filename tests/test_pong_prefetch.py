@@ -0,0 +1,78 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import logging
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent/"src"/"pong"))
+
+from src.pong.model_executor import ModelJobExecutor
+from src.pong.model_inference import StubBackend
+from src.pong.prefetch import PromptPrefetcher
+
+
+class PrefillRecorder(StubBackend):
+    def __init__(self):
+        super().__init__(["{}"])
+        self.prefilled = []
+
+    def build_prompt_prefix(self, partial_prompt, last_scored_player, previous_config):
+        return f"player {last_scored_player}: {partial_prompt}"
+
+    def prefill(self, prompt_prefix, stop_event=None):
+        self.prefilled.append(prompt_prefix)
+
+
+def test_prefetch_is_debounced_to_latest_text(pong_config):
+    backend = PrefillRecorder()
+    prefetcher = PromptPrefetcher(backend, debounce_seconds=0.05)
+
+    for text in ["m", "ma", "make", "make the ball"]:
+        prefetcher.update(text, 1, pong_config)
+    time.sleep(0.3)
+
+    assert backend.prefilled == ["player 1: make the ball"]
+
+def test_cancel_drops_pending_prefill(pong_config):
+    backend = PrefillRecorder()
+    prefetcher = PromptPrefetcher(backend, debounce_seconds=0.05)
+
+    prefetcher.update("make the ball", 1, pong_config)
+    prefetcher.cancel()
+    time.sleep(0.2)
+
+    assert backend.prefilled == []
+
+def test_pending_covers_the_debounce_and_the_prefill(pong_config):
+    backend = PrefillRecorder()
+    prefetcher = PromptPrefetcher(backend, debounce_seconds=0.05)
+    assert not prefetcher.pending
+
+    prefetcher.update("make the ball", 1, pong_config)
+    assert prefetcher.pending
+    time.sleep(0.3)
+    assert not prefetcher.pending
+    assert backend.prefilled == ["player 1: make the ball"]
+
+    prefetcher.update("make the ball red", 1, pong_config)
+    prefetcher.cancel()
+    assert not prefetcher.pending
+
+def test_failed_prefill_jobs_are_logged(pong_config, caplog):
+    class FailingBackend(PrefillRecorder):
+        def prefill(self, prompt_prefix, stop_event=None):
+            raise RuntimeError("backend unavailable")
+
+    executor = ModelJobExecutor(max_workers=1)
+    prefetcher = PromptPrefetcher(FailingBackend(), debounce_seconds=0.01, executor=executor)
+    with caplog.at_level(logging.WARNING):
+        prefetcher.update("make the ball", 1, pong_config)
+        deadline = time.perf_counter() + 5
+        while "backend unavailable" not in caplog.text and time.perf_counter() < deadline:
+            time.sleep(0.01)
+    executor.shutdown()
+
+    assert "Prompt prefetch failed: backend unavailable" in caplog.text
@@ -0,0 +1,65 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import os
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent/"src"/"pong"))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+import pytest
+
+from src.pong.render_cache import DirtyRectRenderer, TextRenderCache
+
+
+@pytest.fixture
+def font():
+    pygame.font.init()
+    return pygame.font.Font(None, 24)
+
+def test_render_reuses_surfaces_and_evicts_least_recent(font):
+    cache = TextRenderCache(max_surfaces=2)
+    black = pygame.Color(0, 0, 0)
+
+    first = cache.render(font, "Player 1: 0", black)
+    assert cache.render(font, "Player 1: 0", pygame.Color(0, 0, 0)) is first
+    assert cache.render(font, "Player 1: 0", black, (255, 255, 255)) is not first
+
+    cache.render(font, "Player 1: 0", black)
+    cache.render(font, "Player 2: 0", black)
+
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (2, 3)
+    assert cache.render(font, "Player 1: 0", black) is first
+
+def test_wrap_splits_on_words_and_is_cached(font):
+    cache = TextRenderCache()
+    text = "make the ball much bigger and the paddles a lot faster please"
+
+    lines = cache.wrap(font, text, 120)
+
+    assert len(lines) > 1
+    assert " ".join(lines) == text
+    assert all(font.size(line)[0] <= 120 for line in lines)
+    assert cache.wrap(font, text, 120) is lines
+
+def test_dirty_rect_renderer_clears_previous_frame(font):
+    pygame.display.init()
+    screen = pygame.display.set_mode((200, 100))
+    frame = DirtyRectRenderer(screen)
+    white, red = (255, 255, 255), (255, 0, 0)
+
+    frame.begin_frame(white)
+    frame.mark(pygame.draw.rect(screen, red, pygame.Rect(10, 10, 20, 20)))
+    frame.present()
+
+    frame.begin_frame(white)
+    frame.mark(pygame.draw.rect(screen, red, pygame.Rect(100, 10, 20, 20)))
+    frame.present()
+
+    assert tuple(screen.get_at((15, 15)))[:3] == white
+    assert tuple(screen.get_at((105, 15)))[:3] == red
+    pygame.display.quit()
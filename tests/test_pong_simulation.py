@@ -0,0 +1,49 @@
+# Copyright (c) Qualcomm Technologies, Inc. and/or its subsidiaries.
+# SPDX-License-Identifier: BSD-3-Clause
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the conditions in LICENSE.txt are met
+
+import random
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent/"src"/"pong"))
+
+from src.pong.simulation import FixedTimestepLoop, PongSimulation, simulate_match
+
+
+def test_countdown_freezes_ball_then_round_ends_with_score(pong_config):
+    simulation = PongSimulation(pong_config, countdown_seconds=1.0, rng=random.Random(0))
+    start = simulation.snapshot()
+
+    for _ in range(59):
+        assert simulation.step(None, None) is None
+    assert simulation.countdown_active
+    assert simulation.snapshot() == start
+
+    scorer = None
+    for _ in range(10_000):
+        scorer = simulation.step(None, None)
+        if scorer is not None:
+            break
+
+    # The first serve goes towards player 2, who does not move
+    assert scorer == 1
+    assert simulation.scores == [1, 0]
+    assert simulation.round_over
+
+def test_simulate_match_is_deterministic(pong_config):
+    first = simulate_match(pong_config, rng=random.Random(42))
+    second = simulate_match(pong_config, rng=random.Random(42))
+
+    assert first == second
+    assert first.winner in (1, 2)
+    assert max(first.scores) == 5
+
+def test_fixed_timestep_loop_carries_remainder():
+    loop = FixedTimestepLoop(step_seconds=0.01, max_steps_per_frame=5)
+
+    assert loop.advance(0.025) == 2
+    assert abs(loop.alpha - 0.5) < 1e-6
+    assert loop.advance(0.005) == 1
+    # A long stall is clamped instead of running hundreds of steps
+    assert loop.advance(3.0) == 5